@@ -1,149 +1,140 @@
-from flask import Flask, request, jsonify, send_file
-from flask_cors import CORS
-from calculation_engine import CalculationEngine
-from word_export import WordExporter
-from datetime import datetime
-import os
+import time
+_started = time.perf_counter()
+from startup import StartupReport
+
+startup_report = StartupReport(_started)
+# 记录各模块的导入耗时；python-docx/lxml（计算书导出）与 pyarrow（列式输出）均在首次使用时才加载
+with startup_report.timing_imports():
+    from flask import Flask, request, jsonify, send_file, Response, stream_with_context
+    from flask_cors import CORS
+    from calculation_engine import CalculationEngine
+    from batch_io import (DEFAULT_CHUNK_SIZE, ThroughputRegistry, iter_csv_rows, iter_ndjson_rows, iter_column_rows,
+                          stream_batch_ndjson, stream_batch_csv, array_to_list)
+    from sweep import ParameterSweep
+    from pipe_sizing import PipeSizingSolver
+    from result_cache import ResultCache, DEFAULT_MAXSIZE
+    from uncertainty import UncertaintyAnalysis, DEFAULT_PERCENTILES, DEFAULT_BINS
+    from sensitivity import SensitivityAnalysis
+    from route_profile import RouteProfile
+    from columnar import COLUMNAR_FORMATS, check_format, stream_batch_columnar, sweep_bytes
+    from batch_export import EXPORT_MODES, BatchExporter, prepare_cases, shared_exporter, summarize
+    from jobs import FINISHED, PRIORITIES, Artifact, JobQueue
+    from history import DEFAULT_PAGE_SIZE, HistoryStore
+    from project import ProjectRegistry
+    from datetime import datetime
+    import atexit
+    import json
+    import os
+    import sys
+    from urllib.parse import quote
+startup_report.mark("imports")
 
 app = Flask(__name__)
 # 配置CORS，允许所有来源（开发环境）
 CORS(app, resources={
     r"/api/*": {
         "origins": "*",
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "methods": ["GET", "POST", "DELETE", "OPTIONS"],
+        "allow_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["Content-Disposition", "ETag", "X-Task-Id", "X-Documents-Per-Second", "X-API-Version"]
     }
 })
 
 calculation_engine = CalculationEngine()
-word_exporter = WordExporter()
+result_cache = ResultCache(calculation_engine, maxsize=int(os.environ.get('RESULT_CACHE_SIZE', DEFAULT_MAXSIZE)))
+parameter_sweep = ParameterSweep(calculation_engine)
+pipe_sizing_solver = PipeSizingSolver(calculation_engine)
+uncertainty_analysis = UncertaintyAnalysis(calculation_engine)
+sensitivity_analysis = SensitivityAnalysis(calculation_engine)
+route_profile = RouteProfile(calculation_engine)
+batch_throughput = ThroughputRegistry()
+batch_exporter = BatchExporter()
+job_queue = JobQueue()
+history_store = HistoryStore()
+# 项目工作区的节点经结果缓存计算，相同输入的节点共用结果
+projects = ProjectRegistry(calculation_engine.registry, result_cache.calculate)
+# 退出时写入尚未落盘的计算历史
+atexit.register(history_store.flush)
+# 启动时预生成公式目录的响应内容
+calculation_engine.registry.catalog_payload()
+startup_report.mark("app_init")
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+export_throughput = ThroughputRegistry()
 
 @app.route('/api/formulas', methods=['GET'])
 def get_formulas():
-    """获取所有可用的公式列表（按侧栏分组）"""
-    formulas = {
-        "临界流速计算": [
-            {
-                "id": "liu_dezhong",
-                "name": "刘德忠公式",
-                "formula": "Vc = 9.5 * [g*D*(Δρ/ρ)*ω]^(1/3) * Cv^(1/6) * (ω_s/ω)^(1/6)",
-                "description": "本模型由刘德忠教授提出，是中国浆体管道设计中的主流经验公式之一。其核心思想基于浆体的整体沉降特性，通过引入加权平均沉速（$\\omega$）与静态界面沉速（$\\omega_s$）这两个关键实验参数，来综合反映固体颗粒群的干涉沉降行为。该公式尤其适用于细颗粒（如$d<2\\text{mm}$）含量较高、级配相对均匀的浆体，计算结果与中国工程实践贴合紧密。使用本公式的前提是需通过静态沉降柱试验获取可靠的$\\omega$与$\\omega_s$值。",
-                "parameters": [
-                    {"name": "D", "label": "D：管道内径，单位为 m", "unit": "m", "description": "管道内径", },
-                    {"name": "rho_g", "label": "$\\rho_g$：固体颗粒密度，单位为 t/m³", "unit": "t/m³", "description": "固体颗粒密度", },
-                    {"name": "rho_k", "label": "$\\rho_k$：载体液体密度，单位为 t/m³", "unit": "t/m³", "description": "载体液体密度", },
-                    {"name": "omega", "label": "$\\omega$：速度参数，单位为 m/s", "unit": "m/s", "description": "速度参数", },
-                    {"name": "Cv", "label": "$C_v$：体积浓度，单位为 decimal", "unit": "decimal", "description": "体积浓度", },
-                    {"name": "omega_s", "label": "$\\omega_s$：沉降速度，单位为 m/s", "unit": "m/s", "description": "沉降速度", },
-                    {"name": "g", "label": "g：重力加速度，单位为 m/s²", "unit": "m/s²", "description": "重力加速度", "default": 9.81},
-                    {"name": "coefficient_9_5", "label": "经验系数：默认值 9.5（无量纲）", "unit": "", "description": "经验系数", "default": 9.5}
-                ]
-            },
-            {
-                "id": "wasp",
-                "name": "E.J.瓦斯普公式",
-                "formula": "Vc = 3.113 * Cv^0.1858 * [2*g*D*(Δρ/ρ)]^(1/2) * (d85/D)^(1/6)",
-                "description": "本模型由E.J.Wasp等人提出，是国际上分析宽级配、非均质流临界流速的经典理论公式。其理论基础为两相流扩散模型，公式结构清晰体现了悬浮能量消耗与颗粒沉降间的平衡。它通过体积浓度（$C_v$）和相对密度差（$\\frac{\\Delta\\rho}{\\rho}$）来表征输送难度，并首次引入特征粒径（$d_{85}$）来量化粗颗粒对床层形成的影响。该公式特别适合粒径分布范围广、存在显著非均质输送特性的浆体。",
-                "parameters": [
-                    {"name": "D", "label": "D：管道内径，单位为 m", "unit": "m", "description": "管道内径", },
-                    {"name": "rho_g", "label": "$\\rho_g$：固体颗粒密度，单位为 t/m³", "unit": "t/m³", "description": "固体颗粒密度", },
-                    {"name": "rho_k", "label": "$\\rho_k$：载体液体密度，单位为 t/m³", "unit": "t/m³", "description": "载体液体密度", },
-                    {"name": "Cv", "label": "$C_v$：体积浓度，单位为 decimal", "unit": "decimal", "description": "体积浓度", },
-                    {"name": "d85", "label": "$d_{85}$：特征粒径，单位为 m", "unit": "m", "description": "d85特征粒径", },
-                    {"name": "g", "label": "g：重力加速度，单位为 m/s²", "unit": "m/s²", "description": "重力加速度", "default": 9.81},
-                    {"name": "coefficient_3_113", "label": "经验系数：默认值 3.113（无量纲）", "unit": "", "description": "经验系数", "default": 3.113}
-                ]
-            },
-            {
-                "id": "fei_xiangjun",
-                "name": "费祥俊公式",
-                "formula": "Vc = (2.26/√λ) * [gD*(Δρ/ρ)*ω]^(1/2) * Cv^0.25 * (d90/D)^(1/3)",
-                "description": "本模型由费祥俊教授建立，其显著特点是首次将管道沿程阻力系数（$\\lambda$）引入临界流速的计算，在理论上将输送能耗与维持颗粒悬浮的能耗进行了统一。公式采用特征粒径（$d_{90}$）来表征浆体颗粒群的粗细程度，并对浆体浓度（$C_v$）影响的刻画较为显著。该公式在理论上更为全面，尤其适合于长距离输送管道的水力坡降与系统设计。应用时，需根据管道材质、内壁状况及流态等条件合理确定或计算沿程阻力系数（$\\lambda$），此参数对计算结果有重要影响。",
-                "parameters": [
-                    {"name": "D", "label": "D：管道内径，单位为 m", "unit": "m", "description": "管道内径", },
-                    {"name": "rho_g", "label": "$\\rho_g$：固体颗粒密度，单位为 t/m³", "unit": "t/m³", "description": "固体颗粒密度", },
-                    {"name": "rho_k", "label": "$\\rho_k$：载体液体密度，单位为 t/m³", "unit": "t/m³", "description": "载体液体密度", },
-                    {"name": "Cv", "label": "$C_v$：体积浓度，单位为 decimal", "unit": "decimal", "description": "体积浓度", },
-                    {"name": "omega", "label": "$\\omega$：速度参数，单位为 m/s", "unit": "m/s", "description": "速度参数", },
-                    {"name": "d90", "label": "$d_{90}$：特征粒径，单位为 m", "unit": "m", "description": "d90特征粒径", },
-                    {"name": "lambda_coef", "label": "$\\lambda$：达西摩阻系数，无量纲", "unit": "", "description": "摩擦阻力系数", },
-                    {"name": "g", "label": "g：重力加速度，单位为 m/s²", "unit": "m/s²", "description": "重力加速度", "default": 9.81},
-                    {"name": "coefficient_2_26", "label": "经验系数：默认值 2.26（无量纲）", "unit": "", "description": "经验系数", "default": 2.26}
-                ]
-            },
-            {
-                "id": "kronodze_pressure",
-                "name": "B.C.克诺罗兹法",
-                "formula": "A) Qk=K·W·(1/ρg+G/W)；B) 按dp求DL；C) V_L=0.255β(1+2.48·³√(Cd)·⁴√(DL))",
-                "description": "A) 计算矿浆流量。其中：【输出结果】Qk 矿浆流量，单位为 m³/s；K 波动系数：默认值 1.1；【用户输入】G 干尾矿重量，单位为 t/h；$\\rho_g$ 尾矿相对密度，无量纲；W 矿浆中水重，单位为 t/h。B) 计算临界管径。当 dp≤0.07 mm 与 0.07<dp≤0.15 mm 分别采用不同公式，由 Qk 反解。【用户选择】dp 尾矿加权平均粒径，单位为 mm；$\\beta$ 固体物料相对密度修正系数：默认值 1；【输出结果】DL 临界管径，单位为 mm；Cd 重量砂水比 = G/W×100。C) 计算临界流速。【输出结果】V_L 临界流速，单位为 m/s。适用于有压隧洞泥沙运输、固体密度<3、粒径<0.4 mm 的浆体；体积浓度>30% 时偏差较大。",
-                "parameters": [
-                    {"name": "K", "label": "K：波动系数：默认值 1.1（无量纲）", "unit": "", "description": "波动系数", "default": 1.1},
-                    {"name": "G", "label": "G：干尾矿重量，单位为 t/h", "unit": "t/h", "description": "干尾矿重量", },
-                    {"name": "W", "label": "W：矿浆中水重，单位为 t/h", "unit": "t/h", "description": "矿浆中水重", },
-                    {"name": "rho_g", "label": "$\\rho_g$：尾矿相对密度，无量纲", "unit": "", "description": "尾矿相对密度", },
-                    {"name": "dp", "label": "dp：尾矿加权平均粒径，单位为 mm", "unit": "mm", "description": "尾矿加权平均粒径；≤0.07 与 0.07～0.15 对应不同公式", },
-                    {"name": "beta", "label": "$\\beta$：固体物料相对密度修正系数：默认值 1（无量纲）", "unit": "", "description": "固体物料相对密度修正系数", "default": 1.0}
-                ]
-            }
-        ],
-        "沿程摩阻损失": [
-            {
-                "id": "darcy_friction",
-                "name": "达西摩阻系数公式",
-                "formula": "λ = 64/Re（层流）或 Colebrook-White（湍流）",
-                "description": "达西摩阻系数 $\\lambda$ 反映管道阻力特性。层流时 $\\lambda = 64/Re$；湍流时可采用 Colebrook-White 公式或 Swamee-Jain 公式计算。本公式待完善实现。",
-                "parameters": [
-                    {"name": "Re", "label": "Re：雷诺数，无量纲", "unit": "", "description": "雷诺数", },
-                    {"name": "epsilon", "label": "ε：管道当量粗糙度，单位为 m", "unit": "m", "description": "管道壁面粗糙度", "default": 0.0002},
-                    {"name": "D", "label": "D：管道内径，单位为 m", "unit": "m", "description": "管道内径", }
-                ]
-            },
-            {
-                "id": "friction_loss",
-                "name": "沿程摩阻损失",
-                "formula": "i_k = λ·(V²·ρ_k)/(2gD·ρ_s)",
-                "description": "本公式用于计算似均质流态下浆体管道的沿程摩阻损失，是管道水力坡降与泵送扬程设计的基础。公式中 $i_k$ 为浆体沿程摩阻损失（mH₂O/m），$\\lambda$ 为达西摩阻系数，$V$ 为管道平均流速，$\\rho_k$ 为浆体密度，$D$ 为管道内径，$\\rho_s$ 为固体颗粒密度，$g$ 为重力加速度。适用于可视为似均质流的浆体管道水力计算。",
-                "parameters": [
-                    {"name": "lambda_coef", "label": "$\\lambda$：达西摩阻系数，无量纲", "unit": "", "description": "达西摩阻系数", },
-                    {"name": "V", "label": "V：平均流速，单位为 m/s", "unit": "m/s", "description": "管道内平均流速", },
-                    {"name": "rho_k", "label": "$\\rho_k$：浆体密度，单位为 t/m³", "unit": "t/m³", "description": "浆体密度", },
-                    {"name": "D", "label": "D：管道内径，单位为 m", "unit": "m", "description": "管道内径", },
-                    {"name": "rho_s", "label": "$\\rho_s$：固体颗粒密度，单位为 t/m³", "unit": "t/m³", "description": "固体颗粒密度", },
-                    {"name": "g", "label": "g：重力加速度，单位为 m/s²", "unit": "m/s²", "description": "重力加速度", "default": 9.81}
-                ]
-            },
-            {
-                "id": "density_mixing",
-                "name": "密度混合公式",
-                "formula": "ρ_k = 1/(C_w/ρ_g + (1-C_w)/ρ_s)",
-                "description": "本公式根据固体与载体的质量浓度和密度计算浆体密度，用于浆体管道水力计算中的密度参数确定。公式中 $\\rho_k$ 为浆体密度，$C_w$ 为固体质量浓度（0～1 小数），$\\rho_g$ 为载体流体密度（如水的密度），$\\rho_s$ 为固体颗粒密度。已知固体与载体密度及质量浓度时，可直接求得浆体密度。",
-                "parameters": [
-                    {"name": "C_w", "label": "$C_w$：固体质量浓度，无量纲（0～1）", "unit": "", "description": "固体质量浓度", },
-                    {"name": "rho_g", "label": "$\\rho_g$：载体流体密度，单位为 t/m³", "unit": "t/m³", "description": "载体流体密度", },
-                    {"name": "rho_s", "label": "$\\rho_s$：固体颗粒密度，单位为 t/m³", "unit": "t/m³", "description": "固体颗粒密度", }
-                ]
-            }
-        ],
-        "浆体加速流及消能": [
-            {
-                "id": "slurry_accel_energy",
-                "name": "浆体加速流及消能",
-                "formula": "(Z₁ + P₁/(ρkg)) - (Z₂ + P₂/(ρkg)) > iL",
-                "description": "浆体加速流及消能计算工具用于分析浆体在管道中流动时的能量平衡状态。基于水头平衡原理，比较浆体在流动过程中总机械能的差值（左侧）与沿程摩阻损失（右侧）的大小。若左侧 > 右侧，则满足加速流及消能条件；否则不满足。适用于管道输送、泵站设计、流体动力学分析等领域，用于评估浆体输送系统的运行状态和效率。",
-                "parameters": [
-                    {"name": "Z1", "label": "Z₁：起点位置水头，单位为 m", "unit": "m", "description": "浆体流动起点相对于基准面的垂直高度", },
-                    {"name": "Z2", "label": "Z₂：终点位置水头，单位为 m", "unit": "m", "description": "浆体流动终点相对于基准面的垂直高度", },
-                    {"name": "H1", "label": "H₁：起点压能浆体水头 P₁/(ρkg)，单位为 m", "unit": "m", "description": "起点压力能转换的水头高度", },
-                    {"name": "H2", "label": "H₂：终点压能浆体水头 P₂/(ρkg)，单位为 m", "unit": "m", "description": "终点压力能转换的水头高度", },
-                    {"name": "i", "label": "i：两点间沿程摩阻损失，单位为 m浆柱/m", "unit": "m浆柱/m", "description": "单位长度管道内的摩阻损失", },
-                    {"name": "L", "label": "L：管道长度，单位为 m", "unit": "m", "description": "起点至终点的管道总长度", }
-                ]
-            }
-        ]
+    """获取所有可用的公式列表（按侧栏分组，由公式注册表生成）。
+
+    目录在启动时预序列化并压缩；响应带强 ETag，客户端带 If-None-Match 重复请求时返回 304。
+    响应头 X-API-Version 为目录的 apiVersion，可不解析正文即判断版本。
+    """
+    payload = calculation_engine.registry.catalog_payload()
+    compressed = 'gzip' in request.accept_encodings
+    etag = payload.gzip_etag if compressed else payload.etag
+    if request.if_none_match.contains(payload.etag) or request.if_none_match.contains(payload.gzip_etag):
+        response = Response(status=304)
+    else:
+        response = Response(payload.gzip_body if compressed else payload.body, mimetype='application/json')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    # 每次使用前向服务器确认（目录变化时 ETag 随之变化），未变化时只返回 304
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-API-Version'] = str(payload.api_version)
+    return response
+
+def _cache_sizes():
+    """各缓存的当前大小；尚未加载的模块（计算书导出）不为此导入。
+    后台预热可能正在导入这些模块，模块对象已存在但尚未执行完，因此按属性取用"""
+    exporter_class = getattr(sys.modules.get('word_export'), 'WordExporter', None)
+    omml_cache_size = getattr(sys.modules.get('omml'), 'cache_size', None)
+    return {
+        "result_cache": result_cache.stats(),
+        "formula_catalog_bytes": len(calculation_engine.registry.catalog_payload().body),
+        **calculation_engine.cache_stats(),
+        "report_template": exporter_class is not None and exporter_class.template_ready(),
+        "compiled_formulas": omml_cache_size() if omml_cache_size is not None else 0,
+        "row_cost_estimates": len(parameter_sweep.executor.row_costs),
+        "batch_tasks": len(batch_throughput),
+        "export_tasks": len(export_throughput),
+        "projects": len(projects),
     }
-    # 供前端识别：apiVersion 3 为 临界流速计算/沿程摩阻损失/浆体加速流及消能
-    out = {"apiVersion": 3, **formulas}
-    return jsonify(out)
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """运行状态：进程运行时间、启动各阶段与预热耗时、引擎版本、各缓存大小与后台任务队列深度"""
+    return jsonify({
+        "success": True,
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime": startup_report.uptime(),
+        "started_at": datetime.fromtimestamp(startup_report.started_at).isoformat(timespec='seconds'),
+        "engine_version": calculation_engine.VERSION,
+        "api_version": calculation_engine.registry.api_version,
+        "startup": startup_report.as_dict(),
+        "caches": _cache_sizes(),
+        "queue": job_queue.stats(),
+        "history": history_store.stats(),
+    })
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """就绪检查（供启动器轮询，响应很小）：能应答即表示应用已初始化完毕，返回 200；
+    查询参数 warm=1 时还要求后台预热完成，未完成时返回 503 与 Retry-After"""
+    warm = startup_report.warm
+    is_ready = warm or request.args.get('warm') != '1'
+    response = jsonify({
+        "ready": is_ready,
+        "warm": warm,
+        "uptime": startup_report.uptime(),
+        "engine_version": calculation_engine.VERSION,
+    })
+    if not is_ready:
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+    return response
 
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
@@ -154,7 +145,8 @@ def calculate():
         parameters = data.get('parameters', {})
         locked_vc = data.get('locked_vc')  # 锁定的临界流速
         
-        result = calculation_engine.calculate(formula_id, parameters)
+        result = result_cache.calculate(formula_id, parameters)
+        history_store.record(formula_id, parameters, result, calculation_engine.VERSION)
         
         # 如果有锁定的临界流速，计算动画类型
         animation_type = None
@@ -191,9 +183,323 @@ def calculate():
             "error": str(e)
         }), 400
 
+@app.route('/api/cache', methods=['GET', 'DELETE'])
+def cache_stats():
+    """结果缓存统计（命中/未命中/淘汰次数）；DELETE 清空缓存"""
+    if request.method == 'DELETE':
+        result_cache.invalidate()
+    return jsonify({
+        "success": True,
+        "cache": result_cache.stats()
+    })
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """批量计算，以 NDJSON 流式返回每行结果。
+
+    支持三种输入：
+    1. JSON：{"formula_id", "rows": [参数字典, ...]} 或 {"formula_id", "columns": {参数名: 列表}}
+    2. NDJSON（Content-Type: application/x-ndjson）：每行一个参数字典，formula_id 放在查询参数中
+    3. 表格上传（multipart/form-data）：file 为 CSV/TSV，首行为参数名，formula_id 为表单字段
+
+    查询参数 format=arrow|parquet 时改为返回列式结果（每个参数、主结果与中间量各一列），默认 NDJSON。
+    """
+    try:
+        if request.files.get('file') is not None:
+            formula_id = request.form.get('formula_id') or request.args.get('formula_id')
+            rows = iter_csv_rows(request.files['file'].stream)
+        elif request.mimetype == 'application/x-ndjson':
+            formula_id = request.args.get('formula_id')
+            rows = iter_ndjson_rows(request.stream)
+        else:
+            data = request.get_json(silent=True) or {}
+            formula_id = data.get('formula_id') or request.args.get('formula_id')
+            if data.get('columns') is not None:
+                rows = iter_column_rows(data['columns'])
+            else:
+                rows = data.get('rows') or []
+        if formula_id not in calculation_engine.registry:
+            raise ValueError(f"未知的公式ID: {formula_id}")
+        chunk_size = int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须大于0")
+        output_format = check_format(request.args.get('format'))
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    task_id, meter = batch_throughput.create()
+    if output_format != "json":
+        mimetype, extension = COLUMNAR_FORMATS[output_format]
+        response = Response(
+            stream_with_context(stream_batch_columnar(calculation_engine, formula_id, rows, output_format,
+                                                      chunk_size, meter)),
+            mimetype=mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{formula_id}.{extension}"'
+        response.headers['X-Task-Id'] = task_id
+        return response
+    response = Response(
+        stream_with_context(stream_batch_ndjson(calculation_engine, formula_id, rows, chunk_size, meter)),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['X-Task-Id'] = task_id
+    return response
+
+@app.route('/api/calculate/batch/csv', methods=['POST'])
+def calculate_batch_csv():
+    """表格流水线：上传 CSV/TSV（file），逐块计算后以 CSV 流式返回，原表各列后追加主结果、中间量与错误列。
+
+    表单字段：formula_id，mapping（JSON，{表格列名: 参数名}，可选），chunk_size（可选）。
+    响应头 X-Task-Id 可用于 /api/calculate/batch/status/<id> 查询已处理行数与行/秒。
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is None:
+            raise ValueError("请上传 CSV/TSV 文件（字段 file）")
+        formula_id = request.form.get('formula_id') or request.args.get('formula_id')
+        if formula_id not in calculation_engine.registry:
+            raise ValueError(f"未知的公式ID: {formula_id}")
+        mapping = json.loads(request.form.get('mapping') or '{}')
+        if not isinstance(mapping, dict):
+            raise ValueError("列映射 mapping 需为对象")
+        chunk_size = int(request.form.get('chunk_size') or request.args.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须大于0")
+        task_id, meter = batch_throughput.create()
+        body = stream_batch_csv(calculation_engine, formula_id, upload.stream, mapping, chunk_size, meter)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    stem = os.path.splitext(upload.filename or 'batch')[0]
+    response = Response(stream_with_context(body), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{stem}_{formula_id}.csv"'
+    response.headers['X-Task-Id'] = task_id
+    return response
+
+@app.route('/api/calculate/batch/status/<task_id>', methods=['GET'])
+def calculate_batch_status(task_id):
+    """流式批量任务的进度：已处理行数、失败行数、耗时与行/秒"""
+    meter = batch_throughput.get(task_id)
+    if meter is None:
+        return jsonify({
+            "success": False,
+            "error": f"未找到任务 {task_id}"
+        }), 404
+    return jsonify({"success": True, **meter.as_dict()})
+
+@app.route('/api/sweep', methods=['POST'])
+def sweep():
+    """参数扫描：axes 为 {参数名: 取值列表或 {start, stop, num|step, log}}（或带 name 的有序列表），返回 N 维结果数组与统计。
+
+    format 为 arrow/parquet 时返回每个网格点一行的列式文件（默认包含中间量），统计信息写入文件元数据。
+    """
+    try:
+        data = request.json or {}
+        output_format = check_format(data.get('format'))
+        columnar = output_format != "json"
+        result = _run_sweep(data, output_format)
+        if columnar:
+            data, mimetype, filename = _sweep_file(result, output_format)
+            response = Response(data, mimetype=mimetype)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        return jsonify({"success": True, **_sweep_payload(result)})
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+def _run_sweep(data, output_format, progress=None):
+    return parameter_sweep.run(
+        data.get('formula_id'),
+        data.get('axes') or {},
+        fixed=data.get('fixed') or data.get('parameters'),
+        target=data.get('target'),
+        crossing_axis=data.get('crossing_axis'),
+        include_intermediate=bool(data.get('include_intermediate', output_format != "json")),
+        workers=data.get('workers'),
+        progress=progress,
+    )
+
+def _sweep_file(result, output_format):
+    """扫描结果 -> (列式文件字节串, MIME 类型, 文件名)"""
+    formula = calculation_engine.registry.get(result["formula_id"])
+    mimetype, extension = COLUMNAR_FORMATS[output_format]
+    if output_format == "arrow":
+        # 扫描结果整体输出为 IPC 文件格式，便于内存映射
+        mimetype, extension = "application/vnd.apache.arrow.file", "arrow"
+    return sweep_bytes(formula, result, output_format), mimetype, f"sweep_{formula.id}.{extension}"
+
+def _sweep_payload(result):
+    """扫描结果 -> JSON 响应内容"""
+    summary = result["summary"]
+    if "crossing" in summary:
+        summary["crossing"] = array_to_list(summary["crossing"])
+    return {
+        "formula_id": result["formula_id"],
+        "output": result["output"],
+        "unit": result["unit"],
+        "axis_names": result["axis_names"],
+        "axes": {name: grid.tolist() for name, grid in result["axes"].items()},
+        "shape": result["shape"],
+        "workers": result["workers"],
+        "values": array_to_list(result["values"]),
+        "intermediate": {key: array_to_list(column) for key, column in result["intermediate"].items()},
+        "summary": summary,
+    }
+
+@app.route('/api/inverse', methods=['POST'])
+def inverse_solve():
+    """反算：给定流量 Q 与目标流速比 target_ratio（V/Vc），求管径 D 或体积浓度 Cv。
+
+    parameters 为单个工况（返回标量），columns 为多工况列数据（返回列表）。
+    """
+    try:
+        data = request.json or {}
+        single = data.get('columns') is None
+        columns = data.get('parameters', {}) if single else data['columns']
+        unknown = data.get('unknown', 'D')
+        result = pipe_sizing_solver.solve(
+            data.get('formula_id'),
+            unknown,
+            columns,
+            data.get('target_ratio', columns.get('target_ratio')),
+            bounds=data.get('bounds'),
+        )
+        if single:
+            if result["errors"][0] is not None:
+                raise ValueError(result["errors"][0])
+            payload = {key: (array_to_list(value)[0] if key not in ("errors", "count") else value)
+                       for key, value in result.items()}
+            payload.pop("errors")
+            payload.pop("count")
+        else:
+            payload = {key: (array_to_list(value) if key not in ("errors", "count") else value)
+                       for key, value in result.items()}
+        return jsonify({
+            "success": True,
+            "formula_id": data.get('formula_id'),
+            "unknown": unknown,
+            "result": payload,
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+@app.route('/api/uncertainty', methods=['POST'])
+def uncertainty():
+    """不确定度分析：parameters 中每个参数可为数值或分布（normal/lognormal/uniform/empirical），返回主结果的分位数与直方图"""
+    try:
+        result = _run_uncertainty(request.json or {})
+        return jsonify({"success": True, **result})
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+def _run_uncertainty(data, progress=None):
+    return uncertainty_analysis.run(
+        data.get('formula_id'),
+        data.get('parameters') or {},
+        samples=data.get('samples', 100_000),
+        seed=data.get('seed'),
+        percentiles=data.get('percentiles') or DEFAULT_PERCENTILES,
+        bins=data.get('bins', DEFAULT_BINS),
+        target=data.get('target'),
+        workers=data.get('workers'),
+        progress=progress,
+    )
+
+@app.route('/api/sensitivity', methods=['POST'])
+def sensitivity():
+    """灵敏度分析：返回主结果及其对各参数的偏导数、弹性系数与影响排序。
+
+    parameters 为单个工况（返回标量），columns 为多工况列数据（返回列表）。
+    """
+    try:
+        data = request.json or {}
+        single = data.get('columns') is None
+        columns = data.get('parameters', {}) if single else data['columns']
+        result = sensitivity_analysis.run(data.get('formula_id'), columns)
+        if single:
+            if result["errors"][0] is not None:
+                raise ValueError(result["errors"][0])
+            pick = lambda values: array_to_list(values)[0]
+        else:
+            pick = array_to_list
+        return jsonify({
+            "success": True,
+            "formula_id": result["formula_id"],
+            "output": result["output"],
+            "quantity": result["quantity"],
+            "unit": result["unit"],
+            "value": pick(result["value"]),
+            "partials": {name: pick(values) for name, values in result["partials"].items()},
+            "elasticities": {name: pick(values) for name, values in result["elasticities"].items()},
+            "ranking": result["ranking"],
+            **({} if single else {"errors": result["errors"]}),
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+@app.route('/api/route', methods=['POST'])
+def route_profile_calculate():
+    """线路纵断面计算：逐段沿程损失、累计损失、水力坡降线与加速流管段。
+
+    JSON：{"stations": 行列表或列对象, "flow": 全线统一参数, "start_head"/"end_head", "method"}；
+    也可上传 CSV/TSV 桩号表（file），flow 以 JSON 字符串放在表单字段中。
+    """
+    try:
+        if request.files.get('file') is not None:
+            stations = list(iter_csv_rows(request.files['file'].stream))
+            data = {key: request.form.get(key) for key in ('start_head', 'end_head', 'method')}
+            data['flow'] = json.loads(request.form.get('flow') or '{}')
+        else:
+            data = request.json or {}
+            stations = data.get('stations') or []
+        end_head = data.get('end_head')
+        result = route_profile.run(
+            stations,
+            flow=data.get('flow'),
+            start_head=data.get('start_head'),
+            end_head=0.0 if end_head is None else end_head,
+            method=data.get('method') or None,
+        )
+        spans = result["spans"]
+        return jsonify({
+            "success": True,
+            "count": result["count"],
+            "stations": {key: array_to_list(result[key])
+                         for key in ("chainage", "Z", "cumulative_loss", "hgl", "pressure_head")},
+            "spans": {key: array_to_list(values) for key, values in spans.items()},
+            "accel_runs": result["accel_runs"],
+            "summary": result["summary"],
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
 @app.route('/api/export', methods=['POST', 'OPTIONS'])
 def export_word():
-    """导出Word文档"""
+    """导出Word文档：在内存中生成后直接返回。
+
+    默认同时在 exports 目录保留副本（后台写入）；请求字段 keep_copy=false 或环境变量 EXPORT_KEEP_COPY=0 时不保留。
+    """
     # 处理CORS预检请求
     if request.method == 'OPTIONS':
         response = jsonify({})
@@ -222,36 +528,14 @@ def export_word():
                 "error": "缺少必要的数据：formula_id, formula_info 或 result"
             }), 400
         
-        file_path = word_exporter.export(formula_id, formula_info, parameters, result)
-        
-        # 从文件路径中提取文件名（包含序号）
-        download_name = os.path.basename(file_path)
-        
-        response = send_file(
-            file_path,
-            as_attachment=True,
-            download_name=download_name,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
+        response = _export_response(formula_id, formula_info, parameters, result, data.get('keep_copy'))
         
         # 添加CORS头
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
         response.headers['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
-        # 确保文件名正确编码
-        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
         
         return response
-    except PermissionError as e:
-        import traceback
-        error_msg = f"文件权限错误: {str(e)}\n\n可能原因：\n1. 文件正在被其他程序（如Word）打开\n2. 目录没有写权限\n3. 文件被锁定\n\n请关闭可能打开该文件的程序后重试。"
-        print(f"导出Word文档失败: {error_msg}\n{traceback.format_exc()}")
-        response = jsonify({
-            "success": False,
-            "error": error_msg
-        })
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        return response, 400
     except Exception as e:
         import traceback
         error_msg = f"{str(e)}\n{traceback.format_exc()}"
@@ -263,8 +547,436 @@ def export_word():
         response.headers['Access-Control-Allow-Origin'] = '*'
         return response, 400
 
+def _export_response(formula_id, formula_info, parameters, result, keep_copy=None):
+    """在内存中生成计算书并直接返回；exports 目录中的副本由后台线程写入，不影响响应时间"""
+    word_exporter = shared_exporter()
+    download_name, document = word_exporter.render(formula_id, formula_info, parameters, result)
+    if word_exporter.keeps_copy(keep_copy):
+        word_exporter.save_copy_async(download_name, document)
+    response = Response(document, mimetype=DOCX_MIMETYPE)
+    # 文件名含中文，按 RFC 5987 编码（响应头只能为 latin-1）
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    return response
+
+@app.route('/api/export/batch', methods=['POST'])
+def export_word_batch():
+    """批量导出计算书：{"cases": [{formula_id, parameters, result?, formula_info?, title?}, ...], "mode", "workers"}。
+
+    mode=combined（默认）返回一份计算书，每个算例一章；mode=zip 以 ZIP 流式返回各算例的计算书。
+    各算例在进程池中并行生成；响应头 X-Task-Id 可用于 /api/export/batch/status/<id> 查询进度与份/秒，
+    combined 模式的响应头 X-Documents-Per-Second 直接给出吞吐量。
+    """
+    try:
+        mode, workers, cases = _batch_export_arguments(request.get_json(silent=True) or {})
+        task_id, meter = export_throughput.create()
+        download_name = _batch_export_filename(mode)
+        if mode == 'zip':
+            response = Response(stream_with_context(batch_exporter.stream_zip(cases, workers, meter)),
+                                mimetype='application/zip')
+        else:
+            document, _ = batch_exporter.combined(cases, workers, meter)
+            response = Response(document, mimetype=DOCX_MIMETYPE)
+            response.headers['X-Documents-Per-Second'] = str(summarize(meter)["documents_per_second"])
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    response.headers['X-Task-Id'] = task_id
+    return response
+
+def _batch_export_arguments(data):
+    """解析批量导出请求，返回 (mode, workers, 已补全的算例列表)"""
+    mode = data.get('mode') or 'combined'
+    if mode not in EXPORT_MODES:
+        raise ValueError(f"导出模式 {mode} 不支持，可选：{'、'.join(EXPORT_MODES)}")
+    workers = data.get('workers')
+    workers = int(workers) if workers is not None else None
+    cases = prepare_cases(calculation_engine.registry, result_cache.calculate, data.get('cases'))
+    return mode, workers, cases
+
+def _batch_export_filename(mode):
+    timestamp = datetime.now().strftime("%Y%m%d")
+    if mode == 'zip':
+        return f"长沙院浆体计算_批量_{timestamp}.zip"
+    return f"长沙院浆体计算_合订本_{timestamp}.docx"
+
+@app.route('/api/export/batch/status/<task_id>', methods=['GET'])
+def export_word_batch_status(task_id):
+    """批量导出任务的进度：已生成文档数、耗时与份/秒"""
+    meter = export_throughput.get(task_id)
+    if meter is None:
+        return jsonify({
+            "success": False,
+            "error": f"未找到任务 {task_id}"
+        }), 404
+    return jsonify({"success": True, **summarize(meter)})
+
+@app.route('/api/history', methods=['GET'])
+def history():
+    """计算历史，按时间倒序分页。
+
+    查询参数：formula_id；since、until（Unix 时间戳或 ISO 8601）；参数范围 <参数名>_min、<参数名>_max
+    （如 D_min=0.2&D_max=0.4）；page_size（默认 50）；before 为上一页返回的 next_before；
+    results=0 时不返回计算结果（列表更小）。
+    """
+    try:
+        args = request.args
+        ranges = {}
+        for key, value in args.items():
+            if key.endswith(('_min', '_max')):
+                low, high = ranges.get(key[:-4], (None, None))
+                ranges[key[:-4]] = (value, high) if key.endswith('_min') else (low, value)
+        try:
+            page_size = int(args.get('page_size', DEFAULT_PAGE_SIZE))
+            before = int(args['before']) if args.get('before') else None
+        except ValueError:
+            raise ValueError("page_size 与 before 需为整数")
+        page = history_store.query(
+            formula_id=args.get('formula_id'), ranges=ranges,
+            since=args.get('since'), until=args.get('until'),
+            before=before, page_size=page_size,
+            include_results=args.get('results', '1') != '0',
+        )
+        return jsonify({"success": True, **page})
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+def _history_not_found(entry_id):
+    return jsonify({
+        "success": False,
+        "error": f"未找到历史记录 {entry_id}"
+    }), 404
+
+@app.route('/api/history/<int:entry_id>', methods=['GET', 'DELETE'])
+def history_entry(entry_id):
+    """一条计算历史（含参数与结果）；DELETE 删除该记录"""
+    if request.method == 'DELETE':
+        if not history_store.delete(entry_id):
+            return _history_not_found(entry_id)
+        return jsonify({"success": True, "id": entry_id})
+    entry = history_store.get(entry_id)
+    if entry is None:
+        return _history_not_found(entry_id)
+    return jsonify({"success": True, "entry": entry})
+
+@app.route('/api/history/<int:entry_id>/export', methods=['POST'])
+def history_export(entry_id):
+    """按记录的参数与结果重新导出计算书，不重新计算；公式说明取当前公式目录"""
+    entry = history_store.get(entry_id)
+    if entry is None:
+        return _history_not_found(entry_id)
+    try:
+        formula_info = calculation_engine.registry.get(entry["formula_id"]).catalog()
+        data = request.get_json(silent=True) or {}
+        return _export_response(entry["formula_id"], formula_info, entry["parameters"], entry["result"],
+                                data.get('keep_copy'))
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+def _project_not_found(project_id):
+    return jsonify({
+        "success": False,
+        "error": f"未找到项目 {project_id}"
+    }), 404
+
+def _node_list(data):
+    nodes = data.get('nodes') or []
+    if not isinstance(nodes, list):
+        raise ValueError("节点列表 nodes 需为数组")
+    return nodes
+
+def _project_update(project, stats):
+    """修改后的响应：重算统计与结果有变化的节点"""
+    return jsonify({
+        "success": True,
+        "project_id": project.id,
+        "stats": stats,
+        "nodes": project.as_dict(set(stats["changed"]))["nodes"],
+    })
+
+@app.route('/api/projects', methods=['POST'])
+def create_project():
+    """新建项目工作区：{name, nodes: [{id, formula_id, parameters, links}, ...]}，链接写法见 project.Project，
+    节点只能链接到排在前面的节点；返回项目全部节点的结果"""
+    try:
+        data = request.json or {}
+        project, stats = projects.create(_node_list(data), data.get('name'))
+        return jsonify({"success": True, "project": project.as_dict(), "stats": stats}), 201
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+@app.route('/api/projects/<project_id>', methods=['GET', 'DELETE'])
+def project_detail(project_id):
+    """项目全部节点（按拓扑顺序）的参数、链接与结果；DELETE 删除项目"""
+    if request.method == 'DELETE':
+        if not projects.delete(project_id):
+            return _project_not_found(project_id)
+        return jsonify({"success": True, "project_id": project_id})
+    project = projects.get(project_id)
+    if project is None:
+        return _project_not_found(project_id)
+    return jsonify({"success": True, "project": project.as_dict()})
+
+@app.route('/api/projects/<project_id>/recompute', methods=['POST'])
+def project_recompute(project_id):
+    """全部节点重新计算（一般不需要：修改节点时已自动重算下游）"""
+    project = projects.get(project_id)
+    if project is None:
+        return _project_not_found(project_id)
+    return _project_update(project, project.recompute())
+
+@app.route('/api/projects/<project_id>/nodes', methods=['POST'])
+def project_add_nodes(project_id):
+    """向项目添加节点 {nodes: [...]}，只计算新节点"""
+    project = projects.get(project_id)
+    if project is None:
+        return _project_not_found(project_id)
+    try:
+        return _project_update(project, project.add_nodes(_node_list(request.json or {})))
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+@app.route('/api/projects/<project_id>/nodes/<node_id>', methods=['GET', 'POST', 'DELETE'])
+def project_node(project_id, node_id):
+    """单个节点。POST {parameters, links, replace} 修改参数（默认合并，值为 null 的参数删除）或链接，
+    只重算输入有变化的下游节点，返回重算统计与结果有变化的节点；DELETE 删除没有下游引用的节点"""
+    project = projects.get(project_id)
+    if project is None:
+        return _project_not_found(project_id)
+    try:
+        if request.method == 'GET':
+            return jsonify({"success": True, "node": project.node(node_id)})
+        if request.method == 'DELETE':
+            project.remove_node(node_id)
+            return jsonify({"success": True, "node_id": node_id})
+        data = request.json or {}
+        parameters, links = data.get('parameters'), data.get('links')
+        if parameters is not None and not isinstance(parameters, dict):
+            raise ValueError("参数 parameters 需为对象")
+        if links is not None and not isinstance(links, dict):
+            raise ValueError("链接 links 需为对象")
+        return _project_update(project, project.update_node(node_id, parameters, links, bool(data.get('replace'))))
+    except KeyError:
+        return jsonify({
+            "success": False,
+            "error": f"项目中没有节点 {node_id}"
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+def _calculate_job(data):
+    formula_id, parameters = data.get('formula_id'), data.get('parameters', {})
+    calculation_engine.registry.get(formula_id)
+
+    def run(job):
+        result = result_cache.calculate(formula_id, parameters)
+        history_store.record(formula_id, parameters, result, calculation_engine.VERSION)
+        return {"formula_id": formula_id, "result": result}
+    return run
+
+def _export_job(data):
+    formula_id = data.get('formula_id')
+    parameters = data.get('parameters', {})
+    result = data.get('result')
+    formula_info = data.get('formula_info', {})
+    if not formula_id or not formula_info or not result:
+        raise ValueError("缺少必要的数据：formula_id, formula_info 或 result")
+
+    def run(job):
+        job.report(0, 1, "正在生成计算书")
+        word_exporter = shared_exporter()
+        filename, document = word_exporter.render(formula_id, formula_info, parameters, result)
+        if word_exporter.keeps_copy(data.get('keep_copy')):
+            word_exporter.save_copy_async(filename, document)
+        return Artifact(filename, DOCX_MIMETYPE, data=document)
+    return run
+
+def _export_batch_job(data):
+    mode, workers, cases = _batch_export_arguments(data)
+
+    def run(job):
+        job.report(0, len(cases), "正在生成计算书")
+        _, meter = export_throughput.create()
+        if mode == 'zip':
+            content = b''.join(batch_exporter.stream_zip(cases, workers, meter, progress=job.report))
+            mimetype = 'application/zip'
+        else:
+            content, _ = batch_exporter.combined(cases, workers, meter, progress=job.report)
+            mimetype = DOCX_MIMETYPE
+        job.message = f"{summarize(meter)['documents_per_second']} 份/秒"
+        return Artifact(_batch_export_filename(mode), mimetype, data=content)
+    return run
+
+def _sweep_job(data):
+    output_format = check_format(data.get('format'))
+
+    def run(job):
+        job.report(0, None, "正在扫描")
+        result = _run_sweep(data, output_format, progress=job.report)
+        if output_format != "json":
+            content, mimetype, filename = _sweep_file(result, output_format)
+            return Artifact(filename, mimetype, data=content)
+        return _sweep_payload(result)
+    return run
+
+def _uncertainty_job(data):
+    def run(job):
+        job.report(0, None, "正在抽样计算")
+        return _run_uncertainty(data, progress=job.report)
+    return run
+
+# 任务类型 -> (由请求内容生成任务函数（先做基本校验）, 默认优先级)
+JOB_KINDS = {
+    "calculate": (_calculate_job, "interactive"),
+    "export": (_export_job, "normal"),
+    "export_batch": (_export_batch_job, "bulk"),
+    "sweep": (_sweep_job, "bulk"),
+    "uncertainty": (_uncertainty_job, "bulk"),
+}
+
+def _job_not_found(job_id):
+    return jsonify({
+        "success": False,
+        "error": f"未找到任务 {job_id}"
+    }), 404
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def jobs():
+    """后台任务：POST 提交任务，返回任务ID；GET 列出保留的任务与队列状态。
+
+    请求体：{"kind": calculate|export|export_batch|sweep|uncertainty, "priority"?: interactive|normal|bulk, ...}，
+    其余字段与对应的同步接口（/api/calculate、/api/export、/api/export/batch、/api/sweep、/api/uncertainty）相同。
+    默认优先级：calculate 为 interactive，export 为 normal，其余为 bulk。
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "success": True,
+            "queue": job_queue.stats(),
+            "jobs": [job.as_dict() for job in job_queue.jobs()],
+        })
+    try:
+        data = request.get_json(silent=True) or {}
+        kind = data.get('kind')
+        if kind not in JOB_KINDS:
+            raise ValueError(f"任务类型 {kind} 不支持，可选：{'、'.join(JOB_KINDS)}")
+        build, priority = JOB_KINDS[kind]
+        priority = data.get('priority') or priority
+        if priority not in PRIORITIES:
+            raise ValueError(f"任务优先级 {priority} 无效，可选：{'、'.join(PRIORITIES)}")
+        job = job_queue.submit(kind, build(data), priority)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    return jsonify({"success": True, **job.as_dict()}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """GET 查询任务状态与进度（完成后包含结果或产物信息）；DELETE 取消任务"""
+    if request.method == 'DELETE':
+        job = job_queue.cancel(job_id)
+    else:
+        job = job_queue.get(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+    return jsonify({"success": True, **job.as_dict()})
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """以 Server-Sent Events 推送任务进度：每次变化发送一条 progress 事件，结束时发送 done 事件后关闭"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+
+    def generate():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                state = job.as_dict()
+                event = "done" if state["status"] in FINISHED else "progress"
+                yield f"event: {event}\ndata: {json.dumps(state, ensure_ascii=False)}\n\n"
+                if event == "done":
+                    return
+            elif job_queue.wait(job, version, timeout=15) == version and job.status not in FINISHED:
+                # 长时间无进度时发送注释行保持连接
+                yield ": keep-alive\n\n"
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/jobs/<job_id>/artifact', methods=['GET'])
+def job_artifact(job_id):
+    """下载已完成任务的产物文件"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+    artifact = job.artifact
+    if artifact is None:
+        return jsonify({
+            "success": False,
+            "error": f"任务 {job_id} 没有可下载的文件（状态：{job.status}）"
+        }), 409 if job.status not in FINISHED else 404
+    if artifact.path is not None:
+        response = send_file(artifact.path, mimetype=artifact.mimetype)
+    else:
+        response = Response(artifact.data, mimetype=artifact.mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(artifact.filename)}"
+    return response
+
+def _warm_up_word_export():
+    """导入 python-docx 并生成计算书模板，编译各公式的数学公式"""
+    shared_exporter()._new_document()
+    from omml import formula_element
+    for formula in calculation_engine.registry:
+        formula_element(formula.formula)
+
+# 服务开始监听后在后台依次执行的预热任务
+WARMUP_TASKS = [
+    ("word_export", _warm_up_word_export),
+]
+
+def _on_listening():
+    """服务已开始监听：输出启动报告，并在后台预热首次导出所需的模块"""
+    startup_report.mark("listening")
+    startup_report.print()
+    if os.environ.get('BACKEND_WARMUP', '1') != '0':
+        startup_report.start_warmup(WARMUP_TASKS)
+    else:
+        startup_report.skip_warmup()
+
 if __name__ == '__main__':
+    # 打包后的程序使用进程池（不确定度分析）时需要，避免子进程重复启动服务
+    import multiprocessing
+    multiprocessing.freeze_support()
     port = int(os.environ.get('PORT', 5000))
-    # 仅当设置 FLASK_DEBUG=1 时开启 debug，避免打包后仍以开发服务器运行
+    # 仅当设置 FLASK_DEBUG=1 时开启 debug，使用 Flask 开发服务器（自动重载）；
+    # 否则以生产模式运行（固定线程池、长连接、优雅退出），SERVER_MODE=development 可强制使用开发服务器
     debug = os.environ.get('FLASK_DEBUG', '0') == '1'
-    app.run(host='127.0.0.1', port=port, debug=debug, use_reloader=debug)
+    if debug or os.environ.get('SERVER_MODE') == 'development':
+        # 开发服务器在 app.run 内打印 "Running on"，此处的时间点略早于实际开始监听
+        _on_listening()
+        app.run(host='127.0.0.1', port=port, debug=debug, use_reloader=debug)
+    else:
+        from server import serve
+        serve(app, host='127.0.0.1', port=port, on_listening=_on_listening)
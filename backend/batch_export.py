@@ -0,0 +1,152 @@
+"""批量导出计算书：多个算例在进程池中并行生成，合并为一份分章计算书，或逐个打包为 ZIP 流式返回"""
+import functools
+import json
+import zipfile
+
+from batch_io import ChunkSink, Throughput
+from parallel import DEFAULT_EXECUTOR
+
+# 单次批量导出的算例数上限
+MAX_CASES = 1000
+
+EXPORT_MODES = ("combined", "zip")
+
+_shared_exporter = None
+
+
+def shared_exporter():
+    """进程内共用的 WordExporter：首次调用时才导入 word_export（python-docx、lxml），文档模板随之在每个进程生成一次"""
+    global _shared_exporter
+    if _shared_exporter is None:
+        from word_export import WordExporter
+        _shared_exporter = WordExporter()
+    return _shared_exporter
+
+
+def prepare_cases(registry, calculate, cases):
+    """校验并补全算例，返回 [{formula_id, formula_info, parameters, result, title}, ...]。
+
+    每个算例至少给出 formula_id 与 parameters；未给出 result 时用 calculate(formula_id, parameters) 计算，
+    未给出 formula_info 时取公式目录中的条目。任一算例有误时报出其序号。
+    """
+    if not isinstance(cases, list) or not cases:
+        raise ValueError("算例列表 cases 不能为空")
+    if len(cases) > MAX_CASES:
+        raise ValueError(f"算例数 {len(cases)} 超过上限 {MAX_CASES}")
+    prepared = []
+    for k, case in enumerate(cases, 1):
+        try:
+            if not isinstance(case, dict):
+                raise ValueError("算例需为对象")
+            formula_id = case.get('formula_id')
+            formula = registry.get(formula_id)
+            parameters = case.get('parameters') or {}
+            result = case.get('result') or calculate(formula_id, parameters)
+            formula_info = case.get('formula_info') or formula.catalog()
+        except ValueError as e:
+            raise ValueError(f"第 {k} 个算例：{e}")
+        prepared.append({
+            "formula_id": formula_id,
+            "formula_info": formula_info,
+            "parameters": parameters,
+            "result": result,
+            "title": case.get('title') or f"算例{k}：{formula_info.get('name', formula_id)}",
+        })
+    return prepared
+
+
+def render_range(mode, cases, start, stop):
+    """生成 cases[start:stop]（见 render_cases）"""
+    return render_cases(mode, cases[start:stop])
+
+
+def render_cases(mode, cases):
+    """生成各算例：mode 为 zip 时返回各算例的 docx 字节串，combined 时返回各算例计算内容的 XML"""
+    exporter = shared_exporter()
+    rendered = []
+    for case in cases:
+        arguments = (case["formula_id"], case["formula_info"], case["parameters"], case["result"])
+        if mode == "zip":
+            rendered.append(exporter.to_bytes(exporter.build_document(*arguments)))
+        else:
+            rendered.append(exporter.render_sections(*arguments))
+    return rendered
+
+
+class BatchExporter:
+    """批量计算书导出。
+
+    首个算例在本进程生成并计时，预计总耗时足够长时其余算例分块交给共享进程池（见 parallel.ParallelExecutor），
+    结果按算例顺序合并。进度与吞吐量（份/秒）记录在 Throughput 中，rows 即已生成的文档数。
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor or DEFAULT_EXECUTOR
+
+    def _render(self, mode, cases, workers):
+        return self.executor.run(
+            ("word_export", mode), len(cases),
+            functools.partial(render_range, mode, cases),
+            # 每个进程池任务只传入自己那段算例，而非全部算例
+            functools.partial(render_cases, mode),
+            workers=workers, local_rows=1,
+            split=lambda start, stop: cases[start:stop],
+        )
+
+    def combined(self, cases, workers=None, meter=None, progress=None):
+        """生成一份计算书，每个算例一章；返回 (docx 字节串, 实际使用的进程数)。
+
+        progress(done, total) 在每块完成后调用（如后台任务报告进度，并可在此抛出异常以中止）。
+        """
+        meter = meter or Throughput()
+        chapters = []
+        chunks = self._render("combined", cases, workers)
+        for sections in chunks:
+            chapters.extend(zip((case["title"] for case in cases[len(chapters):]), sections))
+            meter.update(len(sections), 0)
+            if progress is not None:
+                progress(len(chapters), len(cases))
+        exporter = shared_exporter()
+        data = exporter.to_bytes(exporter.combine(chapters))
+        meter.finish()
+        return data, chunks.workers
+
+    def stream_zip(self, cases, workers=None, meter=None, progress=None):
+        """逐块生成各算例的计算书，以 ZIP（不压缩，docx 本身已压缩）逐块产出字节串；
+        文件名为 序号_公式名称.docx，最后附 summary.json（文档数、耗时、份/秒）"""
+        meter = meter or Throughput()
+        sink = ChunkSink()
+        archive = zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED)
+        names = [f"{k:03d}_{shared_exporter().safe_name(case['formula_info'].get('name', case['formula_id']))}.docx"
+                 for k, case in enumerate(cases, 1)]
+        done = 0
+        chunks = self._render("zip", cases, workers)
+        try:
+            for documents in chunks:
+                for data in documents:
+                    archive.writestr(names[done], data)
+                    done += 1
+                meter.update(len(documents), 0)
+                if progress is not None:
+                    progress(done, len(cases))
+                yield sink.drain()
+        except Exception as e:
+            meter.finish(str(e))
+            raise
+        meter.finish()
+        summary = {**summarize(meter), "workers": chunks.workers, "files": names}
+        archive.writestr("summary.json", json.dumps(summary, ensure_ascii=False, indent=2))
+        archive.close()
+        yield sink.drain()
+
+
+def summarize(meter):
+    """以文档数表示的进度与吞吐量"""
+    stats = meter.as_dict()
+    return {
+        "documents": stats["rows"],
+        "elapsed": stats["elapsed"],
+        "documents_per_second": stats["rows_per_second"],
+        "done": stats["done"],
+        "error": stats["error"],
+    }
@@ -0,0 +1,348 @@
+"""批量计算的输入读取、分块与流式输出工具"""
+import csv
+import io
+import json
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+# 每块行数：兼顾向量化收益与内存占用
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def iter_chunks(iterable, size=DEFAULT_CHUNK_SIZE):
+    """将任意可迭代对象按固定行数切块，逐块产出列表"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_ndjson_rows(stream):
+    """逐行读取 NDJSON 输入流，每行一个参数字典；空行跳过，格式错误的行产出异常对象"""
+    for raw in stream:
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"JSON 格式错误: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield ValueError("每行必须为参数对象")
+            continue
+        yield row
+
+
+def read_csv_table(binary_stream, encoding='utf-8-sig'):
+    """打开上传的 CSV/TSV 表格，返回 (表头, 逐行单元格列表的迭代器, 方言)；按行惰性读取，空行跳过"""
+    text = io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+    first = text.readline()
+    dialect = 'excel-tab' if '\t' in first else 'excel'
+    header = next(csv.reader([first], dialect=dialect), [])
+    header = [name.strip() for name in header]
+    records = (cells for cells in csv.reader(text, dialect=dialect) if any(cell.strip() for cell in cells))
+    return header, records, dialect
+
+
+def iter_csv_rows(binary_stream, encoding='utf-8-sig'):
+    """逐行读取上传的 CSV/TSV 表格（首行为参数名），空单元格视为未填写"""
+    header, records, _ = read_csv_table(binary_stream, encoding)
+    for cells in records:
+        yield {name: cell.strip() for name, cell in zip(header, cells) if name and cell.strip() != ''}
+
+
+def rows_to_columns(rows, options=(), accepted=None):
+    """将一块参数字典转为列数组输入；无法解析为数值的单元格记为该行的错误。
+
+    options 为公式的选项名（如 method），其取值按原样保留，不做数值转换。
+    给出 accepted（公式的参数名与选项名）时，其余键（如算例编号、备注列）忽略，与单次计算一致。
+    """
+    names = []
+    seen = set()
+    for row in rows:
+        if isinstance(row, dict):
+            for name in row:
+                if accepted is not None and name not in accepted:
+                    continue
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+    columns = {name: ([None] if name in options else [math.nan]) * len(rows) for name in names}
+    row_errors = [None] * len(rows)
+    for i, row in enumerate(rows):
+        if isinstance(row, Exception):
+            row_errors[i] = str(row)
+            continue
+        for name, value in row.items():
+            if value is None or name not in columns:
+                continue
+            if name in options:
+                columns[name][i] = value
+                continue
+            try:
+                columns[name][i] = float(value)
+            except (TypeError, ValueError):
+                row_errors[i] = f"参数 {name} 不是有效数值: {value}"
+    return columns, row_errors
+
+
+def _json_line(obj):
+    return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class ChunkSink:
+    """只追加的输出缓冲：写入的字节可随时取走，tell() 始终返回累计字节数（Parquet 页脚、ZIP 目录中的偏移依赖于此）。
+
+    不支持 seek，zipfile 等写入方据此按流式方式写出。
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class Throughput:
+    """流式批量任务的进度与吞吐量（行/秒），可在任务进行中读取"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.rows = 0
+        self.failed = 0
+        self.done = False
+        self.error = None
+
+    def update(self, rows, failed):
+        self.rows += rows
+        self.failed += failed
+        self.elapsed = time.perf_counter() - self.started
+
+    def finish(self, error=None):
+        self.elapsed = time.perf_counter() - self.started
+        self.done = True
+        self.error = error
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "failed": self.failed,
+            "elapsed": round(self.elapsed, 6),
+            "rows_per_second": round(self.rows / self.elapsed, 1) if self.elapsed > 0 else None,
+            "done": self.done,
+            "error": self.error,
+        }
+
+
+class ThroughputRegistry:
+    """最近若干个流式任务的吞吐量记录（有界，线程安全），供响应开始后按任务ID查询"""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self):
+        """登记一个新任务，返回 (任务ID, Throughput)"""
+        task_id = uuid.uuid4().hex
+        meter = Throughput()
+        with self._lock:
+            self._entries[task_id] = meter
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return task_id, meter
+
+    def get(self, task_id):
+        with self._lock:
+            return self._entries.get(task_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def check_row_count(batch, chunk):
+    """批量结果的行数须与输入块一致，否则整块按出错处理（每个输入行仍对应一行输出）"""
+    if batch["count"] != len(chunk):
+        raise ValueError(f"批量结果行数 {batch['count']} 与输入行数 {len(chunk)} 不一致")
+
+
+def stream_batch_ndjson(engine, formula_id, rows, chunk_size=DEFAULT_CHUNK_SIZE, meter=None):
+    """分块批量计算并逐行产出 NDJSON 字节串；每行独立报告成功或错误，最后一行为汇总（含行/秒）"""
+    meter = meter or Throughput()
+    formula = engine.registry.get(formula_id)
+    accepted = set(formula.parameter_names) | set(formula.option_names)
+    offset = 0
+    failed = 0
+    for chunk in iter_chunks(rows, chunk_size):
+        columns, row_errors = rows_to_columns(chunk, formula.option_names, accepted)
+        try:
+            # 按块内行数计算：块内没有可识别的参数（拼错的键、只有选项或全为格式错误的行）时也逐行报告
+            batch = engine.calculate_batch(formula_id, columns, n=len(chunk))
+            check_row_count(batch, chunk)
+            outcomes = engine.iter_batch_rows(formula_id, batch)
+        except ValueError as e:
+            # 整块无法计算（如同一块内选项取值不一致），块内各行均报告该错误
+            outcomes = ((i, None, str(e)) for i in range(len(chunk)))
+        lines = []
+        for i, result, error in outcomes:
+            error = row_errors[i] or error
+            if error is not None:
+                failed += 1
+                lines.append(_json_line({"index": offset + i, "success": False, "error": error}))
+            else:
+                lines.append(_json_line({"index": offset + i, "success": True, "result": result}))
+        meter.update(len(chunk), failed - meter.failed)
+        offset += len(chunk)
+        yield b''.join(lines)
+    meter.finish()
+    yield _json_line({"done": True, "count": offset, "failed": failed,
+                      "rows_per_second": meter.as_dict()["rows_per_second"]})
+
+
+def _csv_cell(value):
+    """输出单元格：NaN/None 为空，浮点数保留 12 位有效数字"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return '' if math.isnan(value) else f"{value:.12g}"
+    return value
+
+
+def stream_batch_csv(engine, formula_id, binary_stream, mapping=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                     meter=None, encoding='utf-8-sig'):
+    """CSV/TSV 流水线：逐块读取上传表格、按列映射取参数、批量计算，并逐块产出结果表格的字节串。
+
+    mapping 为 {表格列名: 参数名}，未映射的列按同名参数匹配，其余列原样保留在输出中；
+    输出为原表各列之后依次追加主结果、各中间量与 error 列，以 UTF-8（带 BOM）编码，便于 Excel 直接打开。
+    表头与列映射在调用时立即校验（出错抛出 ValueError），返回逐块产出的生成器，内存占用与表格行数无关。
+    """
+    formula = engine.registry.get(formula_id)
+    header, records, dialect = read_csv_table(binary_stream, encoding)
+    mapping = dict(mapping or {})
+    accepted = set(formula.parameter_names) | set(formula.option_names)
+    for source, target in mapping.items():
+        if source not in header:
+            raise ValueError(f"列映射中的列 {source} 不在表头中")
+        if target not in accepted:
+            raise ValueError(f"列映射目标 {target} 不是公式 {formula_id} 的参数")
+    columns = {}
+    for index, name in enumerate(header):
+        target = mapping.get(name, name)
+        if target in accepted:
+            if target in columns:
+                raise ValueError(f"参数 {target} 对应了多个列")
+            columns[target] = index
+    if not columns:
+        raise ValueError(f"表头中没有公式 {formula_id} 的参数，请提供列映射")
+    meter = meter or Throughput()
+
+    def encode(lines, first=False):
+        buffer = io.StringIO()
+        if first:
+            buffer.write('\ufeff')
+        csv.writer(buffer, dialect=dialect).writerows(lines)
+        return buffer.getvalue().encode('utf-8')
+
+    def generate():
+        out_header = None
+        try:
+            for chunk in iter_chunks(records, chunk_size):
+                rows = [{name: cells[index].strip() for name, index in columns.items()
+                         if index < len(cells) and cells[index].strip() != ''} for cells in chunk]
+                values, row_errors = rows_to_columns(rows, formula.option_names)
+                try:
+                    batch = engine.calculate_batch(formula_id, values, n=len(chunk))
+                    check_row_count(batch, chunk)
+                    errors = [row_error or error for row_error, error in zip(row_errors, batch["errors"])]
+                except ValueError as e:
+                    batch = None
+                    errors = [row_error or str(e) for row_error in row_errors]
+                if out_header is None:
+                    names = list(engine.calculate_batch(formula_id, {})["intermediate"]) if batch is None \
+                        else list(batch["intermediate"])
+                    # 中间量与原表列重名时加前缀区分
+                    labels = [f"intermediate.{name}" if name in header else name for name in names]
+                    out_header = (header + [formula.output] + labels + ["error"], names)
+                    lines = [out_header[0]]
+                else:
+                    lines = []
+                names = out_header[1]
+                if batch is None:
+                    outputs = [[None] * len(chunk)] * (len(names) + 1)
+                else:
+                    outputs = [array_to_list(batch[formula.output])]
+                    outputs += [array_to_list(batch["intermediate"][name]) for name in names]
+                width = len(header)
+                for i, cells in enumerate(chunk):
+                    cells = (cells + [''] * width)[:width]
+                    if errors[i] is not None:
+                        lines.append(cells + [''] * (len(names) + 1) + [errors[i]])
+                    else:
+                        lines.append(cells + [_csv_cell(column[i]) for column in outputs] + [''])
+                meter.update(len(chunk), sum(error is not None for error in errors))
+                yield encode(lines, first=bool(lines) and lines[0] is out_header[0])
+            if out_header is None:
+                yield encode([header + [formula.output, "error"]], first=True)
+        except Exception as e:
+            meter.finish(str(e))
+            raise
+        meter.finish()
+
+    return generate()
+
+
+def iter_column_rows(columns):
+    """将列式输入（{参数名: 列表或标量}）按行展开为参数字典，便于统一分块；长度不一致时立即报错"""
+    n = None
+    for name, value in columns.items():
+        if isinstance(value, (list, tuple)):
+            if n is not None and len(value) != n:
+                raise ValueError(f"批量参数长度不一致：{name} 有 {len(value)} 行，应为 {n} 行")
+            n = len(value)
+    if n is None:
+        n = 1
+    return ({name: (value[i] if isinstance(value, (list, tuple)) else value)
+             for name, value in columns.items()}
+            for i in range(n))
+
+
+def array_to_list(values):
+    """将 NumPy 数组转为可 JSON 序列化的嵌套列表，NaN/Inf 记为 None"""
+    values = np.asarray(values)
+    if values.dtype.kind != 'f':
+        return values.tolist()
+    return np.where(np.isfinite(values), values, None).tolist()
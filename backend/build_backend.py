@@ -124,7 +124,26 @@ def main():
         '--hidden-import=docx',
         '--hidden-import=numpy',
         '--hidden-import=calculation_engine',
+        '--hidden-import=formula_registry',
         '--hidden-import=word_export',
+        '--hidden-import=batch_io',
+        '--hidden-import=sweep',
+        '--hidden-import=solvers',
+        '--hidden-import=pipe_sizing',
+        '--hidden-import=result_cache',
+        '--hidden-import=uncertainty',
+        '--hidden-import=sensitivity',
+        '--hidden-import=friction',
+        '--hidden-import=route_profile',
+        '--hidden-import=columnar',
+        '--hidden-import=parallel',
+        '--hidden-import=server',
+        '--hidden-import=batch_export',
+        '--hidden-import=jobs',
+        '--hidden-import=omml',
+        '--hidden-import=startup',
+        '--hidden-import=history',
+        '--hidden-import=project',
         '--collect-all=flask',
         '--collect-all=flask_cors',
     ]
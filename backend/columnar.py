@@ -0,0 +1,191 @@
+"""列式结果输出：将批量计算与参数扫描结果写为 Apache Arrow IPC 或 Parquet（需可选依赖 pyarrow）
+
+每个参数、主结果与中间量各占一列，pandas/Polars 可直接按列读取而无需逐行解析 JSON。
+"""
+import json
+
+import numpy as np
+
+from batch_io import DEFAULT_CHUNK_SIZE, ChunkSink, Throughput, check_row_count, iter_chunks, rows_to_columns
+
+# 输出格式 -> (流式响应的 MIME 类型, 文件扩展名)
+COLUMNAR_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _pyarrow():
+    """按需导入 pyarrow；未安装时给出明确提示，JSON 输出不受影响"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("输出 Arrow/Parquet 格式需要安装 pyarrow（pip install pyarrow）")
+    return pyarrow
+
+
+def check_format(output_format):
+    """校验输出格式；json 以外的格式同时检查 pyarrow 是否可用"""
+    if output_format in (None, "", "json"):
+        return "json"
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"输出格式 {output_format} 不支持，可选：json、{'、'.join(COLUMNAR_FORMATS)}")
+    _pyarrow()
+    return output_format
+
+
+def _column(pa, values):
+    """NumPy 数组 -> Arrow 数组；数值列直接按缓冲区转换（NaN 保留为 NaN），字符串/对象列中的空值记为 null"""
+    values = np.asarray(values)
+    if values.dtype == object:
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    return pa.array(values)
+
+
+def _writer(pa, output_format, sink, schema, stream=True):
+    handle = pa.PythonFile(sink, mode='w')
+    if output_format == "parquet":
+        return pa.parquet.ParquetWriter(handle, schema)
+    if stream:
+        return pa.ipc.new_stream(handle, schema)
+    return pa.ipc.new_file(handle, schema)
+
+
+def _conform(pa, table, schema):
+    """按首块确定的表结构对齐后续各块：缺少的列补 null，类型不同的列转换类型"""
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def batch_table(formula, cols, options, batch):
+    """单块批量结果 -> pyarrow.Table：各参数列（已补齐默认值）、选项列、主结果、中间量、求解信息与 error 列。
+
+    中间量与参数重名时列名加 "intermediate." 前缀。
+    """
+    pa = _pyarrow()
+    names, arrays = [], []
+    for name in formula.parameter_names:
+        names.append(name)
+        arrays.append(_column(pa, cols[name]))
+    for name, value in options.items():
+        names.append(name)
+        arrays.append(pa.array([value] * batch["count"], type=pa.string()))
+    names.append(formula.output)
+    arrays.append(_column(pa, batch[formula.output]))
+    for key, column in batch["intermediate"].items():
+        names.append(f"intermediate.{key}" if key in names else key)
+        arrays.append(_column(pa, column))
+    solver = batch.get("solver")
+    if solver is not None:
+        for key in ("iterations", "residual"):
+            names.append(f"solver.{key}")
+            arrays.append(_column(pa, solver[key]))
+    names.append("error")
+    arrays.append(pa.array(list(batch["errors"]), type=pa.string()))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _metadata(formula, unit, **extra):
+    return {
+        b"formula_id": formula.id.encode('utf-8'),
+        b"output": formula.output.encode('utf-8'),
+        b"unit": unit.encode('utf-8'),
+        **{key.encode('utf-8'): json.dumps(value, ensure_ascii=False).encode('utf-8') for key, value in extra.items()},
+    }
+
+
+def stream_batch_columnar(engine, formula_id, rows, output_format, chunk_size=DEFAULT_CHUNK_SIZE, meter=None):
+    """分块批量计算并以 Arrow IPC 流（每块一个 record batch）或 Parquet（每块一个 row group）逐块产出字节串"""
+    pa = _pyarrow()
+    formula = engine.registry.get(formula_id)
+    accepted = set(formula.parameter_names) | set(formula.option_names)
+    meter = meter or Throughput()
+    sink = ChunkSink()
+    writer = None
+    schema = None
+    try:
+        for chunk in iter_chunks(rows, chunk_size):
+            columns, row_errors = rows_to_columns(chunk, formula.option_names, accepted)
+            try:
+                # 按块内行数计算：块内没有可识别的参数时也逐行输出
+                columns, options = formula.split_options(columns)
+                cols, n = engine.prepare_columns(columns, len(chunk))
+                cols, _ = formula.prepare_columns(cols, n)
+                batch = engine.calculate_batch(formula_id, {**cols, **options}, n=n)
+                check_row_count(batch, chunk)
+            except ValueError as e:
+                # 整块无法计算（如同一块内选项取值不一致），块内各行均报告该错误
+                cols, options, batch = _failed_chunk(engine, formula, columns, len(chunk), str(e))
+            batch["errors"] = [row_error or error for row_error, error in zip(row_errors, batch["errors"])]
+            table = batch_table(formula, cols, options, batch)
+            if writer is None:
+                schema = table.schema.with_metadata(_metadata(formula, batch["unit"]))
+                writer = _writer(pa, output_format, sink, schema)
+            writer.write_table(_conform(pa, table, schema))
+            meter.update(batch["count"], sum(error is not None for error in batch["errors"]))
+            yield sink.drain()
+        if writer is None:
+            # 没有输入行时输出只含参数列的空表
+            schema = pa.schema([(name, pa.float64()) for name in formula.parameter_names])
+            writer = _writer(pa, output_format, sink, schema.with_metadata(_metadata(formula, "")))
+        writer.close()
+    except Exception as e:
+        meter.finish(str(e))
+        raise
+    meter.finish()
+    yield sink.drain()
+
+
+def _failed_chunk(engine, formula, columns, n, error):
+    """整块出错时的占位结果：参数列照常输出，主结果、中间量与求解信息为 NaN，各行 error 为该错误；
+    列与正常结果一致，因此首块出错时后续各块的列也能对齐"""
+    numeric = {name: value for name, value in columns.items() if name not in formula.option_names}
+    cols, _ = engine.prepare_columns(numeric, n)
+    cols, _ = formula.prepare_columns(cols, n)
+    template = engine.calculate_batch(formula.id, {})
+    # 布尔型结果（如加速流判断）以空值占位，避免 NaN 转换为 true
+    output = template[formula.output]
+    batch = {
+        formula.output: np.full(n, np.nan) if output.dtype.kind == 'f' else np.full(n, None, dtype=object),
+        "unit": template["unit"],
+        "intermediate": {key: np.full(n, np.nan) for key in template["intermediate"]},
+        "errors": [error] * n,
+        "count": n,
+    }
+    if template.get("solver") is not None:
+        batch["solver"] = {key: np.full(n, np.nan) for key in ("iterations", "residual")}
+    return cols, {}, batch
+
+
+def sweep_table(formula, result):
+    """参数扫描结果 -> pyarrow.Table：每个网格点一行（C 顺序，与 values 展平顺序一致），
+    各扫描参数、主结果与中间量各一列；扫描轴、形状与统计信息写入表的元数据"""
+    pa = _pyarrow()
+    names = result["axis_names"]
+    grids = np.meshgrid(*(result["axes"][name] for name in names), indexing='ij')
+    columns = {name: grid.ravel() for name, grid in zip(names, grids)}
+    columns[formula.output] = np.asarray(result["values"]).ravel()
+    for key, values in result["intermediate"].items():
+        columns[f"intermediate.{key}" if key in columns else key] = np.asarray(values).ravel()
+    table = pa.Table.from_arrays([_column(pa, values) for values in columns.values()], names=list(columns))
+    summary = {key: value for key, value in result["summary"].items() if key != "crossing"}
+    return table.replace_schema_metadata(_metadata(
+        formula, result["unit"], axis_names=names, shape=result["shape"], summary=summary))
+
+
+def sweep_bytes(formula, result, output_format):
+    """将扫描结果整体写为 Arrow IPC 文件格式（可内存映射零拷贝读取）或 Parquet，返回字节串"""
+    pa = _pyarrow()
+    table = sweep_table(formula, result)
+    sink = ChunkSink()
+    writer = _writer(pa, output_format, sink, table.schema, stream=False)
+    writer.write_table(table)
+    writer.close()
+    return sink.drain()
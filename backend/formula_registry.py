@@ -0,0 +1,470 @@
+"""公式注册表：每个公式一次性声明参数、默认值、取值范围与计算内核。
+
+计算分发、参数校验、/api/formulas 目录、批量与缓存均由同一注册表驱动，
+新增公式只需注册一个 Formula，无需修改分发逻辑。
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+
+def collect_row_errors(n, checks):
+    """按顺序应用 (mask, message) 校验，每行只记录第一条不满足的错误信息。
+
+    message 可为字符串或以行号为参数的函数（用于带数值的提示）。返回长度为 n 的对象数组，通过的行为 None。
+    """
+    errors = np.full(n, None, dtype=object)
+    pending = np.ones(n, dtype=bool)
+    for mask, message in checks:
+        hit = np.broadcast_to(mask, (n,)) & pending
+        if not hit.any():
+            continue
+        if callable(message):
+            for idx in np.flatnonzero(hit):
+                errors[idx] = message(idx)
+        else:
+            errors[hit] = message
+        pending &= ~hit
+    return errors
+
+
+class Parameter:
+    """公式参数声明；有默认值的参数为可选参数"""
+
+    def __init__(self, name, label, unit, description, default=None, required=None):
+        self.name = name
+        self.label = label
+        self.unit = unit
+        self.description = description
+        self.default = default
+        self.required = (default is None) if required is None else required
+
+    def catalog(self):
+        """/api/formulas 中的参数条目"""
+        entry = {"name": self.name, "label": self.label, "unit": self.unit, "description": self.description}
+        if self.default is not None:
+            entry["default"] = self.default
+        return entry
+
+
+class Option:
+    """公式的非数值选项（如计算方法）；choices 为 {取值: 说明}，第一个取值为默认值。
+
+    批量计算时同一次调用的所有行使用同一个选项值。
+    """
+
+    def __init__(self, name, label, choices, default=None):
+        self.name = name
+        self.label = label
+        self.choices = dict(choices)
+        self.default = default if default is not None else next(iter(self.choices))
+
+    def validate(self, value):
+        if value is None:
+            return self.default
+        if value not in self.choices:
+            raise ValueError(f"{self.label} {value} 无效，可选：{', '.join(self.choices)}")
+        return value
+
+    def catalog(self):
+        """/api/formulas 中的选项条目"""
+        return {
+            "name": self.name,
+            "label": self.label,
+            "choices": [{"value": value, "label": label} for value, label in self.choices.items()],
+            "default": self.default,
+        }
+
+
+class Check:
+    """取值范围校验：predicate(values) 为真时报 message。
+
+    predicate 只使用比较与 | & 运算，因此同一条规则既可作用于标量，也可作用于批量数组。
+    """
+
+    def __init__(self, predicate, message):
+        self.predicate = predicate
+        self.message = message
+
+
+class Formula:
+    """一个可计算的公式：目录信息、参数声明、校验规则与标量/批量内核。
+
+    kernel、batch_kernel 可为 CalculationEngine 的方法名，或以引擎为第一个参数的函数：
+    kernel(engine, values) 接收已补齐默认值并通过校验的参数字典；
+    batch_kernel(engine, columns, n, errors, rounded) 接收补齐后的列数组与逐行校验结果。
+    选项（options）的取值以字符串形式与参数一并传给内核。
+    """
+
+    def __init__(self, formula_id, name, group, formula, description, parameters, output, unit,
+                 kernel, batch_kernel, checks=(), missing_message=None, options=()):
+        self.id = formula_id
+        self.name = name
+        self.group = group
+        self.formula = formula
+        self.description = description
+        self.parameters = tuple(parameters)
+        self.output = output
+        self.unit = unit
+        self.kernel = kernel
+        self.batch_kernel = batch_kernel
+        self.checks = tuple(checks)
+        self.options = tuple(options)
+        # 预先整理好的参数信息，校验时不再逐个查找
+        self.parameter_names = tuple(p.name for p in self.parameters)
+        self.defaults = {p.name: p.default for p in self.parameters if p.default is not None}
+        self.required = tuple(p.name for p in self.parameters if p.required)
+        self.missing_message = missing_message or f"{name}需要参数：{', '.join(self.required)}"
+        self.option_names = tuple(option.name for option in self.options)
+
+    def prepare(self, parameters):
+        """标量路径：补齐默认值并按声明顺序校验，不通过时抛出 ValueError"""
+        values = dict(parameters)
+        for name, default in self.defaults.items():
+            if values.get(name) is None:
+                values[name] = default
+        for name in self.required:
+            if values.get(name) is None:
+                raise ValueError(self.missing_message)
+        for check in self.checks:
+            if check.predicate(values):
+                raise ValueError(check.message)
+        for option in self.options:
+            values[option.name] = option.validate(values.get(option.name))
+        return values
+
+    def split_options(self, columns):
+        """批量路径：从输入列中取出选项，返回 (数值列, {选项名: 取值})；选项可为单值或各行相同的列"""
+        columns = dict(columns)
+        options = {}
+        for option in self.options:
+            value = columns.pop(option.name, None)
+            if isinstance(value, (list, tuple, np.ndarray)):
+                distinct = {item for item in value if item is not None}
+                if len(distinct) > 1:
+                    raise ValueError(f"同一批计算中{option.label}须一致，收到：{', '.join(sorted(map(str, distinct)))}")
+                value = distinct.pop() if distinct else None
+            options[option.name] = option.validate(value)
+        return columns, options
+
+    def prepare_columns(self, columns, n):
+        """批量路径：补齐默认值（缺失或 NaN 的单元格），未提供的参数列记为 NaN，并逐行校验。
+
+        返回 (列字典, 逐行错误数组)。
+        """
+        cols = dict(columns)
+        for p in self.parameters:
+            column = cols.get(p.name)
+            if column is None:
+                cols[p.name] = np.full(n, np.nan if p.default is None else float(p.default))
+            elif p.default is not None:
+                cols[p.name] = np.where(np.isnan(column), float(p.default), column)
+        missing = np.zeros(n, dtype=bool)
+        for name in self.required:
+            missing |= np.isnan(cols[name])
+        with np.errstate(invalid='ignore'):
+            checks = [(missing, self.missing_message)]
+            checks.extend((np.asarray(check.predicate(cols), dtype=bool), check.message) for check in self.checks)
+            errors = collect_row_errors(n, checks)
+        return cols, errors
+
+    def catalog(self):
+        """/api/formulas 中的公式条目"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "formula": self.formula,
+            "description": self.description,
+            "parameters": [p.catalog() for p in self.parameters],
+            **({"options": [option.catalog() for option in self.options]} if self.options else {}),
+        }
+
+
+class FormulaRegistry:
+    """公式注册表：按公式ID保存 Formula，保持注册顺序（即目录中的显示顺序）"""
+
+    def __init__(self, api_version):
+        self.api_version = api_version
+        self._formulas = {}
+        self._payload = None
+        self._payload_lock = threading.Lock()
+
+    def register(self, formula):
+        if formula.id in self._formulas:
+            raise ValueError(f"公式ID重复: {formula.id}")
+        self._formulas[formula.id] = formula
+        self._payload = None
+        return formula
+
+    def get(self, formula_id):
+        formula = self._formulas.get(formula_id)
+        if formula is None:
+            raise ValueError(f"未知的公式ID: {formula_id}")
+        return formula
+
+    def __contains__(self, formula_id):
+        return formula_id in self._formulas
+
+    def __iter__(self):
+        return iter(self._formulas.values())
+
+    def catalog(self):
+        """按侧栏分组生成公式目录"""
+        groups = {}
+        for formula in self._formulas.values():
+            groups.setdefault(formula.group, []).append(formula.catalog())
+        return {"apiVersion": self.api_version, **groups}
+
+    def catalog_payload(self):
+        """预序列化的目录，注册表不变时只生成一次。
+
+        返回 CatalogPayload：UTF-8 JSON 与其 gzip 压缩结果，以及按内容计算的强 ETag（两种编码各一个）。
+        """
+        payload = self._payload
+        if payload is None:
+            with self._payload_lock:
+                if self._payload is None:
+                    self._payload = CatalogPayload(self.api_version, self.catalog())
+                payload = self._payload
+        return payload
+
+
+class CatalogPayload:
+    """/api/formulas 的响应内容：键排序、紧凑格式的 JSON（与 jsonify 的键顺序一致）及其 gzip 压缩版本"""
+
+    def __init__(self, api_version, catalog):
+        self.api_version = api_version
+        self.body = json.dumps(catalog, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        # mtime=0 使压缩结果与生成时间无关，同一内容总是得到相同的字节
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = digest
+        self.gzip_etag = f"{digest}-gzip"
+
+
+# ==================== 内置公式 ====================
+
+# 多个公式共用的参数与校验规则
+_D = Parameter("D", "D：管道内径，单位为 m", "m", "管道内径")
+_RHO_G = Parameter("rho_g", "$\\rho_g$：固体颗粒密度，单位为 t/m³", "t/m³", "固体颗粒密度")
+_RHO_K = Parameter("rho_k", "$\\rho_k$：载体液体密度，单位为 t/m³", "t/m³", "载体液体密度")
+_CV = Parameter("Cv", "$C_v$：体积浓度，单位为 decimal", "decimal", "体积浓度")
+_OMEGA = Parameter("omega", "$\\omega$：速度参数，单位为 m/s", "m/s", "速度参数")
+_G = Parameter("g", "g：重力加速度，单位为 m/s²", "m/s²", "重力加速度", default=9.81)
+
+_RHO_K_NONZERO = Check(lambda v: v['rho_k'] == 0, "载体液体密度rho_k不能为0")
+_RHO_G_ABOVE_RHO_K = Check(lambda v: v['rho_g'] < v['rho_k'], "固体颗粒密度rho_g必须大于载体液体密度rho_k")
+_CV_RANGE = Check(lambda v: (v['Cv'] < 0) | (v['Cv'] > 1), "体积浓度Cv必须在0-1之间")
+_D_NONZERO = Check(lambda v: v['D'] == 0, "D不能为0")
+
+# 供前端识别：apiVersion 3 为 临界流速计算/沿程摩阻损失/浆体加速流及消能
+DEFAULT_REGISTRY = FormulaRegistry(api_version=3)
+
+DEFAULT_REGISTRY.register(Formula(
+    "liu_dezhong",
+    name="刘德忠公式",
+    group="临界流速计算",
+    formula="Vc = 9.5 * [g*D*(Δρ/ρ)*ω]^(1/3) * Cv^(1/6) * (ω_s/ω)^(1/6)",
+    description="本模型由刘德忠教授提出，是中国浆体管道设计中的主流经验公式之一。其核心思想基于浆体的整体沉降特性，通过引入加权平均沉速（$\\omega$）与静态界面沉速（$\\omega_s$）这两个关键实验参数，来综合反映固体颗粒群的干涉沉降行为。该公式尤其适用于细颗粒（如$d<2\\text{mm}$）含量较高、级配相对均匀的浆体，计算结果与中国工程实践贴合紧密。使用本公式的前提是需通过静态沉降柱试验获取可靠的$\\omega$与$\\omega_s$值。",
+    parameters=[
+        _D, _RHO_G, _RHO_K, _OMEGA, _CV,
+        Parameter("omega_s", "$\\omega_s$：沉降速度，单位为 m/s", "m/s", "沉降速度"),
+        _G,
+        Parameter("coefficient_9_5", "经验系数：默认值 9.5（无量纲）", "", "经验系数", default=9.5),
+    ],
+    output="Vc",
+    unit="m/s",
+    kernel="_calculate_liu_dezhong",
+    batch_kernel="_batch_liu_dezhong",
+    missing_message="刘德忠公式需要所有参数：D, rho_g, rho_k, omega, Cv, omega_s",
+    checks=[
+        Check(lambda v: v['omega'] == 0, "omega不能为0"),
+        _RHO_K_NONZERO,
+        _RHO_G_ABOVE_RHO_K,
+        _CV_RANGE,
+        Check(lambda v: v['omega_s'] < 0, "沉降速度omega_s不能为负数"),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "wasp",
+    name="E.J.瓦斯普公式",
+    group="临界流速计算",
+    formula="Vc = 3.113 * Cv^0.1858 * [2*g*D*(Δρ/ρ)]^(1/2) * (d85/D)^(1/6)",
+    description="本模型由E.J.Wasp等人提出，是国际上分析宽级配、非均质流临界流速的经典理论公式。其理论基础为两相流扩散模型，公式结构清晰体现了悬浮能量消耗与颗粒沉降间的平衡。它通过体积浓度（$C_v$）和相对密度差（$\\frac{\\Delta\\rho}{\\rho}$）来表征输送难度，并首次引入特征粒径（$d_{85}$）来量化粗颗粒对床层形成的影响。该公式特别适合粒径分布范围广、存在显著非均质输送特性的浆体。",
+    parameters=[
+        _D, _RHO_G, _RHO_K, _CV,
+        Parameter("d85", "$d_{85}$：特征粒径，单位为 m", "m", "d85特征粒径"),
+        _G,
+        Parameter("coefficient_3_113", "经验系数：默认值 3.113（无量纲）", "", "经验系数", default=3.113),
+    ],
+    output="Vc",
+    unit="m/s",
+    kernel="_calculate_wasp",
+    batch_kernel="_batch_wasp",
+    missing_message="E.J.瓦斯普公式需要所有参数：D, rho_g, rho_k, Cv, d85",
+    checks=[
+        _D_NONZERO,
+        _RHO_K_NONZERO,
+        _RHO_G_ABOVE_RHO_K,
+        _CV_RANGE,
+        Check(lambda v: v['d85'] < 0, "d85粒径不能为负数"),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "fei_xiangjun",
+    name="费祥俊公式",
+    group="临界流速计算",
+    formula="Vc = (2.26/√λ) * [gD*(Δρ/ρ)*ω]^(1/2) * Cv^0.25 * (d90/D)^(1/3)",
+    description="本模型由费祥俊教授建立，其显著特点是首次将管道沿程阻力系数（$\\lambda$）引入临界流速的计算，在理论上将输送能耗与维持颗粒悬浮的能耗进行了统一。公式采用特征粒径（$d_{90}$）来表征浆体颗粒群的粗细程度，并对浆体浓度（$C_v$）影响的刻画较为显著。该公式在理论上更为全面，尤其适合于长距离输送管道的水力坡降与系统设计。应用时，需根据管道材质、内壁状况及流态等条件合理确定或计算沿程阻力系数（$\\lambda$），此参数对计算结果有重要影响。",
+    parameters=[
+        _D, _RHO_G, _RHO_K, _CV, _OMEGA,
+        Parameter("d90", "$d_{90}$：特征粒径，单位为 m", "m", "d90特征粒径"),
+        Parameter("lambda_coef", "$\\lambda$：达西摩阻系数，无量纲", "", "摩擦阻力系数"),
+        _G,
+        Parameter("coefficient_2_26", "经验系数：默认值 2.26（无量纲）", "", "经验系数", default=2.26),
+    ],
+    output="Vc",
+    unit="m/s",
+    kernel="_calculate_fei_xiangjun",
+    batch_kernel="_batch_fei_xiangjun",
+    missing_message="费祥俊公式需要所有参数：D, rho_g, rho_k, Cv, omega, d90, lambda_coef",
+    checks=[
+        _D_NONZERO,
+        Check(lambda v: v['lambda_coef'] <= 0, "lambda_coef必须大于0"),
+        _RHO_K_NONZERO,
+        _RHO_G_ABOVE_RHO_K,
+        _CV_RANGE,
+        Check(lambda v: v['omega'] < 0, "速度参数omega不能为负数"),
+        Check(lambda v: v['d90'] < 0, "d90粒径不能为负数"),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "kronodze_pressure",
+    name="B.C.克诺罗兹法",
+    group="临界流速计算",
+    formula="A) Qk=K·W·(1/ρg+G/W)；B) 按dp求DL；C) V_L=0.255β(1+2.48·³√(Cd)·⁴√(DL))",
+    description="A) 计算矿浆流量。其中：【输出结果】Qk 矿浆流量，单位为 m³/s；K 波动系数：默认值 1.1；【用户输入】G 干尾矿重量，单位为 t/h；$\\rho_g$ 尾矿相对密度，无量纲；W 矿浆中水重，单位为 t/h。B) 计算临界管径。当 dp≤0.07 mm 与 0.07<dp≤0.15 mm 分别采用不同公式，由 Qk 反解。【用户选择】dp 尾矿加权平均粒径，单位为 mm；$\\beta$ 固体物料相对密度修正系数：默认值 1；【输出结果】DL 临界管径，单位为 mm；Cd 重量砂水比 = G/W×100。C) 计算临界流速。【输出结果】V_L 临界流速，单位为 m/s。适用于有压隧洞泥沙运输、固体密度<3、粒径<0.4 mm 的浆体；体积浓度>30% 时偏差较大。",
+    parameters=[
+        Parameter("K", "K：波动系数：默认值 1.1（无量纲）", "", "波动系数", default=1.1),
+        Parameter("G", "G：干尾矿重量，单位为 t/h", "t/h", "干尾矿重量"),
+        Parameter("W", "W：矿浆中水重，单位为 t/h", "t/h", "矿浆中水重"),
+        Parameter("rho_g", "$\\rho_g$：尾矿相对密度，无量纲", "", "尾矿相对密度"),
+        # dp 可不填：此时只计算步骤 A
+        Parameter("dp", "dp：尾矿加权平均粒径，单位为 mm", "mm", "尾矿加权平均粒径；≤0.07 与 0.07～0.15 对应不同公式", required=False),
+        Parameter("beta", "$\\beta$：固体物料相对密度修正系数：默认值 1（无量纲）", "", "固体物料相对密度修正系数", default=1.0),
+    ],
+    output="Vc",
+    unit="m/s",
+    kernel="_calculate_kronodze_pressure",
+    batch_kernel="_batch_kronodze_pressure",
+    missing_message="步骤1 需要参数：G（干尾矿重量）、W（矿浆中水重）、ρg（尾矿相对密度）",
+    checks=[
+        Check(lambda v: v['W'] == 0, "矿浆中水重 W 不能为0"),
+        Check(lambda v: v['rho_g'] <= 0, "尾矿相对密度 ρg 必须大于0"),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "darcy_friction",
+    name="达西摩阻系数公式",
+    group="沿程摩阻损失",
+    formula="λ = 64/Re（层流）或 Colebrook-White（湍流）",
+    description="达西摩阻系数 $\\lambda$ 反映管道阻力特性。层流时 $\\lambda = 64/Re$；Re ≥ 2300 的湍流按选项 method 计算：swamee_jain（默认）为 Swamee-Jain 显式近似；colebrook 以牛顿迭代求解 Colebrook-White 方程 $1/\\sqrt{\\lambda} = -2\\lg(\\varepsilon/(3.7D) + 2.51/(Re\\sqrt{\\lambda}))$；colebrook_table 查 Colebrook-White 预计算插值表，相对误差不超过 $10^{-6}$，适合大批量计算。湍流时需提供管道内径 $D$。",
+    parameters=[
+        Parameter("Re", "Re：雷诺数，无量纲", "", "雷诺数"),
+        Parameter("epsilon", "ε：管道当量粗糙度，单位为 m", "m", "管道壁面粗糙度", default=0.0002),
+        # D 仅湍流时需要，由内核检查
+        Parameter("D", "D：管道内径，单位为 m", "m", "管道内径", required=False),
+    ],
+    output="lambda_coef",
+    unit="",
+    kernel="_calculate_darcy_friction",
+    batch_kernel="_batch_darcy_friction",
+    missing_message="达西摩阻系数公式需要参数：Re（雷诺数）且 Re > 0",
+    checks=[
+        Check(lambda v: v['Re'] <= 0, "达西摩阻系数公式需要参数：Re（雷诺数）且 Re > 0"),
+    ],
+    options=[
+        Option("method", "湍流计算方法", {
+            "swamee_jain": "Swamee-Jain 近似",
+            "colebrook": "Colebrook-White 迭代求解",
+            "colebrook_table": "Colebrook-White 插值表",
+        }),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "friction_loss",
+    name="沿程摩阻损失",
+    group="沿程摩阻损失",
+    formula="i_k = λ·(V²·ρ_k)/(2gD·ρ_s)",
+    description="本公式用于计算似均质流态下浆体管道的沿程摩阻损失，是管道水力坡降与泵送扬程设计的基础。公式中 $i_k$ 为浆体沿程摩阻损失（mH₂O/m），$\\lambda$ 为达西摩阻系数，$V$ 为管道平均流速，$\\rho_k$ 为浆体密度，$D$ 为管道内径，$\\rho_s$ 为固体颗粒密度，$g$ 为重力加速度。适用于可视为似均质流的浆体管道水力计算。",
+    parameters=[
+        Parameter("lambda_coef", "$\\lambda$：达西摩阻系数，无量纲", "", "达西摩阻系数"),
+        Parameter("V", "V：平均流速，单位为 m/s", "m/s", "管道内平均流速"),
+        Parameter("rho_k", "$\\rho_k$：浆体密度，单位为 t/m³", "t/m³", "浆体密度"),
+        _D,
+        Parameter("rho_s", "$\\rho_s$：固体颗粒密度，单位为 t/m³", "t/m³", "固体颗粒密度"),
+        _G,
+    ],
+    output="i_k",
+    unit="mH₂O/m",
+    kernel="_calculate_friction_loss",
+    batch_kernel="_batch_friction_loss",
+    missing_message="沿程摩阻损失需要参数：λ、V、ρ_k、D、ρ_s",
+    checks=[
+        Check(lambda v: (v['D'] == 0) | (v['rho_s'] == 0) | (v['g'] == 0), "D、ρ_s、g 不能为0"),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "density_mixing",
+    name="密度混合公式",
+    group="沿程摩阻损失",
+    formula="ρ_k = 1/(C_w/ρ_g + (1-C_w)/ρ_s)",
+    description="本公式根据固体与载体的质量浓度和密度计算浆体密度，用于浆体管道水力计算中的密度参数确定。公式中 $\\rho_k$ 为浆体密度，$C_w$ 为固体质量浓度（0～1 小数），$\\rho_g$ 为载体流体密度（如水的密度），$\\rho_s$ 为固体颗粒密度。已知固体与载体密度及质量浓度时，可直接求得浆体密度。",
+    parameters=[
+        Parameter("C_w", "$C_w$：固体质量浓度，无量纲（0～1）", "", "固体质量浓度"),
+        Parameter("rho_g", "$\\rho_g$：载体流体密度，单位为 t/m³", "t/m³", "载体流体密度"),
+        Parameter("rho_s", "$\\rho_s$：固体颗粒密度，单位为 t/m³", "t/m³", "固体颗粒密度"),
+    ],
+    output="rho_k",
+    unit="t/m³",
+    kernel="_calculate_density_mixing",
+    batch_kernel="_batch_density_mixing",
+    missing_message="密度混合公式需要参数：C_w、ρ_g、ρ_s",
+    checks=[
+        Check(lambda v: (v['rho_g'] == 0) | (v['rho_s'] == 0), "ρ_g、ρ_s 不能为0"),
+        Check(lambda v: (v['C_w'] < 0) | (v['C_w'] > 1), "质量浓度 C_w 应在 0～1 之间"),
+    ],
+))
+
+DEFAULT_REGISTRY.register(Formula(
+    "slurry_accel_energy",
+    name="浆体加速流及消能",
+    group="浆体加速流及消能",
+    formula="(Z₁ + P₁/(ρkg)) - (Z₂ + P₂/(ρkg)) > iL",
+    description="浆体加速流及消能计算工具用于分析浆体在管道中流动时的能量平衡状态。基于水头平衡原理，比较浆体在流动过程中总机械能的差值（左侧）与沿程摩阻损失（右侧）的大小。若左侧 > 右侧，则满足加速流及消能条件；否则不满足。适用于管道输送、泵站设计、流体动力学分析等领域，用于评估浆体输送系统的运行状态和效率。",
+    parameters=[
+        Parameter("Z1", "Z₁：起点位置水头，单位为 m", "m", "浆体流动起点相对于基准面的垂直高度"),
+        Parameter("Z2", "Z₂：终点位置水头，单位为 m", "m", "浆体流动终点相对于基准面的垂直高度"),
+        Parameter("H1", "H₁：起点压能浆体水头 P₁/(ρkg)，单位为 m", "m", "起点压力能转换的水头高度"),
+        Parameter("H2", "H₂：终点压能浆体水头 P₂/(ρkg)，单位为 m", "m", "终点压力能转换的水头高度"),
+        Parameter("i", "i：两点间沿程摩阻损失，单位为 m浆柱/m", "m浆柱/m", "单位长度管道内的摩阻损失"),
+        Parameter("L", "L：管道长度，单位为 m", "m", "起点至终点的管道总长度"),
+    ],
+    output="condition_met",
+    unit="",
+    kernel="_calculate_slurry_accel_energy",
+    batch_kernel="_batch_slurry_accel_energy",
+    missing_message="浆体加速流及消能需要参数：Z₁、Z₂、H₁、H₂、i、L",
+    checks=[
+        Check(lambda v: v['L'] < 0, "管道长度 L 不能为负"),
+    ],
+))
@@ -0,0 +1,229 @@
+"""计算历史：/api/calculate 的每次成功计算记录到本地 SQLite 数据库，可分页浏览、按范围筛选并重新导出计算书。
+
+写入先放入内存队列，由后台线程攒批后在一个事务中写入，计算接口只做一次入队，不等待磁盘。
+查询前会先写入队列中尚未落盘的记录，因此刚完成的计算立即可查。
+数据库位置由环境变量 HISTORY_DB 指定（桌面端设为用户数据目录），默认见 default_path。
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# 单独成列并建索引的关键参数，其余参数的范围筛选按 JSON 字段查询（不走索引）
+KEY_PARAMETERS = ("D", "Cv", "rho_g", "rho_k")
+
+# 后台线程攒批写入的间隔（秒）与每批最大条数
+FLUSH_INTERVAL = 0.5
+BATCH_SIZE = 500
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_PARAMETER_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    formula_id TEXT NOT NULL,
+    engine_version TEXT,
+    parameters TEXT NOT NULL,
+    result TEXT NOT NULL,
+    {", ".join(f"{name} REAL" for name in KEY_PARAMETERS)}
+);
+CREATE INDEX IF NOT EXISTS idx_calculations_created ON calculations (created);
+CREATE INDEX IF NOT EXISTS idx_calculations_formula_created ON calculations (formula_id, created);
+{"".join(f"CREATE INDEX IF NOT EXISTS idx_calculations_formula_{name} ON calculations (formula_id, {name});" for name in KEY_PARAMETERS)}
+"""
+
+
+def default_path():
+    """HISTORY_DB 或项目根目录下的 data/history.sqlite3；打包为单文件程序时放在可执行文件旁
+    （程序运行时解压到临时目录，退出即删除）"""
+    if os.environ.get('HISTORY_DB'):
+        return os.environ['HISTORY_DB']
+    if getattr(sys, 'frozen', False):
+        root = os.path.dirname(sys.executable)
+    else:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "data", "history.sqlite3")
+
+
+def _number(value):
+    """关键参数列的值：能转为有限浮点数时取浮点数，否则为 NULL"""
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _timestamp(value, name):
+    """时间筛选值：Unix 时间戳或 ISO 8601 日期时间"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 需为 Unix 时间戳或 ISO 8601 日期时间，收到 {value!r}")
+
+
+class HistoryStore:
+    """计算历史库。record 只入队；查询、删除前先落盘队列中的记录"""
+
+    def __init__(self, path=None, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.path = path or default_path()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # 数据库连接在首次使用时打开，读写共用一个连接，由 _db_lock 串行化
+        self._connection = None
+        self._db_lock = threading.Lock()
+        self._writer = None
+
+    def _connect_locked(self):
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def record(self, formula_id, parameters, result, engine_version=None):
+        """记录一次计算（只入队，由后台线程写入）"""
+        row = (time.time(), formula_id, engine_version,
+               json.dumps(parameters, ensure_ascii=False, default=str),
+               json.dumps(result, ensure_ascii=False, default=str),
+               *(_number(parameters.get(name)) for name in KEY_PARAMETERS))
+        with self._pending_lock:
+            self._pending.append(row)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+                self._writer.start()
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    def _write_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"写入计算历史失败: {e}")
+
+    def flush(self):
+        """将队列中的记录在一个事务中写入，返回写入条数；写入失败的这批记录丢弃并计数"""
+        columns = ("created", "formula_id", "engine_version", "parameters", "result") + KEY_PARAMETERS
+        sql = f"INSERT INTO calculations ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        # 先取得数据库锁再取队列，保证记录按入队顺序落盘
+        with self._db_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                connection = self._connect_locked()
+                with connection:
+                    connection.executemany(sql, rows)
+            except sqlite3.Error:
+                self.dropped += len(rows)
+                raise
+            self.written += len(rows)
+        return len(rows)
+
+    def _query(self, sql, arguments=()):
+        self.flush()
+        with self._db_lock:
+            return self._connect_locked().execute(sql, arguments).fetchall()
+
+    @staticmethod
+    def _entry(row, full=True):
+        entry = {
+            "id": row["id"],
+            "created": datetime.fromtimestamp(row["created"]).isoformat(timespec='seconds'),
+            "formula_id": row["formula_id"],
+            "engine_version": row["engine_version"],
+            "parameters": json.loads(row["parameters"]),
+        }
+        if full:
+            entry["result"] = json.loads(row["result"])
+        return entry
+
+    def query(self, formula_id=None, ranges=None, since=None, until=None,
+              before=None, page_size=DEFAULT_PAGE_SIZE, include_results=True):
+        """按时间倒序分页查询。
+
+        ranges 为 {参数名: (下限, 上限)}（闭区间，任一端可为 None）；关键参数按索引列筛选，
+        其余参数按 JSON 字段筛选。before 为上一页最后一条的 id（游标分页，不随翻页变慢）。
+        返回 {"entries": [...], "next_before": 下一页游标，没有下一页时为 None}。
+        """
+        page_size = int(page_size)
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"每页条数 page_size 需在 1 到 {MAX_PAGE_SIZE} 之间")
+        conditions, arguments = [], []
+        if formula_id:
+            conditions.append("formula_id = ?")
+            arguments.append(formula_id)
+        if since is not None:
+            conditions.append("created >= ?")
+            arguments.append(_timestamp(since, "since"))
+        if until is not None:
+            conditions.append("created <= ?")
+            arguments.append(_timestamp(until, "until"))
+        if before is not None:
+            conditions.append("id < ?")
+            arguments.append(int(before))
+        for name, (low, high) in (ranges or {}).items():
+            if not _PARAMETER_NAME.fullmatch(name):
+                raise ValueError(f"参数名 {name!r} 无效")
+            column = name if name in KEY_PARAMETERS else f"CAST(json_extract(parameters, '$.{name}') AS REAL)"
+            for bound, operator in ((low, ">="), (high, "<=")):
+                if bound is not None:
+                    value = _number(bound)
+                    if value is None:
+                        raise ValueError(f"参数 {name} 的范围需为数值，收到 {bound!r}")
+                    conditions.append(f"{column} {operator} ?")
+                    arguments.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT * FROM calculations {where} ORDER BY id DESC LIMIT ?", (*arguments, page_size + 1))
+        entries = [self._entry(row, include_results) for row in rows[:page_size]]
+        return {
+            "entries": entries,
+            "next_before": entries[-1]["id"] if len(rows) > page_size else None,
+        }
+
+    def get(self, entry_id):
+        """按 id 取一条记录（含结果），不存在时返回 None"""
+        rows = self._query("SELECT * FROM calculations WHERE id = ?", (int(entry_id),))
+        return self._entry(rows[0]) if rows else None
+
+    def delete(self, entry_id):
+        """删除一条记录，返回是否存在"""
+        self.flush()
+        with self._db_lock:
+            connection = self._connect_locked()
+            with connection:
+                return connection.execute("DELETE FROM calculations WHERE id = ?", (int(entry_id),)).rowcount > 0
+
+    def stats(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {"path": self.path, "pending": pending, "written": self.written, "dropped": self.dropped}
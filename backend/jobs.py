@@ -0,0 +1,255 @@
+"""后台任务队列：耗时任务（导出计算书、批量导出、参数扫描等）提交后立即返回任务ID，由后台线程按优先级执行。
+
+客户端可轮询或通过 Server-Sent Events 订阅进度、取消任务，完成后下载产物。
+工作线程数由环境变量 JOB_WORKERS 配置（默认 2）；bulk 优先级的任务最多占用 workers-1 个线程，
+始终留出一个线程给交互式计算与普通任务（workers 为 1 时除外）。
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+
+# 优先级名称 -> 排序值（越小越先执行）
+PRIORITIES = {"interactive": 0, "normal": 10, "bulk": 20}
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """任务已被取消：由 Job.report 在任务函数内抛出，任务函数无需捕获"""
+
+
+class Artifact:
+    """任务产物：内存中的字节串 data 或磁盘文件 path，下载时以 filename 命名"""
+
+    def __init__(self, filename, mimetype, data=None, path=None):
+        self.filename = filename
+        self.mimetype = mimetype
+        self.data = data
+        self.path = path
+
+    @property
+    def size(self):
+        if self.data is not None:
+            return len(self.data)
+        return os.path.getsize(self.path) if self.path and os.path.exists(self.path) else None
+
+
+class Job:
+    """一个后台任务。fn(job) 执行任务，返回 Artifact（文件产物）或可 JSON 序列化的结果；
+    执行过程中调用 job.report(done, total) 报告进度，同时在此处响应取消。"""
+
+    def __init__(self, kind, fn, priority, queue):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fn = fn
+        self.priority = priority
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.message = None
+        self.result = None
+        self.artifact = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # 每次状态或进度变化时递增，供 SSE 订阅判断是否有更新
+        self.version = 0
+        self._cancel = threading.Event()
+        self._queue = queue
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, done, total=None, message=None):
+        """更新进度；任务已被请求取消时抛出 JobCancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._queue.changed:
+            self.done = done
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+            self.version += 1
+            self._queue.changed.notify_all()
+
+    def as_dict(self):
+        elapsed = None
+        if self.started is not None:
+            elapsed = round((self.finished or time.time()) - self.started, 6)
+        progress = None
+        if self.total:
+            progress = round(self.done / self.total, 4)
+        elif self.status == DONE:
+            progress = 1.0
+        entry = {
+            "id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "progress": progress,
+            "message": self.message,
+            "elapsed": elapsed,
+            "error": self.error,
+        }
+        if self.status == DONE:
+            if self.artifact is not None:
+                entry["artifact"] = {
+                    "filename": self.artifact.filename,
+                    "mimetype": self.artifact.mimetype,
+                    "size": self.artifact.size,
+                }
+            else:
+                entry["result"] = self.result
+        return entry
+
+
+class JobQueue:
+    """按优先级执行任务的线程池；保留最近 max_jobs 个任务（含已完成任务的结果与产物）以供查询"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_jobs=256):
+        if workers < 1:
+            raise ValueError("任务线程数 workers 必须至少为1")
+        self.workers = workers
+        self.max_jobs = max_jobs
+        # bulk 任务可同时占用的线程数
+        self.max_bulk = max(workers - 1, 1)
+        self.changed = threading.Condition()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._jobs = OrderedDict()
+        self._running = 0
+        self._running_bulk = 0
+        self._threads = []
+
+    def _start(self):
+        # 首次提交任务时再启动工作线程
+        if not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind, fn, priority="normal"):
+        """提交任务，返回 Job（状态为 queued）"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"任务优先级 {priority} 无效，可选：{'、'.join(PRIORITIES)}")
+        job = Job(kind, fn, priority, self)
+        with self.changed:
+            self._start()
+            self._jobs[job.id] = job
+            self._evict_locked()
+            heapq.heappush(self._heap, (PRIORITIES[priority], next(self._sequence), job))
+            self.changed.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self.changed:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self.changed:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """取消任务：排队中的任务立即取消，运行中的任务在下一次报告进度时停止；返回 Job，不存在时返回 None"""
+        with self.changed:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job._cancel.set()
+            if job.status == QUEUED:
+                self._finish_locked(job, CANCELLED)
+            return job
+
+    def wait(self, job, version, timeout):
+        """等待任务在 version 之后发生变化（或结束），最长 timeout 秒；返回最新的 version"""
+        with self.changed:
+            self.changed.wait_for(lambda: job.version != version or job.status in FINISHED, timeout)
+            return job.version
+
+    def stats(self):
+        with self.changed:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            return {"workers": self.workers, "queued": queued, "running": self._running, "retained": len(self._jobs)}
+
+    def _evict_locked(self):
+        """超过保留上限时丢弃最早结束的任务（排队与运行中的任务不丢弃）"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED][:excess]:
+            del self._jobs[job_id]
+
+    def _finish_locked(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        job.version += 1
+        self.changed.notify_all()
+
+    def _next_locked(self):
+        """取出下一个可运行的任务：跳过已取消的任务；bulk 线程数已满时 bulk 任务继续排队"""
+        while self._heap:
+            _, _, job = self._heap[0]
+            if job.status != QUEUED:
+                heapq.heappop(self._heap)
+                continue
+            if job.priority == "bulk" and self._running_bulk >= self.max_bulk:
+                # 堆顶已是 bulk，说明没有更高优先级的任务在排队
+                return None
+            heapq.heappop(self._heap)
+            return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self.changed:
+                job = self._next_locked()
+                while job is None:
+                    self.changed.wait()
+                    job = self._next_locked()
+                job.status = RUNNING
+                job.started = time.time()
+                job.version += 1
+                self._running += 1
+                if job.priority == "bulk":
+                    self._running_bulk += 1
+                self.changed.notify_all()
+            status, error, outcome = DONE, None, None
+            try:
+                outcome = job.fn(job)
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                status, error = FAILED, str(e)
+            with self.changed:
+                self._running -= 1
+                if job.priority == "bulk":
+                    self._running_bulk -= 1
+                if status == DONE and job.cancel_requested:
+                    status = CANCELLED
+                elif status == DONE:
+                    if isinstance(outcome, Artifact):
+                        job.artifact = outcome
+                    else:
+                        job.result = outcome
+                    if job.total is not None:
+                        job.done = job.total
+                self._finish_locked(job, status, error)
@@ -0,0 +1,201 @@
+"""公式编译：将公式目录中的公式字符串（如 "Vc = 9.5 * [g*D*(Δρ/ρ)*ω]^(1/3)"）编译为 Word 数学公式（OMML）
+
+支持的写法：
+- a/b 分式（分子、分母外层的圆括号省略），a^b 与 a²、a_b 与 Z₁ 等上下标，√x 与 ³√x 根式；
+- ( ) 与 [ ] 作为可伸缩的括号，* 显示为 ·；
+- Vc、Cv、d85 等约定写法按下标显示（见 SUBSCRIPT_ALIASES），中文与标点按正文文字显示。
+
+编译结果按公式字符串缓存（每个公式只编译一次），导出时复制缓存的元素即可。
+"""
+import re
+from copy import deepcopy
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+
+M_NS = "http://schemas.openxmlformats.org/officeDocument/2006/math"
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# 公式字号（半磅），与正文中的公式行一致为 14 磅
+FONT_HALF_POINTS = 28
+
+# 按约定带下标的变量名
+SUBSCRIPT_ALIASES = {
+    "Vc": ("V", "c"),
+    "Cv": ("C", "v"),
+    "Cd": ("C", "d"),
+    "Qk": ("Q", "k"),
+}
+
+_SUPERSCRIPT_DIGITS = "⁰¹²³⁴⁵⁶⁷⁸⁹"
+_SUBSCRIPT_DIGITS = "₀₁₂₃₄₅₆₇₈₉"
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<name>[A-Za-zΑ-ω]+\d*)
+  | (?P<sup>[⁰¹²³⁴⁵⁶⁷⁸⁹]+)
+  | (?P<sub>[₀₁₂₃₄₅₆₇₈₉]+)
+  | (?P<symbol>[()\[\]^_/√*·=+\-<>±×])
+  | (?P<text>[^\s\dA-Za-zΑ-ω⁰¹²³⁴⁵⁶⁷⁸⁹₀₁₂₃₄₅₆₇₈₉()\[\]^_/√*·=+\-<>±×]+)
+""", re.VERBOSE)
+
+_CLOSERS = {"(": ")", "[": "]"}
+
+
+def _run(text, style=None):
+    """m:r 文字；style 为 "plain"（正体）或 "text"（按正文文字排版，用于中文与标点）"""
+    properties = ""
+    if style == "plain":
+        properties = '<m:rPr><m:sty m:val="p"/></m:rPr>'
+    elif style == "text":
+        properties = '<m:rPr><m:nor/></m:rPr>'
+    return (f'<m:r>{properties}<w:rPr><w:rFonts w:ascii="Cambria Math" w:hAnsi="Cambria Math" w:eastAsia="仿宋"/>'
+            f'<w:sz w:val="{FONT_HALF_POINTS}"/></w:rPr><m:t xml:space="preserve">{escape(text)}</m:t></m:r>')
+
+
+class _Node:
+    """语法树节点：xml 为该节点的 OMML；delimiter 为外层括号（分式、上标、根式中省略圆括号时使用 inner）"""
+
+    def __init__(self, xml, delimiter=None, inner=None):
+        self.xml = xml
+        self.delimiter = delimiter
+        self.inner = inner
+
+    @property
+    def bare(self):
+        return self.inner if self.delimiter == "(" else self.xml
+
+
+def _name(text):
+    """变量名：单字母加数字（d85）与 SUBSCRIPT_ALIASES 中的写法显示为下标，三个及以上拉丁字母的单词用正体"""
+    if text in SUBSCRIPT_ALIASES:
+        base, sub = SUBSCRIPT_ALIASES[text]
+        return _Node(_sub(_run(base), _run(sub)))
+    match = re.fullmatch(r"([A-Za-zΑ-ω])(\d+)", text)
+    if match:
+        return _Node(_sub(_run(match.group(1)), _run(match.group(2))))
+    if re.fullmatch(r"[A-Za-z]{3,}", text):
+        return _Node(_run(text, "plain"))
+    return _Node(_run(text))
+
+
+def _sub(base, sub):
+    return f"<m:sSub><m:e>{base}</m:e><m:sub>{sub}</m:sub></m:sSub>"
+
+
+def _sup(base, sup):
+    return f"<m:sSup><m:e>{base}</m:e><m:sup>{sup}</m:sup></m:sSup>"
+
+
+def _digits(text, table):
+    return "".join(str(table.index(c)) for c in text)
+
+
+class _Parser:
+    """递归下降解析：sequence 为项与运算符的序列，factor 为可带上下标、可作分子分母与根号内容的单项"""
+
+    def __init__(self, text):
+        self.tokens = [(m.lastgroup, m.group()) for m in _TOKEN.finditer(text) if m.lastgroup != "space"]
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def sequence(self, closer=None):
+        """解析到 closer（或末尾）为止；顶层多余的右括号按文字输出"""
+        items = []
+        while True:
+            kind, value = self.peek()
+            if kind is None:
+                break
+            if value in (")", "]"):
+                if closer is not None:
+                    self.take()
+                    break
+                self.take()
+                items.append(_Node(_run(value)))
+            elif value == "/" and items:
+                self.take()
+                numerator = items.pop()
+                denominator = self.factor()
+                items.append(_Node(f"<m:f><m:num>{numerator.bare}</m:num><m:den>{denominator.bare}</m:den></m:f>"))
+            elif kind == "symbol" and value in "*·=+-<>±×/":
+                self.take()
+                items.append(_Node(_run("·" if value == "*" else value)))
+            elif kind == "text":
+                self.take()
+                items.append(_Node(_run(value, "text")))
+            else:
+                items.append(self.factor())
+        return items
+
+    def factor(self):
+        kind, value = self.peek()
+        if kind == "sup" and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1][1] == "√":
+            # ³√x：根指数
+            self.pos += 2
+            return _Node(f"<m:rad><m:deg>{_run(_digits(value, _SUPERSCRIPT_DIGITS))}</m:deg>"
+                         f"<m:e>{self.factor().bare}</m:e></m:rad>")
+        if value == "√":
+            self.take()
+            return _Node(f'<m:rad><m:radPr><m:degHide m:val="1"/></m:radPr><m:deg/>'
+                         f"<m:e>{self.factor().bare}</m:e></m:rad>")
+        node = self.primary()
+        while True:
+            kind, value = self.peek()
+            if value == "^":
+                self.take()
+                node = _Node(_sup(node.xml, self.factor().bare))
+            elif value == "_":
+                self.take()
+                node = _Node(_sub(node.xml, self.primary().bare))
+            elif kind == "sup":
+                self.take()
+                node = _Node(_sup(node.xml, _run(_digits(value, _SUPERSCRIPT_DIGITS))))
+            elif kind == "sub":
+                self.take()
+                node = _Node(_sub(node.xml, _run(_digits(value, _SUBSCRIPT_DIGITS))))
+            else:
+                return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind is None:
+            return _Node(_run(""))
+        if kind == "number":
+            return _Node(_run(value))
+        if kind == "name":
+            return _name(value)
+        if value in _CLOSERS:
+            inner = "".join(item.xml for item in self.sequence(_CLOSERS[value]))
+            properties = "" if value == "(" else f'<m:dPr><m:begChr m:val="{value}"/><m:endChr m:val="{_CLOSERS[value]}"/></m:dPr>'
+            return _Node(f"<m:d>{properties}<m:e>{inner}</m:e></m:d>", delimiter=value, inner=inner)
+        return _Node(_run(value, "text" if kind == "text" else None))
+
+
+def to_omml(formula):
+    """将公式字符串编译为 m:oMath 元素的 XML 字符串"""
+    body = "".join(item.xml for item in _Parser(formula).sequence())
+    return f'<m:oMath xmlns:m="{M_NS}" xmlns:w="{W_NS}">{body}</m:oMath>'
+
+
+@lru_cache(maxsize=256)
+def _compiled(formula):
+    return parse_xml(to_omml(formula))
+
+
+def formula_element(formula):
+    """公式字符串对应的 m:oMath 元素（编译结果已缓存，每次返回副本，可直接插入段落）"""
+    return deepcopy(_compiled(formula))
+
+
+def cache_size():
+    """已编译并缓存的公式数"""
+    return _compiled.cache_info().currsize
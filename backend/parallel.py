@@ -0,0 +1,147 @@
+"""进程池并行：大任务按实测单行耗时自动分块，分发到进程池并按原顺序合并；预计耗时很短的任务直接在本进程计算
+
+工作进程数可由环境变量 CALC_WORKERS 配置（默认 CPU 核数，1 表示不使用进程池），
+并行门槛（秒）由 PARALLEL_MIN_SECONDS 配置。打包后的程序需在入口处调用 multiprocessing.freeze_support()。
+"""
+import atexit
+import math
+import os
+import threading
+import time
+
+from batch_io import DEFAULT_CHUNK_SIZE
+
+DEFAULT_WORKERS = int(os.environ.get('CALC_WORKERS') or 0) or (os.cpu_count() or 1)
+# 剩余部分预计耗时低于该值时不使用进程池（进程启动与数据传输的开销约为数十至数百毫秒）
+MIN_PARALLEL_SECONDS = float(os.environ.get('PARALLEL_MIN_SECONDS') or 0.5)
+# 每个进程池任务的目标耗时：过小则调度与序列化开销占比高，过大则各进程负载不均
+TARGET_TASK_SECONDS = 0.25
+# 每个工作进程至少分到的任务数，用于均衡负载
+TASKS_PER_WORKER = 4
+MAX_TASK_ROWS = 1_000_000
+
+_worker_engine = None
+
+
+def worker_engine():
+    """进程池任务中使用的计算引擎：每个工作进程只创建一次（使用内置公式注册表）"""
+    global _worker_engine
+    if _worker_engine is None:
+        from calculation_engine import CalculationEngine
+        _worker_engine = CalculationEngine()
+    return _worker_engine
+
+
+class ParallelExecutor:
+    """共享的进程池执行器：进程池按需创建并在多次请求间复用，同时记录各类任务的单行耗时"""
+
+    def __init__(self, workers=None, min_parallel_seconds=MIN_PARALLEL_SECONDS, target_task_seconds=TARGET_TASK_SECONDS):
+        self.workers = self.clamp_workers(workers or DEFAULT_WORKERS)
+        self.min_parallel_seconds = min_parallel_seconds
+        self.target_task_seconds = target_task_seconds
+        self.row_costs = {}
+        self._pools = {}
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    @staticmethod
+    def clamp_workers(workers):
+        return max(1, min(int(workers), os.cpu_count() or 1))
+
+    def resolve_workers(self, workers=None):
+        """单次请求的进程数：未指定时取配置值，且不超过 CPU 核数"""
+        return self.workers if workers is None else self.clamp_workers(workers)
+
+    def pool(self, workers):
+        with self._lock:
+            pool = self._pools.get(workers)
+            if pool is None:
+                # 首次使用进程池时再导入（multiprocessing 相关模块较大）
+                from concurrent.futures import ProcessPoolExecutor
+                pool = self._pools[workers] = ProcessPoolExecutor(max_workers=workers)
+            return pool
+
+    def shutdown(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def record(self, key, rows, seconds):
+        """记录一次实测耗时，单行耗时取指数平均"""
+        if rows <= 0:
+            return
+        cost = seconds / rows
+        previous = self.row_costs.get(key)
+        self.row_costs[key] = cost if previous is None else 0.7 * previous + 0.3 * cost
+
+    def task_rows(self, key, rows, workers, align=1, min_rows=DEFAULT_CHUNK_SIZE):
+        """按单行耗时给出每个进程池任务的行数（不少于 min_rows）；返回 None 表示应在本进程计算"""
+        cost = self.row_costs.get(key)
+        if workers <= 1 or rows <= align or cost is None or rows * cost < self.min_parallel_seconds:
+            return None
+        size = min(self.target_task_seconds / max(cost, 1e-12), math.ceil(rows / (workers * TASKS_PER_WORKER)))
+        size = max(min(size, MAX_TASK_ROWS), min_rows, align)
+        return int(math.ceil(size / align) * align)
+
+    def run(self, key, total, local, remote, workers=None, local_rows=DEFAULT_CHUNK_SIZE, align=1, split=None):
+        """按行区间分块计算 total 行，返回 ChunkedRun（可迭代，按区间顺序产出各块结果）。
+
+        local(start, stop) 在本进程计算；remote(start, stop) 为可序列化（模块级函数或其 partial）的
+        同一计算，在工作进程中执行。align 为分块边界的对齐行数（如独立播种的样本块）。
+        local_rows 同时是进程池任务的最小行数：单行耗时较长的任务（如生成文档）可取较小值。
+        输入较大时可给出 split(start, stop)（在本进程调用）取该区间的输入，进程池任务改为调用
+        remote(split(start, stop))，每个任务只序列化自己的那部分输入。
+        """
+        return ChunkedRun(self, key, total, local, remote, self.resolve_workers(workers), local_rows, align, split)
+
+
+class ChunkedRun:
+    """一次分块计算：先在本进程计算首块并计时，再据此决定剩余部分在本进程还是进程池中完成。
+
+    迭代结束后 workers 为实际使用的进程数，task_rows 为进程池任务的行数（未使用进程池时为 None）。
+    """
+
+    def __init__(self, executor, key, total, local, remote, workers, local_rows, align, split=None):
+        self.executor = executor
+        self.key = key
+        self.total = total
+        self.local = local
+        self.remote = remote
+        self.split = split
+        self.workers = 1
+        self.max_workers = workers
+        self.local_rows = max(int(math.ceil(local_rows / align) * align), align)
+        self.align = align
+        self.task_rows = None
+
+    def _ranges(self, start, size):
+        return [(begin, min(begin + size, self.total)) for begin in range(start, self.total, size)]
+
+    def __iter__(self):
+        if self.total <= 0:
+            return
+        pilot = min(self.local_rows, self.total)
+        # 先计时再产出：耗时只含首块计算本身，不含调用方处理结果（合并、写出、网络背压）的时间
+        started = time.perf_counter()
+        result = self.local(0, pilot)
+        self.executor.record(self.key, pilot, time.perf_counter() - started)
+        yield result
+
+        self.task_rows = self.executor.task_rows(self.key, self.total - pilot, self.max_workers, self.align,
+                                                 self.local_rows)
+        if self.task_rows is None:
+            for start, stop in self._ranges(pilot, self.local_rows):
+                yield self.local(start, stop)
+            return
+        ranges = self._ranges(pilot, self.task_rows)
+        self.workers = min(self.max_workers, len(ranges))
+        pool = self.executor.pool(self.max_workers)
+        # map 按提交顺序返回结果，即按区间顺序合并
+        if self.split is not None:
+            yield from pool.map(self.remote, [self.split(start, stop) for start, stop in ranges])
+            return
+        yield from pool.map(self.remote, [start for start, _ in ranges], [stop for _, stop in ranges])
+
+
+DEFAULT_EXECUTOR = ParallelExecutor()
@@ -0,0 +1,101 @@
+"""管径反算：给定输送流量与目标流速比 V/Vc，反求管道内径 D 或体积浓度 Cv"""
+import math
+
+import numpy as np
+
+from formula_registry import collect_row_errors
+from solvers import illinois_bracketed
+
+# 支持反算的临界流速公式
+SIZING_FORMULAS = ("liu_dezhong", "wasp", "fei_xiangjun")
+
+# 各求解变量的默认搜索区间
+DEFAULT_BOUNDS = {
+    "D": (0.005, 10.0),
+    "Cv": (1e-6, 1.0),
+}
+
+
+class PipeSizingSolver:
+    """管径/浓度反算器：基于 calculate_batch 的向量化求根，可一次求解整张管径表或多个工况"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def solve(self, formula_id, unknown, columns, target_ratio, bounds=None):
+        """反算 unknown（"D" 或 "Cv"），使运行流速 V = 4Q/(πD²) 恰为 target_ratio 倍的 Vc。
+
+        columns 需包含浆体体积流量 Q（m³/s）及公式的其余参数，可为数组或标量；
+        反算 Cv 时需给出 D。在 ln(x) 上求解 ln V - ln(ratio·Vc) = 0：
+        各公式对 D、Cv 均为幂律，该函数在对数坐标下近似线性，试位法通常 2～3 次迭代即收敛。
+        """
+        if formula_id not in SIZING_FORMULAS:
+            raise ValueError(f"公式 {formula_id} 不支持反算，可选：{', '.join(SIZING_FORMULAS)}")
+        if unknown not in DEFAULT_BOUNDS:
+            raise ValueError("反算变量 unknown 只能为 D 或 Cv")
+        lo_bound, hi_bound = bounds or DEFAULT_BOUNDS[unknown]
+        if not 0 < lo_bound < hi_bound:
+            raise ValueError("搜索区间需满足 0 < 下限 < 上限")
+
+        columns = {name: value for name, value in columns.items() if name != unknown}
+        columns['target_ratio'] = target_ratio
+        cols, n = self.engine.prepare_columns(columns)
+        Q = cols.pop('Q', np.full(n, np.nan))
+        ratio = cols.pop('target_ratio')
+        errors = collect_row_errors(n, [
+            (~(Q > 0), "反算需要浆体体积流量 Q（m³/s）且 Q > 0"),
+            (~(ratio > 0), "目标流速比 target_ratio 必须大于0"),
+            ((unknown == "Cv") & ~(cols.get('D', np.full(n, np.nan)) > 0), "反算 Cv 需要管道内径 D 且 D > 0"),
+        ])
+
+        def velocity(x, index):
+            D = x if unknown == "D" else cols['D'][index]
+            return 4.0 * Q[index] / (math.pi * D ** 2)
+
+        def evaluate(x, index):
+            sub = {name: column[index] for name, column in cols.items()}
+            sub[unknown] = x
+            return self.engine.calculate_batch(formula_id, sub, rounded=False)
+
+        def residual(u, index):
+            x = np.exp(u)
+            batch = evaluate(x, index)
+            with np.errstate(all='ignore'):
+                return np.log(velocity(x, index)) - np.log(ratio[index] * batch["Vc"])
+
+        solvable = errors == None  # noqa: E711
+        x = np.full(n, np.nan)
+        iterations = np.zeros(n, dtype=np.int64)
+        residuals = np.full(n, np.nan)
+        index = np.flatnonzero(solvable)
+        if index.size:
+            lo = np.full(index.size, math.log(lo_bound))
+            hi = np.full(index.size, math.log(hi_bound))
+            u, iterations[index], residuals[index] = illinois_bracketed(
+                lambda u, i: residual(u, index[i]), lo, hi)
+            x[index] = np.exp(u)
+
+        # 在解处（无解时在区间下限）复算一次，取得 Vc 与逐行错误信息
+        everything = np.arange(n)
+        x_eval = np.where(np.isnan(x), lo_bound, x)
+        batch = evaluate(x_eval, everything)
+        V = velocity(x_eval, everything)
+        for i in np.flatnonzero(solvable):
+            if batch["errors"][i] is not None:
+                errors[i] = batch["errors"][i]
+            elif np.isnan(x[i]):
+                errors[i] = f"在 {unknown}∈[{lo_bound:g}, {hi_bound:g}] 内无法达到目标流速比，请调整搜索区间或输入参数"
+        failed = errors != None  # noqa: E711
+
+        with np.errstate(all='ignore'):
+            achieved = V / batch["Vc"]
+        return {
+            unknown: np.where(failed, np.nan, x),
+            "V": np.where(failed, np.nan, V),
+            "Vc": np.where(failed, np.nan, batch["Vc"]),
+            "ratio": np.where(failed, np.nan, achieved),
+            "iterations": iterations,
+            "residual": np.where(failed, np.nan, residuals),
+            "errors": errors.tolist(),
+            "count": n,
+        }
@@ -0,0 +1,265 @@
+"""项目工作区：一组相互关联的计算构成有向无环图（DAG），修改某个节点后只重算受影响的下游节点。
+
+每个节点是一次公式计算，参数可为给定值，也可链接到上游节点的输出，例如：
+    mix  = density_mixing(C_w, rho_g, rho_s)          -> rho_k
+    fric = darcy_friction(Re, D)                      -> lambda_coef
+    loss = friction_loss(lambda_coef <- fric, rho_k <- mix, V, D, rho_s)
+修改 mix 的参数后按拓扑顺序重算 mix、loss；节点的实际输入与上次相同则沿用上次结果（记忆化），
+结果不变的节点不再向下游传播。
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# 单个项目的节点数上限
+MAX_NODES = 5000
+
+
+class Node:
+    """一个计算节点。parameters 为给定参数；links 为 {参数名: (上游节点ID, 输出键)}"""
+
+    def __init__(self, node_id, formula_id, parameters, links):
+        self.id = node_id
+        self.formula_id = formula_id
+        self.parameters = parameters
+        self.links = links
+        # 上次计算时的实际输入（给定参数与链接值合并后），用于判断是否需要重算
+        self.inputs = None
+        self.result = None
+        self.error = None
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "formula_id": self.formula_id,
+            "parameters": self.parameters,
+            "links": {name: {"node": source, "output": output} for name, (source, output) in self.links.items()},
+            "inputs": self.inputs,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class Project:
+    """由计算节点组成的 DAG。calculate(formula_id, parameters) 为计算函数（通常为带缓存的 ResultCache.calculate）。
+
+    结构变化（增删节点、修改链接）后重建拓扑顺序；每次修改返回本次的重算统计。
+    """
+
+    def __init__(self, registry, calculate, name=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.registry = registry
+        self.calculate = calculate
+        self.nodes = {}
+        self._children = {}
+        self._order = []
+        self._lock = threading.Lock()
+
+    def _parse_links(self, node_id, links):
+        """链接写法：{"rho_k": "mix"}（取上游公式的输出量）或 {"rho_k": "mix.rho_k"}、{"rho_k": {"node": "mix", "output": "rho_k"}}"""
+        parsed = {}
+        for name, target in (links or {}).items():
+            if isinstance(target, dict):
+                source, output = target.get("node"), target.get("output")
+            elif isinstance(target, str):
+                source, _, output = target.partition(".")
+            else:
+                raise ValueError(f"节点 {node_id} 的参数 {name} 链接格式无效")
+            if source not in self.nodes:
+                raise ValueError(f"节点 {node_id} 的参数 {name} 链接到不存在的节点 {source}")
+            if source == node_id:
+                raise ValueError(f"节点 {node_id} 的参数 {name} 不能链接到自身")
+            parsed[name] = (source, output or self.registry.get(self.nodes[source].formula_id).output)
+        return parsed
+
+    def _rebuild_order_locked(self):
+        """按链接重建下游表与拓扑顺序（Kahn 算法）；存在环时抛出 ValueError"""
+        children = {node_id: [] for node_id in self.nodes}
+        indegree = dict.fromkeys(self.nodes, 0)
+        for node in self.nodes.values():
+            for source in {source for source, _ in node.links.values()}:
+                children[source].append(node.id)
+                indegree[node.id] += 1
+        ready = [node_id for node_id, degree in indegree.items() if degree == 0]
+        order = []
+        while ready:
+            node_id = ready.pop()
+            order.append(node_id)
+            for child in children[node_id]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+        if len(order) != len(self.nodes):
+            cycle = sorted(node_id for node_id, degree in indegree.items() if degree)
+            raise ValueError(f"节点链接存在循环（涉及 {'、'.join(cycle)}）")
+        self._children = children
+        self._order = order
+
+    def _recompute_locked(self, dirty):
+        """按拓扑顺序重算 dirty 中的节点；结果变化的节点将其下游加入 dirty"""
+        started = time.perf_counter()
+        dirty = set(dirty)
+        calculated, reused, changed = [], 0, []
+        for node_id in self._order:
+            if node_id not in dirty:
+                continue
+            node = self.nodes[node_id]
+            inputs, error = dict(node.parameters), None
+            for name, (source, output) in node.links.items():
+                upstream = self.nodes[source]
+                if upstream.result is None:
+                    error = f"上游节点 {source} 无计算结果"
+                    break
+                if output not in upstream.result:
+                    error = f"上游节点 {source} 的结果中没有 {output}"
+                    break
+                inputs[name] = upstream.result[output]
+            if error is None and inputs == node.inputs and node.error is None:
+                # 实际输入未变，沿用上次结果
+                reused += 1
+                continue
+            previous = (node.result, node.error)
+            node.inputs = inputs
+            if error is None:
+                try:
+                    node.result, node.error = self.calculate(node.formula_id, inputs), None
+                except Exception as e:
+                    # 单个节点出错不影响其余节点，错误记录在节点上
+                    node.result, node.error = None, str(e)
+                calculated.append(node_id)
+            else:
+                node.result, node.error = None, error
+            if (node.result, node.error) != previous:
+                changed.append(node_id)
+                dirty.update(self._children[node_id])
+        return {
+            "calculated": len(calculated),
+            "reused": reused,
+            "changed": changed,
+            "nodes": len(self.nodes),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def _new_node_locked(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError("节点需为对象")
+        node_id = spec.get("id")
+        if not isinstance(node_id, str) or not node_id or "." in node_id:
+            raise ValueError("节点ID需为不含 . 的非空字符串")
+        if node_id in self.nodes:
+            raise ValueError(f"节点ID重复: {node_id}")
+        if len(self.nodes) >= MAX_NODES:
+            raise ValueError(f"项目节点数超过上限 {MAX_NODES}")
+        formula_id = spec.get("formula_id")
+        self.registry.get(formula_id)
+        return Node(node_id, formula_id, dict(spec.get("parameters") or {}), self._parse_links(node_id, spec.get("links")))
+
+    def add_nodes(self, specs):
+        """添加节点 [{id, formula_id, parameters, links}, ...] 并计算；节点只能链接到已有节点或本批中排在前面的节点。
+        任一节点有误时不做任何修改"""
+        with self._lock:
+            added = []
+            try:
+                for spec in specs:
+                    node = self._new_node_locked(spec)
+                    self.nodes[node.id] = node
+                    added.append(node.id)
+                self._rebuild_order_locked()
+            except ValueError:
+                for node_id in added:
+                    del self.nodes[node_id]
+                raise
+            return self._recompute_locked(added)
+
+    def update_node(self, node_id, parameters=None, links=None, replace=False):
+        """修改节点参数（合并，replace=True 时整体替换；值为 None 的参数删除）与链接，只重算受影响的下游节点"""
+        with self._lock:
+            node = self._get_locked(node_id)
+            if links is not None:
+                previous_links = node.links
+                node.links = self._parse_links(node_id, links)
+                try:
+                    self._rebuild_order_locked()
+                except ValueError:
+                    node.links = previous_links
+                    raise
+            if parameters is not None:
+                merged = {} if replace else dict(node.parameters)
+                merged.update(parameters)
+                node.parameters = {name: value for name, value in merged.items() if value is not None}
+            return self._recompute_locked([node_id])
+
+    def remove_node(self, node_id):
+        """删除节点；仍有下游节点链接到它时拒绝删除"""
+        with self._lock:
+            self._get_locked(node_id)
+            dependents = self._children[node_id]
+            if dependents:
+                raise ValueError(f"节点 {node_id} 被 {'、'.join(dependents)} 引用，请先修改这些节点的链接")
+            del self.nodes[node_id]
+            self._rebuild_order_locked()
+
+    def recompute(self):
+        """全部重算（忽略记忆的输入）"""
+        with self._lock:
+            for node in self.nodes.values():
+                node.inputs = None
+            return self._recompute_locked(self.nodes)
+
+    def _get_locked(self, node_id):
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise KeyError(node_id)
+        return node
+
+    def node(self, node_id):
+        with self._lock:
+            return self._get_locked(node_id).as_dict()
+
+    def as_dict(self, node_ids=None):
+        """项目内容（节点按拓扑顺序）；给出 node_ids 时只含这些节点"""
+        with self._lock:
+            selected = self._order if node_ids is None else [node_id for node_id in self._order if node_id in node_ids]
+            return {
+                "id": self.id,
+                "name": self.name,
+                "nodes": [self.nodes[node_id].as_dict() for node_id in selected],
+            }
+
+
+class ProjectRegistry:
+    """内存中的项目（有界，线程安全；超出上限时丢弃最久未访问的项目）"""
+
+    def __init__(self, registry, calculate, maxsize=64):
+        self.registry = registry
+        self.calculate = calculate
+        self.maxsize = maxsize
+        self._projects = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, nodes, name=None):
+        """新建项目并计算全部节点，返回 (Project, 计算统计)"""
+        project = Project(self.registry, self.calculate, name)
+        stats = project.add_nodes(nodes or [])
+        with self._lock:
+            self._projects[project.id] = project
+            while len(self._projects) > self.maxsize:
+                self._projects.popitem(last=False)
+        return project, stats
+
+    def get(self, project_id):
+        with self._lock:
+            project = self._projects.get(project_id)
+            if project is not None:
+                self._projects.move_to_end(project_id)
+            return project
+
+    def delete(self, project_id):
+        with self._lock:
+            return self._projects.pop(project_id, None) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._projects)
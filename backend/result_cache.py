@@ -0,0 +1,102 @@
+"""计算结果缓存：在 CalculationEngine.calculate 之前做有界 LRU 记忆化"""
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+# 默认缓存条目数
+DEFAULT_MAXSIZE = 1024
+
+
+def _normalize_value(value):
+    """规范化单个参数值：数值统一为 12 位有效数字的 float，其余类型保持可哈希"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(f"{float(value):.12g}") + 0.0
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ResultCache:
+    """计算结果的 LRU 缓存。
+
+    键为 (引擎版本, 公式ID, 规范化参数)：只保留公式实际使用的参数并补齐默认值，
+    因此 g 省略与显式传入 9.81 命中同一条目。只缓存成功的结果，返回值为副本。
+    """
+
+    def __init__(self, engine, maxsize=DEFAULT_MAXSIZE):
+        self.engine = engine
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = engine.VERSION
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, formula_id, parameters):
+        """生成规范化缓存键；未知公式返回 None（不缓存，交由引擎报错）"""
+        if formula_id not in self.engine.registry:
+            return None
+        formula = self.engine.registry.get(formula_id)
+        items = []
+        for name in formula.parameter_names:
+            value = parameters.get(name)
+            if value is None:
+                # 与 Formula.prepare 一致：缺失或为 None 的参数取默认值
+                value = formula.defaults.get(name)
+                if value is None:
+                    continue
+            items.append((name, _normalize_value(value)))
+        for option in formula.options:
+            value = parameters.get(option.name)
+            items.append((option.name, option.default if value is None else _normalize_value(value)))
+        return (self.engine.VERSION, formula_id, tuple(items))
+
+    def calculate(self, formula_id, parameters):
+        """带缓存的计算：命中则返回缓存结果副本，否则调用引擎并写入缓存"""
+        key = self.make_key(formula_id, parameters)
+        if key is None:
+            return self.engine.calculate(formula_id, parameters)
+        with self._lock:
+            if self._version != self.engine.VERSION:
+                self._invalidate_locked()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry)
+            self.misses += 1
+
+        result = self.engine.calculate(formula_id, parameters)
+
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def invalidate(self):
+        """清空缓存（计数器保留）"""
+        with self._lock:
+            self._invalidate_locked()
+
+    def _invalidate_locked(self):
+        self._entries.clear()
+        self._version = self.engine.VERSION
+
+    def stats(self):
+        """缓存统计：命中、未命中、淘汰次数与命中率"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "engine_version": self._version,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,184 @@
+"""线路纵断面计算：按桩号表逐段计算沿程摩阻损失，累加得到水力坡降线，并标出满足加速流条件的管段"""
+import math
+
+import numpy as np
+
+from batch_io import rows_to_columns
+
+# 单次计算的桩号数上限
+MAX_STATIONS = 1_000_000
+
+# 可按桩号逐站给出、也可作为全线统一值给出的参数
+SPAN_PARAMETERS = ("D", "lambda_coef", "V", "Q", "rho_k", "rho_s", "g", "epsilon", "nu")
+
+
+def station_columns(stations):
+    """桩号表可为行列表 [{chainage, Z, ...}, ...] 或列式 {参数名: 列表}；行中的非数值单元格直接报错"""
+    if isinstance(stations, dict):
+        return stations
+    if not isinstance(stations, (list, tuple)):
+        raise ValueError("桩号表 stations 需为行列表或列对象")
+    columns, row_errors = rows_to_columns(list(stations))
+    for i, error in enumerate(row_errors):
+        if error is not None:
+            raise ValueError(f"第 {i + 1} 个桩号：{error}")
+    return columns
+
+
+class RouteProfile:
+    """线路计算器。
+
+    第 k 段为第 k 站至第 k+1 站，段内 D、λ、V 等取起点站的值（未给出时取全线统一值）；
+    i_k 由 friction_loss 批量计算，累计损失与水力坡降线由累加得到，
+    各段是否满足加速流条件由 slurry_accel_energy 批量判断。全程为数组运算，万级桩号在毫秒量级完成。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def run(self, stations, flow=None, start_head=None, end_head=0.0, method=None):
+        """计算整条线路。
+
+        stations 至少包含桩号 chainage（m，严格递增）与高程 Z（m），可逐站给出 SPAN_PARAMETERS 及压头 H；
+        flow 为全线统一参数。流速 V 缺省时由流量 Q 按 V = 4Q/(πD²) 换算；λ 缺省时由运动粘度 nu
+        求 Re = V·D/ν，再按 darcy_friction（method 为湍流计算方法）计算。
+        管段长度取斜长 √(Δ桩号² + ΔZ²)。给定 start_head（起点压头）时水力坡降线自起点向下游推算，
+        否则按终点剩余压头 end_head 自终点反推，此时起点压头即所需扬程。
+        加速流判断中两端压头取逐站给出的 H，未给出时取 0（即满管、压头相同时高差能否克服摩阻）。
+        """
+        cols, n = self.engine.prepare_columns(station_columns(stations))
+        if n > MAX_STATIONS:
+            raise ValueError(f"桩号数 {n} 超过上限 {MAX_STATIONS}")
+        if n < 2:
+            raise ValueError("线路至少需要 2 个桩号")
+        for name, label in (("chainage", "桩号 chainage"), ("Z", "高程 Z")):
+            if name not in cols:
+                raise ValueError(f"桩号表缺少{label}")
+            bad = np.flatnonzero(~np.isfinite(cols[name]))
+            if bad.size:
+                raise ValueError(f"第 {bad[0] + 1} 个桩号的{label}缺失或无效")
+        chainage, Z = cols['chainage'], cols['Z']
+        dx = np.diff(chainage)
+        bad = np.flatnonzero(~(dx > 0))
+        if bad.size:
+            raise ValueError(f"桩号 chainage 必须严格递增（第 {bad[0] + 2} 个桩号）")
+        dz = np.diff(Z)
+        L = np.hypot(dx, dz)
+
+        spans = self._span_parameters(cols, flow or {}, n - 1)
+        if np.isnan(spans['V']).any() and 'Q' in spans:
+            with np.errstate(all='ignore'):
+                spans['V'] = np.where(np.isnan(spans['V']), 4.0 * spans['Q'] / (math.pi * spans['D'] ** 2), spans['V'])
+        self._fill_lambda(spans, method)
+
+        friction = self.engine.calculate_batch("friction_loss", {
+            name: spans[name] for name in self.engine.registry.get("friction_loss").parameter_names
+            if name in spans
+        }, rounded=False)
+        self._raise_span_error(friction["errors"], chainage)
+        i = friction["i_k"]
+        loss = i * L
+        cumulative = np.concatenate(([0.0], np.cumsum(loss)))
+
+        if start_head is not None:
+            hgl = Z[0] + float(start_head) - cumulative
+        else:
+            hgl = Z[-1] + float(end_head) + (cumulative[-1] - cumulative)
+        pressure_head = hgl - Z
+
+        H = cols.get('H', np.zeros(n))
+        H = np.where(np.isnan(H), 0.0, H)
+        accel = self.engine.calculate_batch("slurry_accel_energy", {
+            "Z1": Z[:-1], "Z2": Z[1:], "H1": H[:-1], "H2": H[1:], "i": i, "L": L,
+        }, rounded=False)
+        self._raise_span_error(accel["errors"], chainage)
+        flags = accel["condition_met"]
+
+        lowest = int(np.argmin(pressure_head))
+        return {
+            "count": n,
+            "chainage": chainage,
+            "Z": Z,
+            "cumulative_loss": cumulative,
+            "hgl": hgl,
+            "pressure_head": pressure_head,
+            "spans": {
+                "L": L,
+                "D": spans['D'],
+                "V": spans['V'],
+                "lambda_coef": spans['lambda_coef'],
+                "i": i,
+                "loss": loss,
+                "accel": flags,
+            },
+            "accel_runs": self._runs(flags, chainage, Z, loss),
+            "summary": {
+                "total_length": float(L.sum()),
+                "total_loss": float(cumulative[-1]),
+                "static_lift": float(Z[-1] - Z[0]),
+                "start_head": float(pressure_head[0]),
+                "end_head": float(pressure_head[-1]),
+                "min_pressure_head": float(pressure_head[lowest]),
+                "min_pressure_chainage": float(chainage[lowest]),
+                "negative_pressure_stations": int((pressure_head < 0).sum()),
+                "accel_spans": int(flags.sum()),
+            },
+        }
+
+    def _span_parameters(self, cols, flow, m):
+        """每段参数取起点站的逐站值，缺失处回退到全线统一值"""
+        spans = {}
+        for name in SPAN_PARAMETERS:
+            uniform = flow.get(name)
+            if uniform is not None:
+                try:
+                    uniform = float(uniform)
+                except (TypeError, ValueError):
+                    raise ValueError(f"参数 {name} 不是有效数值: {uniform}")
+            if name in cols:
+                column = cols[name][:-1].copy()
+                if uniform is not None:
+                    column[np.isnan(column)] = uniform
+                spans[name] = column
+            elif uniform is not None:
+                spans[name] = np.full(m, uniform)
+        for name in ("D", "V", "lambda_coef"):
+            spans.setdefault(name, np.full(m, np.nan))
+        return spans
+
+    def _fill_lambda(self, spans, method):
+        """λ 缺失的管段：给出运动粘度 nu 时按 darcy_friction 计算"""
+        missing = np.isnan(spans['lambda_coef'])
+        if not missing.any() or 'nu' not in spans:
+            return
+        columns = {
+            "Re": spans['V'][missing] * spans['D'][missing] / spans['nu'][missing],
+            "D": spans['D'][missing],
+            "method": method,
+        }
+        if 'epsilon' in spans:
+            columns["epsilon"] = spans['epsilon'][missing]
+        darcy = self.engine.calculate_batch("darcy_friction", columns, rounded=False)
+        spans['lambda_coef'][missing] = darcy["lambda_coef"]
+
+    @staticmethod
+    def _raise_span_error(errors, chainage):
+        for k, error in enumerate(errors):
+            if error is not None:
+                raise ValueError(f"第 {k + 1} 段（桩号 {chainage[k]:g}～{chainage[k + 1]:g}）：{error}")
+
+    @staticmethod
+    def _runs(flags, chainage, Z, loss):
+        """将相邻的加速流管段合并为区间，给出起止桩号、高差与区间内摩阻损失"""
+        edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        cumulative = np.concatenate(([0.0], np.cumsum(loss)))
+        return [{
+            "from_station": int(a),
+            "to_station": int(b),
+            "start_chainage": float(chainage[a]),
+            "end_chainage": float(chainage[b]),
+            "drop": float(Z[a] - Z[b]),
+            "friction_loss": float(cumulative[b] - cumulative[a]),
+        } for a, b in zip(starts, ends)]
@@ -0,0 +1,213 @@
+"""灵敏度分析：与结果同一次计算给出主结果对各输入参数的偏导数与弹性系数（∂ln y/∂ln x）"""
+import math
+
+import numpy as np
+
+from calculation_engine import DL_COEFFICIENTS
+from friction import swamee_jain
+
+
+def _power_law(exponents, rho_exponent):
+    """幂律公式 y = c·Π x^a·Δ^e（Δ = (ρg-ρk)/ρk）的弹性系数：各参数为常数 a，ρg、ρk 经 Δ 传递"""
+    def kernel(cols, batch, output):
+        rho_g, rho_k = cols['rho_g'], cols['rho_k']
+        elasticities = {name: np.full(output.shape, float(a)) for name, a in exponents.items()}
+        share = rho_g / (rho_g - rho_k)
+        elasticities['rho_g'] = rho_exponent * share
+        elasticities['rho_k'] = -rho_exponent * share
+        return None, elasticities
+    return kernel
+
+
+# Vc = c·[g·D·Δ·ω]^(1/3)·Cv^(1/6)·(ω_s/ω)^(1/6)
+_liu_dezhong = _power_law({
+    "D": 1/3, "omega": 1/3 - 1/6, "Cv": 1/6, "omega_s": 1/6, "g": 1/3, "coefficient_9_5": 1.0,
+}, 1/3)
+
+# Vc = c·Cv^0.1858·[2g·D·Δ]^(1/2)·(d85/D)^(1/6)
+_wasp = _power_law({
+    "D": 1/2 - 1/6, "Cv": 0.1858, "d85": 1/6, "g": 1/2, "coefficient_3_113": 1.0,
+}, 1/2)
+
+# Vc = (c/√λ)·[g·D·Δ·ω]^(1/2)·Cv^0.25·(d90/D)^(1/3)
+_fei_xiangjun = _power_law({
+    "D": 1/2 - 1/3, "Cv": 0.25, "omega": 1/2, "d90": 1/3, "lambda_coef": -1/2, "g": 1/2,
+    "coefficient_2_26": 1.0,
+}, 1/2)
+
+
+def _kronodze_pressure(cols, batch, output):
+    """对 DL 的隐式方程 F(DL; Qk, Cd, β) = a·β·DL·(1 + b·Cd^q·DL^(pq)) - Qk = 0 隐式求导：
+    dDL/dθ = -(∂F/∂θ)/(∂F/∂DL)，再经 Qk、Cd、DL 链式传递到 V_L；dp 只切换分支，导数为0"""
+    K, G, W, rho_g, dp, beta = (cols[name] for name in ("K", "G", "W", "rho_g", "dp", "beta"))
+    Qk = batch["intermediate"]["step_A_Qk"]
+    Cd = batch["intermediate"]["Cd"]
+    DL = batch["intermediate"]["step_B_DL_mm"]
+    small = dp <= 0.07
+    a = np.where(small, DL_COEFFICIENTS[True][0], DL_COEFFICIENTS[False][0])
+    b = np.where(small, DL_COEFFICIENTS[True][1], DL_COEFFICIENTS[False][1])
+    p = np.where(small, DL_COEFFICIENTS[True][2], DL_COEFFICIENTS[False][2])
+    q = np.where(small, DL_COEFFICIENTS[True][3], DL_COEFFICIENTS[False][3])
+
+    dl_pq = DL ** (p * q)
+    F_DL = a * beta * (1.0 + b * Cd ** q * (1.0 + p * q) * dl_pq)
+    F_Cd = a * beta * DL * b * q * Cd ** (q - 1.0) * dl_pq
+    F_beta = Qk / beta
+    # V_L = 0.255·β·(1 + 2.48·Cd^(1/3)·DL^(1/4))
+    V_beta = output / beta
+    V_Cd = 0.255 * beta * 2.48 / 3.0 * Cd ** (-2.0 / 3.0) * DL ** 0.25
+    V_DL = 0.255 * beta * 2.48 * Cd ** (1.0 / 3.0) * 0.25 * DL ** -0.75
+
+    def total(dQk, dCd, dbeta=0.0, direct=0.0):
+        dDL = -(-dQk + F_Cd * dCd + F_beta * dbeta) / F_DL
+        return direct + V_Cd * dCd + V_DL * dDL
+
+    zero = np.zeros(output.shape)
+    partials = {
+        "K": total(Qk / K, zero),
+        "G": total(K, 100.0 / W),
+        "W": total(K / rho_g, -100.0 * G / W ** 2),
+        "rho_g": total(-K * W / rho_g ** 2, zero),
+        "dp": np.where(np.isnan(output), np.nan, 0.0),
+        "beta": total(zero, zero, 1.0, V_beta),
+    }
+    return partials, None
+
+
+def _friction_loss(cols, batch, output):
+    # i_k = λ·V²·ρ_k/(2g·D·ρ_s)
+    exponents = {"lambda_coef": 1.0, "V": 2.0, "rho_k": 1.0, "D": -1.0, "rho_s": -1.0, "g": -1.0}
+    return None, {name: np.full(output.shape, a) for name, a in exponents.items()}
+
+
+def _density_mixing(cols, batch, output):
+    # ρ_k = 1/(C_w/ρ_g + (1-C_w)/ρ_s)，∂ρ_k/∂x = -ρ_k²·∂denom/∂x
+    C_w, rho_g, rho_s = cols['C_w'], cols['rho_g'], cols['rho_s']
+    square = output ** 2
+    return {
+        "C_w": -square * (1.0 / rho_g - 1.0 / rho_s),
+        "rho_g": square * C_w / rho_g ** 2,
+        "rho_s": square * (1.0 - C_w) / rho_s ** 2,
+    }, None
+
+
+def _colebrook_partials(Re, eps_D, lam):
+    """对 Colebrook 方程 F(x; a, b) = x + 2·log10(a + b·x) = 0（x = 1/√λ，a = (ε/D)/3.7，b = 2.51/Re）隐式求导，
+    返回 (dλ/da, dλ/db)；插值表模式的结果误差在 1e-6 以内，同样按精确解求导"""
+    x = 1.0 / np.sqrt(np.where(np.isnan(lam), swamee_jain(Re, eps_D), lam))
+    s = eps_D / 3.7 + 2.51 / Re * x
+    F_x = 1.0 + 2.0 * (2.51 / Re) / (s * math.log(10.0))
+    dlam_dx = -2.0 / x ** 3
+    return (dlam_dx * -(2.0 / (s * math.log(10.0))) / F_x,
+            dlam_dx * -(2.0 * x / (s * math.log(10.0))) / F_x)
+
+
+def _darcy_friction(cols, batch, output):
+    """层流 λ = 64/Re；湍流 Swamee-Jain λ = 0.25/[log10(t)]²，t = (ε/D)/3.7 + 5.74·Re^-0.9，
+    或 Colebrook-White 方程的隐式导数"""
+    Re, epsilon, D = cols['Re'], cols['epsilon'], cols['D']
+    laminar = batch["intermediate"]["flow_regime"] == "层流"
+    eps_D = epsilon / D
+    # ε/D 取下限 1e-10 时结果与 ε、D 无关
+    active = eps_D > 1e-10
+    if cols.get('method', 'swamee_jain') == 'swamee_jain':
+        t = np.maximum(eps_D, 1e-10) / 3.7 + 5.74 * Re ** -0.9
+        dlam_dt = -0.5 / (math.log(10.0) * t * np.log10(t) ** 3)
+        dlam_dRe = dlam_dt * 5.74 * -0.9 * Re ** -1.9
+        dlam_deps_D = dlam_dt / 3.7
+    else:
+        dlam_da, dlam_db = _colebrook_partials(Re, np.maximum(eps_D, 1e-10), output)
+        dlam_dRe = dlam_db * -2.51 / Re ** 2
+        dlam_deps_D = dlam_da / 3.7
+    return {
+        "Re": np.where(laminar, -64.0 / Re ** 2, dlam_dRe),
+        "epsilon": np.where(laminar | ~active, 0.0, dlam_deps_D / D),
+        "D": np.where(laminar | ~active, 0.0, dlam_deps_D * -epsilon / D ** 2),
+    }, None
+
+
+def _slurry_accel_energy(cols, batch, output):
+    # 判断结果为布尔量，对判断余量 (Z₁+H₁)-(Z₂+H₂)-i·L 求导
+    one = np.ones(output.shape)
+    return {
+        "Z1": one, "Z2": -one, "H1": one, "H2": -one,
+        "i": -cols['L'], "L": -cols['i'],
+    }, None
+
+
+# 公式ID -> 灵敏度内核 kernel(列, 批量结果, 主结果) -> (偏导数, 弹性系数)，二者给出其一，另一个由换算得到
+SENSITIVITY_KERNELS = {
+    "liu_dezhong": _liu_dezhong,
+    "wasp": _wasp,
+    "fei_xiangjun": _fei_xiangjun,
+    "kronodze_pressure": _kronodze_pressure,
+    "friction_loss": _friction_loss,
+    "density_mixing": _density_mixing,
+    "darcy_friction": _darcy_friction,
+    "slurry_accel_energy": _slurry_accel_energy,
+}
+
+
+class SensitivityAnalysis:
+    """灵敏度分析器：一次批量计算（不四舍五入）后按解析式求全部偏导数，支持单工况与多工况列输入"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def run(self, formula_id, columns):
+        """返回 {value, partials, elasticities, ranking, errors, ...}；partials/elasticities 为 {参数名: 数组}。
+
+        ranking 按 |弹性系数|（多工况时取有效行平均）由大到小列出调用方给出的参数（未给出、取默认值的
+        经验系数等不参与排序），即对结果影响最大的测量量排在最前。
+        加速流判断的主结果为布尔量，此时 quantity 为 "margin"，对判断余量求导。
+        """
+        formula = self.engine.registry.get(formula_id)
+        kernel = SENSITIVITY_KERNELS.get(formula_id)
+        if kernel is None:
+            raise ValueError(f"公式 {formula_id} 暂不支持灵敏度分析")
+        numeric, options = formula.split_options(columns)
+        cols, n = self.engine.prepare_columns(numeric)
+        cols, _ = formula.prepare_columns(cols, n)
+        batch = self.engine.calculate_batch(formula_id, {**cols, **options}, rounded=False)
+        cols.update(options)
+        failed = np.array([error is not None for error in batch["errors"]], dtype=bool)
+
+        quantity, unit = formula.output, formula.unit
+        output = batch[formula.output]
+        if output.dtype == bool:
+            quantity, unit = "margin", "m"
+            output = batch["intermediate"]["head_diff"] - batch["intermediate"]["friction_loss_total"]
+        output = np.where(failed, np.nan, output)
+
+        with np.errstate(all='ignore'):
+            partials, elasticities = kernel(cols, batch, output)
+            if partials is None:
+                partials = {name: e * output / cols[name] for name, e in elasticities.items()}
+            if elasticities is None:
+                elasticities = {name: d * cols[name] / output for name, d in partials.items()}
+        partials = {name: np.where(failed, np.nan, partials[name]) for name in formula.parameter_names}
+        elasticities = {name: np.where(failed, np.nan, elasticities[name]) for name in formula.parameter_names}
+
+        return {
+            "formula_id": formula_id,
+            "output": formula.output,
+            "quantity": quantity,
+            "unit": unit,
+            "value": output,
+            "partials": partials,
+            "elasticities": elasticities,
+            "ranking": self._ranking({name: elasticities[name] for name in formula.parameter_names
+                                      if columns.get(name) is not None}, failed),
+            "errors": batch["errors"],
+            "count": n,
+        }
+
+    def _ranking(self, elasticities, failed):
+        if failed.all():
+            return []
+        weight = {}
+        for name, column in elasticities.items():
+            magnitude = np.abs(column[~failed])
+            magnitude = magnitude[np.isfinite(magnitude)]
+            weight[name] = float(magnitude.mean()) if magnitude.size else 0.0
+        return sorted(weight, key=lambda name: -weight[name])
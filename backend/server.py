@@ -0,0 +1,279 @@
+"""生产模式 HTTP 服务：固定大小线程池的 WSGI 服务器，支持 HTTP/1.1 长连接与优雅退出
+
+基于标准库 wsgiref/http.server 实现，不引入额外依赖。与开发服务器不同，连接由固定数量的工作线程处理，
+慢请求（如 Word 导出）只占用一个线程，不会阻塞其他接口；同一连接可连续发送多个请求，省去反复建连。
+收到 SIGINT/SIGTERM（Windows 下还有 CTRL_BREAK）后停止接受新连接，等待进行中的请求完成
+（最长 shutdown_grace 秒）再退出。
+
+请求体可给出 Content-Length，也可以 Transfer-Encoding: chunked 分块上传（如边生成边上传的 NDJSON/CSV 批量输入）。
+
+可通过环境变量配置：SERVER_THREADS、SERVER_BACKLOG、SERVER_KEEPALIVE（等待下一个请求的空闲超时，秒）、
+SERVER_IO_TIMEOUT（读取请求、写出响应时单次收发无进展的超时，秒）、SERVER_SHUTDOWN_GRACE（秒）。
+"""
+import io
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+
+from werkzeug.wsgi import LimitedStream
+
+DEFAULT_THREADS = int(os.environ.get('SERVER_THREADS') or 8)
+DEFAULT_BACKLOG = int(os.environ.get('SERVER_BACKLOG') or 64)
+DEFAULT_KEEPALIVE = float(os.environ.get('SERVER_KEEPALIVE') or 5)
+DEFAULT_IO_TIMEOUT = float(os.environ.get('SERVER_IO_TIMEOUT') or 300)
+DEFAULT_SHUTDOWN_GRACE = float(os.environ.get('SERVER_SHUTDOWN_GRACE') or 10)
+
+
+class _ResponseHandler(ServerHandler):
+    """HTTP/1.1 响应：未给出 Content-Length 的流式响应以关闭连接结束，其余响应保持连接"""
+
+    http_version = "1.1"
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        if 'Content-Length' not in self.headers:
+            self.request_handler.close_connection = True
+        if self.request_handler.close_connection:
+            self.headers['Connection'] = 'close'
+
+
+class _ChunkDecoder(io.RawIOBase):
+    """解码 Transfer-Encoding: chunked 的请求体，读到末尾的零长度块（及其后的 trailer）后返回 EOF"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._remaining = 0
+        self._done = False
+        self._broken = False
+
+    def readable(self):
+        return True
+
+    def _next_chunk(self):
+        line = self._stream.readline(65537)
+        try:
+            size = int(line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            size = -1
+        if size < 0:
+            # 此后无法定位下一个请求，连接随后关闭
+            self._broken = True
+            raise ValueError(f"分块请求体格式无效: {line[:40]!r}")
+        if size == 0:
+            # 跳过 trailer，直到空行
+            while self._stream.readline(65537) not in (b'\r\n', b'\n', b''):
+                pass
+            self._done = True
+        self._remaining = size
+
+    def readinto(self, buffer):
+        if self._broken:
+            raise ValueError("分块请求体格式无效")
+        if self._done:
+            return 0
+        if self._remaining == 0:
+            self._next_chunk()
+            if self._done:
+                return 0
+        data = self._stream.read(min(len(buffer), self._remaining))
+        if not data:
+            raise ConnectionError("分块请求体不完整")
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            # 每块数据后的 CRLF
+            self._stream.readline(3)
+        return len(data)
+
+
+class _ChunkedBody(io.BufferedReader):
+    """分块请求体：与 LimitedStream 一样提供 exhaust()，响应后读尽未读部分"""
+
+    def __init__(self, stream):
+        super().__init__(_ChunkDecoder(stream))
+
+    def exhaust(self):
+        while self.read(65536):
+            pass
+
+
+class _RequestHandler(WSGIRequestHandler):
+    """在同一连接上循环处理请求；请求体包装为定长流（或解码分块请求体），响应后读尽未读部分，以便正确读取下一个请求行。
+
+    等待请求行时按空闲超时（keepalive）计时，读取请求体、写出响应时按收发超时（io_timeout）计时，
+    慢速上传大批量输入或慢速读取流式响应不会因空闲超时被断开。
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            self.handle_one_request()
+
+    def handle_one_request(self):
+        self.server.track_idle(self.connection, True)
+        try:
+            self.connection.settimeout(self.server.keepalive)
+            self.raw_requestline = self.rfile.readline(65537)
+            self.connection.settimeout(self.server.io_timeout)
+        except (socket.timeout, OSError):
+            # 空闲长连接超时、客户端断开或服务器退出时被关闭
+            self.close_connection = True
+            return
+        finally:
+            self.server.track_idle(self.connection, False)
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+        if not self.parse_request():
+            return
+        environ = self.get_environ()
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            body = _ChunkedBody(self.rfile)
+            environ.pop('CONTENT_LENGTH', None)
+            # 告知应用请求体由服务器截止，可直接读到 EOF（Werkzeug 据此读取无 Content-Length 的请求体）
+            environ['wsgi.input_terminated'] = True
+        else:
+            try:
+                length = max(int(self.headers.get('Content-Length') or 0), 0)
+            except ValueError:
+                self.send_error(400, explain="Content-Length 无效")
+                self.close_connection = True
+                return
+            body = LimitedStream(self.rfile, length)
+        if self.server.stopping:
+            self.close_connection = True
+
+        handler = _ResponseHandler(body, self.wfile, self.get_stderr(), environ, multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+        if not self.close_connection:
+            try:
+                body.exhaust()
+            except (socket.timeout, ValueError, ConnectionError):
+                self.close_connection = True
+
+
+class PooledWSGIServer(WSGIServer):
+    """由固定数量工作线程处理连接的 WSGI 服务器；主线程只负责接受连接"""
+
+    def __init__(self, host, port, app, threads=DEFAULT_THREADS, backlog=DEFAULT_BACKLOG, keepalive=DEFAULT_KEEPALIVE,
+                 io_timeout=DEFAULT_IO_TIMEOUT):
+        if threads < 1:
+            raise ValueError("服务线程数 threads 必须至少为1")
+        # 在父类构造函数中 listen() 之前设置
+        self.request_queue_size = backlog
+        super().__init__((host, port), _RequestHandler)
+        self.set_app(app)
+        self.keepalive = keepalive
+        self.io_timeout = io_timeout
+        self.threads = threads
+        self.stopping = False
+        self._connections = queue.Queue()
+        self._active = 0
+        self._idle = threading.Condition()
+        self._idle_sockets = set()
+        for i in range(threads):
+            threading.Thread(target=self._worker, name=f"http-worker-{i}", daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._connections.put((request, client_address))
+
+    def _worker(self):
+        while True:
+            request, client_address = self._connections.get()
+            with self._idle:
+                self._active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._idle:
+                    self._active -= 1
+                    self._idle.notify_all()
+
+    def track_idle(self, connection, idle):
+        """登记正在等待下一个请求的长连接；退出时直接关闭它们，无需等到空闲超时"""
+        with self._idle:
+            if not idle:
+                self._idle_sockets.discard(connection)
+            elif self.stopping:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            else:
+                self._idle_sockets.add(connection)
+
+    def close_idle(self):
+        with self._idle:
+            sockets, self._idle_sockets = self._idle_sockets, set()
+        for connection in sockets:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def drain(self, timeout):
+        """等待排队与进行中的连接处理完毕；返回是否在超时前全部完成"""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._active or not self._connections.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+
+def serve(app, host='127.0.0.1', port=5000, threads=DEFAULT_THREADS, backlog=DEFAULT_BACKLOG,
+          keepalive=DEFAULT_KEEPALIVE, io_timeout=DEFAULT_IO_TIMEOUT, shutdown_grace=DEFAULT_SHUTDOWN_GRACE,
+          on_listening=None):
+    """以生产模式运行 app，直到收到退出信号。
+
+    启动后在标准输出打印 "Running on http://host:port"（Electron 主进程据此判断后端已就绪），
+    随后调用 on_listening()（如输出启动报告、开始后台预热）。
+    """
+    server = PooledWSGIServer(host, port, app, threads=threads, backlog=backlog, keepalive=keepalive,
+                              io_timeout=io_timeout)
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        if not stop.is_set():
+            stop.set()
+            server.stopping = True
+            # shutdown() 需在 serve_forever 以外的线程调用
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), request_stop)
+
+    print(f" * Running on http://{host}:{server.server_port} (threads={threads}, keep-alive={keepalive:g}s)",
+          flush=True)
+    if on_listening is not None:
+        on_listening()
+    try:
+        server.serve_forever()
+    finally:
+        server.stopping = True
+        server.server_close()
+        server.close_idle()
+        if not server.drain(shutdown_grace):
+            print(f" * 等待 {shutdown_grace:g} 秒后仍有请求未完成，强制退出", file=sys.stderr, flush=True)
+        print(" * Server stopped", flush=True)
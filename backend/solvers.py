@@ -0,0 +1,131 @@
+"""向量化求根工具：对一组方程同时迭代，每个元素独立收敛并记录迭代次数与残差"""
+import numpy as np
+
+
+def newton_bracketed(func, lo, hi, x0, ftol=1e-10, xtol=1e-12, max_iter=50):
+    """带区间保护的牛顿法（数组版）。
+
+    func(x) 返回 (f, df)；要求 f(lo) 与 f(hi) 异号，否则该元素结果为 NaN。
+    每步先用牛顿步，若越出当前区间或导数为0则退回二分，保证收敛；
+    返回 (x, iterations, residual)，iterations/residual 为逐元素的迭代次数与 |f(x)|。
+    """
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    x = np.clip(np.array(x0, dtype=float), lo, hi)
+    f_lo, _ = func(lo)
+    f_hi, _ = func(hi)
+    bracketed = np.sign(f_lo) * np.sign(f_hi) <= 0
+    iterations = np.zeros(x.shape, dtype=np.int64)
+    residual = np.full(x.shape, np.nan)
+    active = bracketed.copy()
+
+    with np.errstate(all='ignore'):
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            f, df = func(x)
+            residual = np.where(active, np.abs(f), residual)
+            done = active & (np.abs(f) <= ftol)
+            active &= ~done
+            if not active.any():
+                break
+            # 收缩区间：与 f(lo) 同号的一侧被替换
+            same_as_lo = np.sign(f) == np.sign(f_lo)
+            lo = np.where(active & same_as_lo, x, lo)
+            f_lo = np.where(active & same_as_lo, f, f_lo)
+            hi = np.where(active & ~same_as_lo, x, hi)
+            step = f / df
+            x_new = x - step
+            fallback = ~np.isfinite(x_new) | (x_new <= lo) | (x_new >= hi)
+            x_new = np.where(fallback, 0.5 * (lo + hi), x_new)
+            iterations += active
+            converged = active & (np.abs(x_new - x) <= xtol * (1.0 + np.abs(x)))
+            x = np.where(active, x_new, x)
+            if converged.any():
+                f_final, _ = func(x)
+                residual = np.where(converged, np.abs(f_final), residual)
+                active &= ~converged
+
+    x = np.where(bracketed, x, np.nan)
+    return x, iterations, residual
+
+
+def newton_bracketed_scalar(func, lo, hi, x0, ftol=1e-10, xtol=1e-12, max_iter=50):
+    """newton_bracketed 的标量版本，单组求解时避免数组开销；无根时 x 为 None"""
+    f_lo, _ = func(lo)
+    f_hi, _ = func(hi)
+    if f_lo * f_hi > 0:
+        return None, 0, None
+    x = min(max(x0, lo), hi)
+    iterations = 0
+    residual = None
+    for _ in range(max_iter):
+        f, df = func(x)
+        residual = abs(f)
+        if residual <= ftol:
+            break
+        if (f < 0) == (f_lo < 0):
+            lo, f_lo = x, f
+        else:
+            hi = x
+        x_new = x - f / df if df != 0 else lo
+        if not lo < x_new < hi:
+            x_new = 0.5 * (lo + hi)
+        iterations += 1
+        converged = abs(x_new - x) <= xtol * (1.0 + abs(x))
+        x = x_new
+        if converged:
+            residual = abs(func(x)[0])
+            break
+    return x, iterations, residual
+
+
+def illinois_bracketed(func, lo, hi, ftol=1e-12, xtol=1e-12, max_iter=60):
+    """Illinois 修正试位法（数组版），适用于只能求函数值、不便求导的方程。
+
+    func(x, index) 返回 index 所指元素在 x 处的函数值（index 为元素下标数组，便于只计算未收敛的元素）；
+    要求 f(lo) 与 f(hi) 异号，否则该元素结果为 NaN。返回 (x, iterations, residual)。
+    """
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    everything = np.arange(lo.size)
+    f_lo = np.asarray(func(lo, everything), dtype=float)
+    f_hi = np.asarray(func(hi, everything), dtype=float)
+    x = np.full(lo.shape, np.nan)
+    iterations = np.zeros(lo.shape, dtype=np.int64)
+    residual = np.full(lo.shape, np.nan)
+    side = np.zeros(lo.shape, dtype=np.int8)
+
+    # 端点恰为根的元素直接返回
+    on_lo = f_lo == 0
+    on_hi = (f_hi == 0) & ~on_lo
+    x[on_lo], x[on_hi] = lo[on_lo], hi[on_hi]
+    residual[on_lo | on_hi] = 0.0
+    active = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) * np.sign(f_hi) < 0)
+
+    for _ in range(max_iter):
+        index = np.flatnonzero(active)
+        if index.size == 0:
+            break
+        a, b, fa, fb = lo[index], hi[index], f_lo[index], f_hi[index]
+        xi = (a * fb - b * fa) / (fb - fa)
+        fi = np.asarray(func(xi, index), dtype=float)
+        x[index] = xi
+        residual[index] = np.abs(fi)
+        iterations[index] += 1
+
+        # 与 f(hi) 同号则替换 hi，连续替换同一侧时将另一端函数值减半（Illinois 修正）
+        right = np.sign(fi) == np.sign(fb)
+        repeat_right = right & (side[index] == -1)
+        repeat_left = ~right & (side[index] == 1)
+        hi[index] = np.where(right, xi, b)
+        f_hi[index] = np.where(right, fi, np.where(repeat_left, fb * 0.5, fb))
+        lo[index] = np.where(right, a, xi)
+        f_lo[index] = np.where(right, np.where(repeat_right, fa * 0.5, fa), fi)
+        side[index] = np.where(right, -1, 1)
+
+        width = hi[index] - lo[index]
+        done = (np.abs(fi) <= ftol) | (np.abs(width) <= xtol * (1.0 + np.abs(xi))) | ~np.isfinite(fi)
+        x[index[~np.isfinite(fi)]] = np.nan
+        active[index[done]] = False
+    return x, iterations, residual
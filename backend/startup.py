@@ -0,0 +1,116 @@
+"""启动计时与后台预热：记录 app 各顶层导入的耗时与启动各阶段时间点，服务开始监听后在后台线程中预加载重模块
+
+启动报告在打印 "Running on" 之后输出到标准输出，便于跟踪冷启动耗时的变化。
+环境变量 BACKEND_WARMUP=0 时不做后台预热（首次使用时再加载）。
+"""
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """启动各阶段的耗时。started 为计时起点（app 模块开始执行的 perf_counter 值）"""
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        # 对应的墙上时间，用于报告启动时刻
+        self.started_at = time.time() - (time.perf_counter() - self.started)
+        self.imports = {}
+        self.phases = {}
+        self.warmup = {}
+        # 预热状态：pending（尚未开始）、running、done、skipped（已关闭预热）
+        self.warmup_state = "pending"
+        self._lock = threading.Lock()
+
+    def uptime(self):
+        """自计时起点以来的秒数"""
+        return round(time.perf_counter() - self.started, 3)
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def mark(self, phase):
+        """记录某阶段完成的时间点（相对计时起点，毫秒）"""
+        with self._lock:
+            self.phases[phase] = self.elapsed_ms()
+
+    @contextmanager
+    def timing_imports(self):
+        """在此范围内记录每个顶层导入（含其依赖）首次加载的耗时；已加载的模块不计入"""
+        original = builtins.__import__
+        depth = 0
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            nonlocal depth
+            if depth or level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+                depth += 1
+                try:
+                    return original(name, globals, locals, fromlist, level)
+                finally:
+                    depth -= 1
+            depth += 1
+            started = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                depth -= 1
+                self.imports[name] = round((time.perf_counter() - started) * 1000, 1)
+
+        builtins.__import__ = timed_import
+        try:
+            yield
+        finally:
+            builtins.__import__ = original
+
+    def start_warmup(self, tasks):
+        """在后台线程中依次执行预热任务 [(名称, 函数), ...]，记录各自耗时；失败只记录，不影响服务"""
+        def run():
+            for name, task in tasks:
+                started = time.perf_counter()
+                try:
+                    task()
+                except Exception as e:
+                    print(f" * 预热 {name} 失败: {e}", file=sys.stderr, flush=True)
+                self.warmup[name] = round((time.perf_counter() - started) * 1000, 1)
+            self.warmup_state = "done"
+            self.mark("warmup_done")
+            print(" * Warm-up: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.warmup.items()), flush=True)
+
+        self.warmup_state = "running"
+        thread = threading.Thread(target=run, name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def skip_warmup(self):
+        """已关闭后台预热（BACKEND_WARMUP=0）"""
+        self.warmup_state = "skipped"
+
+    @property
+    def warm(self):
+        """预热已完成（或已关闭）"""
+        return self.warmup_state in ("done", "skipped")
+
+    def as_dict(self):
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            "imports_ms": dict(self.imports),
+            "phases_ms": phases,
+            "warmup": self.warmup_state,
+            "warmup_ms": dict(self.warmup),
+        }
+
+    def lines(self):
+        """启动报告的文本行：各导入耗时（由高到低）与各阶段时间点"""
+        imports = sorted(self.imports.items(), key=lambda item: -item[1])
+        total = sum(ms for _, ms in imports)
+        yield f" * Startup imports: {total:.0f} ms (" + ", ".join(f"{name} {ms:.0f}" for name, ms in imports) + ")"
+        with self._lock:
+            phases = list(self.phases.items())
+        yield " * Startup phases: " + ", ".join(f"{name} @ {ms:.0f} ms" for name, ms in phases)
+
+    def print(self):
+        for line in self.lines():
+            print(line, flush=True)
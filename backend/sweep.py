@@ -0,0 +1,200 @@
+"""参数扫描（设计网格）：对任意已注册公式的若干参数取值做笛卡尔积，分块惰性求值"""
+import functools
+import math
+
+import numpy as np
+
+from batch_io import DEFAULT_CHUNK_SIZE
+from parallel import DEFAULT_EXECUTOR, worker_engine
+
+# 单次扫描的网格点上限，避免结果数组占满内存
+MAX_GRID_POINTS = 5_000_000
+
+
+def axis_values(name, spec):
+    """解析单个参数的取值：列表，或 {start, stop, num[, log]} / {start, stop, step}"""
+    if isinstance(spec, (list, tuple)):
+        values = np.asarray(spec, dtype=float)
+    elif isinstance(spec, dict):
+        try:
+            start = float(spec['start'])
+            stop = float(spec['stop'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"参数 {name} 的范围需要数值 start 与 stop")
+        if spec.get('step') is not None:
+            step = float(spec['step'])
+            if step <= 0:
+                raise ValueError(f"参数 {name} 的 step 必须大于0")
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            values = start + step * np.arange(max(count, 0))
+        else:
+            num = int(spec.get('num', 11))
+            if num < 1:
+                raise ValueError(f"参数 {name} 的 num 必须至少为1")
+            if spec.get('log'):
+                if start <= 0 or stop <= 0:
+                    raise ValueError(f"参数 {name} 使用对数刻度时 start、stop 必须大于0")
+                values = np.geomspace(start, stop, num)
+            else:
+                values = np.linspace(start, stop, num)
+    else:
+        raise ValueError(f"参数 {name} 的取值需为列表或范围对象")
+    if values.ndim != 1 or values.size == 0:
+        raise ValueError(f"参数 {name} 没有可用的取值")
+    return values
+
+
+def sweep_chunk(engine, formula_id, fixed, names, grids, include_intermediate, start, stop):
+    """计算网格展平序号 [start, stop) 的各点，返回 (主结果, 中间量, 逐行错误, 单位)；出错点的主结果为 NaN"""
+    shape = tuple(len(grid) for grid in grids)
+    index = np.unravel_index(np.arange(start, stop), shape)
+    columns = dict(fixed)
+    for name, grid, idx in zip(names, grids, index):
+        columns[name] = grid[idx]
+    batch = engine.calculate_batch(formula_id, columns)
+    output = np.asarray(batch[engine.registry.get(formula_id).output], dtype=float)
+    output[np.array([error is not None for error in batch["errors"]], dtype=bool)] = np.nan
+    intermediate = {}
+    if include_intermediate:
+        intermediate = {key: column for key, column in batch["intermediate"].items() if column.dtype != object}
+    return output, intermediate, batch["errors"], batch["unit"]
+
+
+def _sweep_chunk_in_worker(formula_id, fixed, names, grids, include_intermediate, start, stop):
+    """进程池中的任务入口"""
+    return sweep_chunk(worker_engine(), formula_id, fixed, names, grids, include_intermediate, start, stop)
+
+
+class ParameterSweep:
+    """参数扫描器：按块展开网格索引并调用 calculate_batch，结果写入稠密 N 维数组。
+
+    网格较大时由进程池执行器（见 parallel.py）按实测单点耗时分块并行计算，各块按顺序写回。
+    """
+
+    def __init__(self, engine, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.executor = executor or DEFAULT_EXECUTOR
+
+    def run(self, formula_id, axes, fixed=None, target=None, crossing_axis=None, include_intermediate=False,
+            workers=None, progress=None):
+        """执行扫描。
+
+        axes 为 {参数名: 取值规格}，或 [{"name": 参数名, 取值规格字段...}, ...] 列表
+        （列表顺序即结果数组的维度顺序，JSON 对象键序可能被重排时应使用列表），fixed 为其余固定参数；
+        给定 target（如设计流速）时，统计高于/低于目标的网格比例，并沿 crossing_axis
+        对每条网格线线性插值出主结果穿过 target 的位置。workers 为进程数上限（默认取执行器配置）。
+        progress(done, total) 在每块完成后调用（如后台任务报告进度，并可在此抛出异常以中止）。
+        """
+        formula = self.engine.registry.get(formula_id)
+        if not axes:
+            raise ValueError("至少需要一个扫描参数")
+        fixed = dict(fixed or {})
+        if isinstance(axes, dict):
+            axes = [(name, spec) for name, spec in axes.items()]
+        else:
+            axes = [(spec.get('name'), spec.get('values', spec)) for spec in axes]
+        names = [name for name, _ in axes]
+        if len(set(names)) != len(names) or None in names:
+            raise ValueError("扫描参数名不能为空或重复")
+        if crossing_axis is not None and crossing_axis not in names:
+            raise ValueError(f"crossing_axis {crossing_axis} 不是扫描参数")
+        grids = [axis_values(name, spec) for name, spec in axes]
+        shape = tuple(len(values) for values in grids)
+        total = int(np.prod(shape, dtype=np.int64))
+        if total > MAX_GRID_POINTS:
+            raise ValueError(f"网格点数 {total} 超过上限 {MAX_GRID_POINTS}，请缩小扫描范围")
+
+        output_key = formula.output
+        values = np.full(shape, np.nan)
+        intermediate = {}
+        error_counts = {}
+        unit = ""
+
+        arguments = (formula_id, fixed, names, grids, include_intermediate)
+        chunks = self.executor.run(
+            ("sweep", formula_id), total,
+            functools.partial(sweep_chunk, self.engine, *arguments),
+            functools.partial(_sweep_chunk_in_worker, *arguments),
+            workers=workers, local_rows=self.chunk_size,
+        )
+        start = 0
+        for output, chunk_intermediate, errors, unit in chunks:
+            stop = start + len(output)
+            values.flat[start:stop] = output
+            for error in errors:
+                if error is not None:
+                    error_counts[error] = error_counts.get(error, 0) + 1
+            for key, column in chunk_intermediate.items():
+                if key not in intermediate:
+                    intermediate[key] = np.full(shape, np.nan)
+                intermediate[key].flat[start:stop] = column
+            start = stop
+            if progress is not None:
+                progress(stop, total)
+
+        return {
+            "formula_id": formula_id,
+            "output": output_key,
+            "unit": unit,
+            "axis_names": names,
+            "axes": {name: grid for name, grid in zip(names, grids)},
+            "shape": list(shape),
+            "workers": chunks.workers,
+            "values": values,
+            "intermediate": intermediate,
+            "summary": self._summarize(names, grids, values, error_counts, target, crossing_axis),
+        }
+
+    def _summarize(self, names, grids, values, error_counts, target, crossing_axis):
+        """统计有效点数、极值（含对应参数组合）与目标穿越信息"""
+        valid = np.isfinite(values)
+        summary = {
+            "count": int(values.size),
+            "valid": int(valid.sum()),
+            "failed": int(values.size - valid.sum()),
+            "errors": [{"error": error, "count": count}
+                       for error, count in sorted(error_counts.items(), key=lambda item: -item[1])[:5]],
+        }
+        if not valid.any():
+            return summary
+        finite = values[valid]
+        summary.update({
+            "min": float(finite.min()),
+            "max": float(finite.max()),
+            "mean": float(finite.mean()),
+            "std": float(finite.std()),
+            "argmin": self._point(names, grids, np.nanargmin(values), values.shape),
+            "argmax": self._point(names, grids, np.nanargmax(values), values.shape),
+        })
+        if target is not None:
+            target = float(target)
+            summary["target"] = target
+            summary["fraction_below_target"] = float((finite < target).mean())
+            summary["fraction_above_target"] = float((finite > target).mean())
+            axis_name = crossing_axis if crossing_axis is not None else names[0]
+            summary["crossing_axis"] = axis_name
+            summary["crossing"] = self._crossing(grids[names.index(axis_name)], values, names.index(axis_name), target)
+        return summary
+
+    def _point(self, names, grids, flat_index, shape):
+        index = np.unravel_index(flat_index, shape)
+        return {name: float(grid[i]) for name, grid, i in zip(names, grids, index)}
+
+    def _crossing(self, grid, values, axis, target):
+        """沿指定轴，对其余参数的每种组合求主结果首次穿过 target 的参数值（线性插值，无穿越为 NaN）"""
+        moved = np.moveaxis(values - target, axis, -1)
+        crossing = np.full(moved.shape[:-1], np.nan)
+        if moved.shape[-1] < 2:
+            return crossing
+        left, right = moved[..., :-1], moved[..., 1:]
+        sign_change = (left * right <= 0) & np.isfinite(left) & np.isfinite(right) & ~((left == 0) & (right == 0))
+        has_crossing = sign_change.any(axis=-1)
+        first = np.argmax(sign_change, axis=-1)
+        f0 = np.take_along_axis(left, first[..., None], axis=-1)[..., 0]
+        f1 = np.take_along_axis(right, first[..., None], axis=-1)[..., 0]
+        x0, x1 = grid[first], grid[first + 1]
+        with np.errstate(all='ignore'):
+            position = np.where(f1 == f0, x0, x0 + (x1 - x0) * f0 / (f0 - f1))
+        crossing[has_crossing] = position[has_crossing]
+        return crossing
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# 后端模块以扁平方式导入（与 app.py 一致）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 测试中的计算历史写入临时目录，计算书不在 exports 目录保留副本
+os.environ.setdefault('HISTORY_DB', os.path.join(tempfile.mkdtemp(prefix='history-'), 'history.sqlite3'))
+os.environ.setdefault('EXPORT_KEEP_COPY', '0')
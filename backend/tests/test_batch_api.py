@@ -0,0 +1,83 @@
+"""批量计算接口：表格中公式参数以外的列（算例编号、备注等）不影响计算"""
+import csv
+import io
+import json
+
+import pytest
+
+from app import app
+
+CSV = "label,C_w,rho_g,rho_s\ncaseA,0.3,2.7,1.0\ncaseB,0.2,2.65,1.0\ncaseC,abc,2.7,1.0\n"
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+
+def test_csv_upload_ignores_text_columns(client):
+    response = client.post('/api/calculate/batch', data={
+        'formula_id': 'density_mixing',
+        'file': (io.BytesIO(CSV.encode('utf-8')), 'cases.csv'),
+    }, content_type='multipart/form-data')
+    lines = _ndjson(response)
+    assert [line.get('success') for line in lines[:3]] == [True, True, False]
+    scalar = client.post('/api/calculate', json={
+        'formula_id': 'density_mixing', 'parameters': {'label': 'caseA', 'C_w': 0.3, 'rho_g': 2.7, 'rho_s': 1.0}})
+    assert lines[0]['result']['rho_k'] == scalar.json['result']['rho_k']
+    # 只有参数列中的无效数值报错
+    assert 'C_w' in lines[2]['error']
+
+
+def test_json_rows_ignore_unknown_keys(client):
+    response = client.post('/api/calculate/batch', json={
+        'formula_id': 'density_mixing',
+        'rows': [{'label': 'caseA', 'note': None, 'C_w': 0.3, 'rho_g': 2.7, 'rho_s': 1.0}],
+    })
+    assert _ndjson(response)[0]['success'] is True
+
+
+@pytest.mark.parametrize('rows', [
+    [{'foo': 1}, {'foo': 2}, {'bar': 3}],
+    [{'method': 'colebrook'}, {'method': 'colebrook'}],
+])
+def test_chunk_without_parameters_reports_every_row(client, rows):
+    """块内没有可识别的参数时每行仍各有一行错误，汇总的行数与失败数一致"""
+    response = client.post('/api/calculate/batch', json={'formula_id': 'darcy_friction', 'rows': rows})
+    lines = _ndjson(response)
+    assert [line['index'] for line in lines[:-1]] == list(range(len(rows)))
+    assert all(line['success'] is False for line in lines[:-1])
+    assert lines[-1]['count'] == lines[-1]['failed'] == len(rows)
+
+
+def test_malformed_ndjson_lines_report_every_row(client):
+    body = b'{"C_w": \n[1]\nnot json\n'
+    response = client.post('/api/calculate/batch?formula_id=density_mixing', data=body,
+                           content_type='application/x-ndjson')
+    lines = _ndjson(response)
+    assert [line['index'] for line in lines[:-1]] == [0, 1, 2]
+    assert lines[-1]['count'] == lines[-1]['failed'] == 3
+
+
+@pytest.mark.parametrize('table, chunk_size', [
+    ("label,C_w,rho_g,rho_s\nnote,,,\nnote2,,,\n", 2000),
+    ("label,C_w,rho_g,rho_s\nnote,,,\ncaseA,0.3,2.7,1.0\nnote2,,,\n", 1),
+])
+def test_csv_rows_without_parameters_report_errors(client, table, chunk_size):
+    """参数单元格全部为空的行（只填了编号或备注）逐行报错，不中断输出"""
+    response = client.post('/api/calculate/batch/csv', data={
+        'formula_id': 'density_mixing',
+        'chunk_size': str(chunk_size),
+        'file': (io.BytesIO(table.encode('utf-8')), 'cases.csv'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    lines = list(csv.reader(io.StringIO(response.data.decode('utf-8-sig'))))
+    header, rows = lines[0], lines[1:]
+    assert len(rows) == table.count('\n') - 1
+    for row in rows:
+        error = row[header.index('error')]
+        assert (error == '') == (row[0] == 'caseA')
@@ -0,0 +1,89 @@
+"""批量计算与标量计算的一致性"""
+import math
+
+import pytest
+
+from calculation_engine import CalculationEngine
+
+# 每个已注册公式的一组有效参数
+SAMPLES = {
+    'liu_dezhong': {'D': 0.3, 'rho_g': 2.7, 'rho_k': 1.3, 'omega': 0.02, 'Cv': 0.15, 'omega_s': 0.01},
+    'wasp': {'D': 0.3, 'rho_g': 2.7, 'rho_k': 1.3, 'Cv': 0.15, 'd85': 0.5},
+    'fei_xiangjun': {'D': 0.3, 'rho_g': 2.7, 'rho_k': 1.3, 'Cv': 0.15, 'omega': 0.02, 'd90': 0.5,
+                     'lambda_coef': 0.02},
+    'kronodze_pressure': {'G': 50, 'W': 100, 'rho_g': 2.7, 'dp': 0.05},
+    'darcy_friction': {'Re': 2e5, 'D': 0.3},
+    'friction_loss': {'lambda_coef': 0.02, 'V': 2.0, 'rho_k': 1.3, 'D': 0.3, 'rho_s': 1.0},
+    'density_mixing': {'C_w': 0.3, 'rho_g': 2.7, 'rho_s': 1.0},
+    'slurry_accel_energy': {'Z1': 10, 'Z2': 5, 'H1': 2, 'H2': 1, 'i': 0.01, 'L': 100},
+}
+
+# 每组参数按这些倍数变化，得到批量计算的多行输入
+SCALES = (0.8, 1.0, 1.25)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return CalculationEngine()
+
+
+def test_samples_cover_registry(engine):
+    assert set(SAMPLES) == {formula.id for formula in engine.registry}
+
+
+def _rows(formula_id):
+    rows = []
+    for scale in SCALES:
+        rows.append({name: value * scale for name, value in SAMPLES[formula_id].items()})
+    return rows
+
+
+def _assert_close(batch_value, scalar_value, label):
+    if isinstance(scalar_value, (bool, str)):
+        assert batch_value == scalar_value, label
+    else:
+        assert batch_value == pytest.approx(scalar_value, rel=1e-9, abs=1e-9), label
+
+
+@pytest.mark.parametrize("formula_id", sorted(SAMPLES))
+def test_batch_matches_scalar(engine, formula_id):
+    rows = _rows(formula_id)
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+    batch = engine.calculate_batch(formula_id, columns)
+    output = engine.registry.get(formula_id).output
+    for i, result, error in engine.iter_batch_rows(formula_id, batch):
+        scalar = engine.calculate(formula_id, rows[i])
+        assert error is None
+        _assert_close(result[output], scalar[output], f"{formula_id}[{i}].{output}")
+        assert result["unit"] == scalar["unit"]
+        assert set(result["intermediate"]) == set(scalar["intermediate"])
+        for key, value in scalar["intermediate"].items():
+            _assert_close(result["intermediate"][key], value, f"{formula_id}[{i}].{key}")
+
+
+@pytest.mark.parametrize("formula_id", sorted(SAMPLES))
+def test_batch_reports_row_errors_like_scalar(engine, formula_id):
+    """缺少必填参数的行单独报错，错误信息与标量路径相同，其余行不受影响"""
+    formula = engine.registry.get(formula_id)
+    missing = formula.required[0]
+    rows = [SAMPLES[formula_id], {name: value for name, value in SAMPLES[formula_id].items() if name != missing}]
+    columns = {name: [row.get(name, math.nan) for row in rows] for name in SAMPLES[formula_id]}
+    batch = engine.calculate_batch(formula_id, columns)
+    with pytest.raises(ValueError) as scalar_error:
+        engine.calculate(formula_id, rows[1])
+    assert batch["errors"][0] is None
+    assert batch["errors"][1] == str(scalar_error.value)
+
+
+@pytest.mark.parametrize("formula_id", sorted(SAMPLES))
+def test_batch_row_count_without_parameter_columns(engine, formula_id):
+    """给出行数 n 时，没有任何参数列（或只有标量、选项）也按 n 行计算，每行报告缺少参数"""
+    batch = engine.calculate_batch(formula_id, {}, n=3)
+    assert batch["count"] == len(batch["errors"]) == 3
+    assert all(error is not None for error in batch["errors"])
+    assert len(list(engine.iter_batch_rows(formula_id, batch))) == 3
+
+
+def test_batch_row_count_must_match_columns(engine):
+    with pytest.raises(ValueError):
+        engine.calculate_batch("density_mixing", {"C_w": [0.3, 0.2]}, n=3)
@@ -0,0 +1,48 @@
+"""列式输出：Arrow/Parquet 文件的行数与输入行数一致，出错的块逐行报告错误"""
+import io
+
+import pytest
+
+from calculation_engine import CalculationEngine
+from columnar import stream_batch_columnar
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+VALID = {'C_w': 0.3, 'rho_g': 2.7, 'rho_s': 1.0}
+
+
+def _scalar_error(engine, formula_id, row):
+    try:
+        engine.calculate(formula_id, row)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def _read(data, output_format):
+    if output_format == 'arrow':
+        return pa.ipc.open_stream(io.BytesIO(data)).read_all()
+    return pq.read_table(io.BytesIO(data))
+
+
+@pytest.mark.parametrize('output_format', ['arrow', 'parquet'])
+@pytest.mark.parametrize('formula_id, rows, chunk_size', [
+    # 整块没有可识别的参数
+    ('density_mixing', [{'foo': 1}, {'foo': 2}, {'bar': 3}], 2000),
+    # 无效块与有效块交替
+    ('density_mixing', [{'foo': 1}, {'foo': 2}, VALID, VALID, {'label': 'x'}], 2),
+    # 只有选项的行
+    ('darcy_friction', [{'method': 'colebrook'}, {'method': 'colebrook'}, {'Re': 1e5, 'D': 0.3}], 2),
+    # 同一块内选项不一致（整块出错）
+    ('darcy_friction', [{'Re': 1e5, 'D': 0.3, 'method': 'colebrook'}, {'Re': 1e5, 'D': 0.3}, {'Re': 1e3}], 2),
+])
+def test_output_rows_match_input_rows(output_format, formula_id, rows, chunk_size):
+    data = b''.join(stream_batch_columnar(CalculationEngine(), formula_id, rows, output_format, chunk_size))
+    table = _read(data, output_format)
+    assert table.num_rows == len(rows)
+    # 单次计算报错的行在文件中也有错误（整块出错时其余行同样报错）
+    engine = CalculationEngine()
+    for row, error in zip(rows, table.column('error').to_pylist()):
+        if _scalar_error(engine, formula_id, row):
+            assert error is not None
@@ -0,0 +1,58 @@
+"""达西摩阻系数：Colebrook-White 求解器、Moody 插值表与各计算方法的批量/单次一致性"""
+import math
+
+import numpy as np
+import pytest
+
+from calculation_engine import CalculationEngine
+from friction import colebrook, colebrook_scalar, swamee_jain
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return CalculationEngine()
+
+
+@pytest.mark.parametrize("method", ["swamee_jain", "colebrook", "colebrook_table"])
+def test_darcy_friction_methods_match_scalar(engine, method):
+    rows = [{'Re': Re, 'D': 0.3, 'epsilon': eps, 'method': method}
+            for Re in (1e3, 5e3, 2e5, 3e7) for eps in (1e-5, 2e-4, 3e-3)]
+    columns = {name: [row[name] for row in rows] for name in ('Re', 'D', 'epsilon')}
+    batch = engine.calculate_batch('darcy_friction', {**columns, 'method': method})
+    for i, result, error in engine.iter_batch_rows('darcy_friction', batch):
+        assert error is None
+        scalar = engine.calculate('darcy_friction', rows[i])
+        assert result['lambda_coef'] == pytest.approx(scalar['lambda_coef'], rel=1e-9)
+
+
+def _colebrook_residual(lam, Re, eps_D):
+    return 1 / np.sqrt(lam) + 2 * np.log10(eps_D / 3.7 + 2.51 / (Re * np.sqrt(lam)))
+
+
+def test_colebrook_solves_equation():
+    Re, eps_D = np.meshgrid(np.logspace(3.7, 8, 25), np.logspace(-7, -1, 13))
+    lam, iterations, residual = colebrook(Re.ravel(), eps_D.ravel())
+    assert np.all(np.abs(_colebrook_residual(lam, Re.ravel(), eps_D.ravel())) < 1e-10)
+    assert np.all(residual < 1e-10)
+    assert iterations.max() <= 6
+    # 在其适用范围（Re ≥ 5000）内，Swamee-Jain 近似的相对误差在 3% 以内
+    assert np.allclose(swamee_jain(Re.ravel(), eps_D.ravel()), lam, rtol=0.03)
+
+
+def test_colebrook_scalar_matches_vector():
+    for Re, eps_D in [(4e3, 1e-6), (2e5, 6.7e-4), (1e8, 0.05)]:
+        lam, _, _ = colebrook(np.array([Re]), np.array([eps_D]))
+        assert colebrook_scalar(Re, eps_D)[0] == pytest.approx(lam[0], rel=1e-12)
+
+
+def test_moody_table_within_error_bound(engine):
+    table = engine.moody_table()
+    rng = np.random.default_rng(0)
+    Re = 10 ** rng.uniform(np.log10(2300.0), 8, 2000)
+    eps_D = 10 ** rng.uniform(-7, -1, 2000)
+    looked_up, inside = table.lookup(Re, eps_D)
+    exact, _, _ = colebrook(Re, eps_D)
+    assert inside.all()
+    assert np.max(np.abs(looked_up - exact) / exact) <= table.error_bound <= 1e-6
+    outside, inside = table.lookup(np.array([100.0]), np.array([1e-4]))
+    assert not inside[0] and math.isnan(outside[0])
@@ -0,0 +1,81 @@
+"""后台任务：长任务逐块报告进度，运行中可取消；导出任务的副本设置与同步接口一致"""
+import threading
+
+from calculation_engine import CalculationEngine
+from jobs import CANCELLED, DONE, FINISHED, JobQueue
+from parallel import ParallelExecutor
+from sweep import ParameterSweep
+from uncertainty import UncertaintyAnalysis
+
+WASP = {'rho_g': 2.7, 'rho_k': 1.3, 'Cv': 0.15, 'd85': 0.5}
+
+
+def _sweep(progress=None):
+    sweep = ParameterSweep(CalculationEngine(), chunk_size=1000, executor=ParallelExecutor(workers=1))
+    return sweep.run('wasp', {'D': {'start': 0.1, 'stop': 0.5, 'num': 5000}}, fixed=WASP, progress=progress)
+
+
+def _wait_finished(queue, job):
+    while job.status not in FINISHED:
+        queue.wait(job, job.version, 5)
+
+
+def test_sweep_reports_progress_per_chunk():
+    reports = []
+    _sweep(lambda done, total: reports.append((done, total)))
+    assert reports == [(k * 1000, 5000) for k in range(1, 6)]
+
+
+def test_uncertainty_reports_progress_per_chunk():
+    reports = []
+    analysis = UncertaintyAnalysis(CalculationEngine(), chunk_size=1000, executor=ParallelExecutor(workers=1))
+    analysis.run('wasp', {**WASP, 'D': {'dist': 'normal', 'mean': 0.3, 'std': 0.01}}, samples=3500, seed=1,
+                 progress=lambda done, total: reports.append((done, total)))
+    assert reports == [(1000, 3500), (2000, 3500), (3000, 3500), (3500, 3500)]
+
+
+def test_running_sweep_job_can_be_cancelled():
+    queue = JobQueue(workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def report(job):
+        def progress(done, total):
+            job.report(done, total)
+            started.set()
+            release.wait(5)
+        return progress
+
+    job = queue.submit("sweep", lambda job: _sweep(report(job)), "bulk")
+    assert started.wait(5)
+    queue.cancel(job.id)
+    release.set()
+    _wait_finished(queue, job)
+    assert job.status == CANCELLED
+    assert job.done == 1000
+
+    finished = queue.submit("sweep", lambda job: _sweep(job.report) and None)
+    _wait_finished(queue, finished)
+    assert finished.status == DONE
+    assert finished.done == finished.total == 5000
+
+
+class _Job:
+    def report(self, done, total, message=None):
+        pass
+
+
+def test_export_job_null_keep_copy_follows_configuration(monkeypatch):
+    """keep_copy 为 null 与未指定相同（按配置），与同步导出接口一致"""
+    import app
+    exporter = app.shared_exporter()
+    saved = []
+    monkeypatch.setattr(exporter, 'keep_copies', True)
+    monkeypatch.setattr(exporter, 'save_copy_async', lambda filename, document: saved.append(filename))
+    engine = CalculationEngine()
+    parameters = {**WASP, 'D': 0.3}
+    data = {'formula_id': 'wasp', 'parameters': parameters, 'result': engine.calculate('wasp', parameters),
+            'formula_info': engine.registry.get('wasp').catalog()}
+    for keep_copy, expected in ((None, 1), (False, 0), (True, 1)):
+        saved.clear()
+        app._export_job({**data, 'keep_copy': keep_copy})(_Job())
+        assert len(saved) == expected
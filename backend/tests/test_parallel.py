@@ -0,0 +1,43 @@
+"""分块执行器：首块计时、任务大小与任务输入"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from parallel import DEFAULT_CHUNK_SIZE, ParallelExecutor
+
+
+def test_pilot_cost_excludes_consumer_time():
+    """首块耗时只计计算本身：调用方处理结果的耗时不计入单行耗时"""
+    executor = ParallelExecutor(workers=1)
+    chunks = executor.run("pilot", 100, lambda start, stop: list(range(start, stop)), None, local_rows=100)
+    for _ in chunks:
+        time.sleep(0.2)
+    assert executor.row_costs["pilot"] * 100 < 0.05
+
+
+class _ThreadedExecutor(ParallelExecutor):
+    """测试用：剩余部分总是按每任务 2 行交给线程池，并记录各任务收到的输入"""
+
+    def __init__(self):
+        super().__init__(workers=2)
+        self.received = []
+
+    def task_rows(self, key, rows, workers, align=1, min_rows=DEFAULT_CHUNK_SIZE):
+        return 2
+
+    def pool(self, workers):
+        return ThreadPoolExecutor(workers)
+
+
+def test_split_sends_each_task_only_its_range():
+    """给出 split 时进程池任务只收到自己区间的输入"""
+    items = [f"case{i}" for i in range(7)]
+    executor = _ThreadedExecutor()
+
+    def remote(part):
+        executor.received.append(part)
+        return [item.upper() for item in part]
+
+    chunks = executor.run("split", len(items), lambda start, stop: [item.upper() for item in items[start:stop]],
+                          remote, local_rows=1, split=lambda start, stop: items[start:stop])
+    assert [item for chunk in chunks for item in chunk] == [item.upper() for item in items]
+    assert sorted(executor.received) == [items[1:3], items[3:5], items[5:7]]
@@ -0,0 +1,99 @@
+"""项目工作区：修改节点后只重算输入有变化的下游节点"""
+import pytest
+
+from calculation_engine import CalculationEngine
+from project import Project
+
+
+class CountingEngine:
+    """记录每个节点公式被实际计算的次数"""
+
+    def __init__(self):
+        self.engine = CalculationEngine()
+        self.calls = []
+
+    def calculate(self, formula_id, parameters):
+        self.calls.append(formula_id)
+        return self.engine.calculate(formula_id, parameters)
+
+
+def _nodes(count):
+    nodes = []
+    for k in range(count):
+        nodes += [
+            {"id": f"mix{k}", "formula_id": "density_mixing", "parameters": {"C_w": 0.3, "rho_g": 2.7, "rho_s": 1.0}},
+            {"id": f"fric{k}", "formula_id": "darcy_friction", "parameters": {"Re": 2e5, "D": 0.3}},
+            {"id": f"loss{k}", "formula_id": "friction_loss", "parameters": {"V": 2.0, "D": 0.3, "rho_s": 1.0},
+             "links": {"lambda_coef": f"fric{k}", "rho_k": f"mix{k}.rho_k"}},
+            {"id": f"fei{k}", "formula_id": "fei_xiangjun",
+             "parameters": {"D": 0.3, "rho_g": 2.7, "Cv": 0.15, "omega": 0.02, "d90": 0.5},
+             "links": {"lambda_coef": {"node": f"fric{k}"}, "rho_k": f"mix{k}"}},
+        ]
+    return nodes
+
+
+@pytest.fixture
+def counting():
+    return CountingEngine()
+
+
+@pytest.fixture
+def project(counting):
+    project = Project(counting.engine.registry, counting.calculate)
+    project.add_nodes(_nodes(50))
+    counting.calls.clear()
+    return project
+
+
+def test_linked_inputs_come_from_upstream(project):
+    mix, fric, loss = project.node("mix3"), project.node("fric3"), project.node("loss3")
+    assert loss["inputs"]["rho_k"] == mix["result"]["rho_k"]
+    assert loss["inputs"]["lambda_coef"] == fric["result"]["lambda_coef"]
+    assert loss["result"]["i_k"] > 0
+
+
+def test_edit_recomputes_only_downstream(project, counting):
+    stats = project.update_node("mix7", {"C_w": 0.35})
+    assert sorted(counting.calls) == ["density_mixing", "fei_xiangjun", "friction_loss"]
+    assert sorted(stats["changed"]) == ["fei7", "loss7", "mix7"]
+    assert stats["calculated"] == 3
+    # 与从头计算的结果一致
+    fresh = Project(project.registry, CalculationEngine().calculate)
+    specs = _nodes(50)
+    specs[28]["parameters"]["C_w"] = 0.35
+    fresh.add_nodes(specs)
+    assert fresh.node("loss7")["result"] == project.node("loss7")["result"]
+
+
+def test_unchanged_inputs_are_memoized(project, counting):
+    stats = project.update_node("fric3", {"D": 0.3})
+    assert counting.calls == []
+    assert stats["reused"] == 1 and stats["changed"] == []
+
+
+def test_unchanged_result_stops_propagation(project, counting):
+    # darcy_friction 不使用 V，修改后结果不变，下游不重算
+    stats = project.update_node("fric3", {"V": 5.0})
+    assert counting.calls == ["darcy_friction"]
+    assert stats["changed"] == []
+
+
+def test_upstream_error_propagates_and_recovers(project):
+    project.update_node("mix1", {"C_w": 2.0})
+    assert project.node("mix1")["error"]
+    assert project.node("loss1")["error"] == "上游节点 mix1 无计算结果"
+    project.update_node("mix1", {"C_w": 0.3})
+    assert project.node("loss1")["error"] is None
+    assert project.node("loss1")["result"] == project.node("loss2")["result"]
+
+
+def test_cycles_and_dangling_links_are_rejected(project):
+    with pytest.raises(ValueError):
+        project.update_node("mix0", links={"C_w": "loss0.i_k"})
+    # 拒绝后保留原链接与拓扑顺序
+    assert project.node("mix0")["links"] == {}
+    with pytest.raises(ValueError):
+        project.add_nodes([{"id": "x", "formula_id": "wasp", "links": {"D": "missing"}}])
+    with pytest.raises(ValueError):
+        project.remove_node("fric0")
+    assert "x" not in project.nodes
@@ -0,0 +1,71 @@
+"""生产模式服务器：长连接空闲超时只用于等待请求行，分块上传的请求体可正常读取"""
+import socket
+import threading
+import time
+
+import pytest
+from flask import Flask, request
+
+from server import PooledWSGIServer
+
+
+@pytest.fixture
+def server():
+    app = Flask(__name__)
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return request.get_data()
+
+    server = PooledWSGIServer('127.0.0.1', 0, app, threads=2, keepalive=0.3, io_timeout=5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _connect(server):
+    return socket.create_connection(('127.0.0.1', server.server_port), timeout=5)
+
+
+def _read_response(connection):
+    """读取一个带 Content-Length 的响应，返回 (状态行, 响应体)"""
+    data = b''
+    while b'\r\n\r\n' not in data:
+        data += connection.recv(65536)
+    head, body = data.split(b'\r\n\r\n', 1)
+    lines = head.decode('latin-1').split('\r\n')
+    length = next(int(line.split(':', 1)[1]) for line in lines if line.lower().startswith('content-length:'))
+    while len(body) < length:
+        body += connection.recv(65536)
+    return lines[0], body
+
+
+def test_slow_request_body_is_not_cut_by_keepalive_timeout(server):
+    with _connect(server) as connection:
+        connection.sendall(b'POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: 6\r\n\r\n')
+        for part in (b'ab', b'cd', b'ef'):
+            # 每段间隔超过空闲超时
+            time.sleep(0.5)
+            connection.sendall(part)
+        assert _read_response(connection) == ('HTTP/1.1 200 OK', b'abcdef')
+
+
+def test_chunked_request_body(server):
+    with _connect(server) as connection:
+        connection.sendall(b'POST /echo HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n'
+                           b'4\r\n{"a"\r\n')
+        time.sleep(0.5)
+        connection.sendall(b'3;ext=1\r\n: 1\r\n1\r\n}\r\n0\r\n\r\n')
+        assert _read_response(connection) == ('HTTP/1.1 200 OK', b'{"a": 1}')
+        # 同一连接继续处理下一个请求
+        connection.sendall(b'POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: 2\r\n\r\nok')
+        assert _read_response(connection) == ('HTTP/1.1 200 OK', b'ok')
+
+
+def test_idle_connection_closed_after_keepalive(server):
+    with _connect(server) as connection:
+        connection.sendall(b'POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: 2\r\n\r\nok')
+        assert _read_response(connection)[1] == b'ok'
+        time.sleep(0.8)
+        assert connection.recv(1) == b''
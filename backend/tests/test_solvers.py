@@ -0,0 +1,31 @@
+"""区间保护的牛顿法、Illinois 法与克诺罗兹临界管径的求解"""
+import math
+
+import numpy as np
+
+from calculation_engine import CalculationEngine
+from solvers import illinois_bracketed, newton_bracketed
+
+
+def test_newton_bracketed_finds_roots():
+    targets = np.array([2.0, 10.0, 1e4])
+    x, iterations, residual = newton_bracketed(lambda x: (x ** 3 - targets, 3 * x ** 2),
+                                               np.zeros(3), np.full(3, 100.0), np.ones(3))
+    assert np.allclose(x, np.cbrt(targets), rtol=1e-10)
+    assert np.all(residual < 1e-8)
+    # 区间内无根的元素为 NaN
+    x, _, _ = newton_bracketed(lambda x: (x ** 2 + 1, 2 * x), np.array([0.0]), np.array([1.0]), np.array([0.5]))
+    assert math.isnan(x[0])
+
+
+def test_illinois_bracketed_finds_roots():
+    targets = np.array([0.5, 2.0, 9.0])
+    x, _, residual = illinois_bracketed(lambda x, index: np.exp(x) - targets[index], np.full(3, -5.0), np.full(3, 5.0))
+    assert np.allclose(x, np.log(targets), rtol=1e-10)
+    assert np.all(residual < 1e-10)
+
+
+def test_kronodze_solution_satisfies_critical_diameter_equation():
+    result = CalculationEngine().calculate('kronodze_pressure', {'G': 50, 'W': 100, 'rho_g': 2.7, 'dp': 0.05})
+    assert result['solver']['residual'] < 1e-9
+    assert result['Vc'] > 0
@@ -0,0 +1,208 @@
+"""蒙特卡洛不确定度传播：为输入参数指定概率分布，对大量样本批量计算主结果的分布"""
+import functools
+import math
+
+import numpy as np
+
+from parallel import DEFAULT_EXECUTOR, worker_engine
+
+# 单次分析的样本数上限与每块样本数（每块独立播种，结果与是否并行、进程数无关）
+MAX_SAMPLES = 5_000_000
+SAMPLE_CHUNK_SIZE = 100_000
+DEFAULT_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+DEFAULT_BINS = 50
+
+
+def _number(spec, key, name):
+    try:
+        return float(spec[key])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"参数 {name} 的分布需要数值 {key}")
+
+
+def parse_distribution(name, spec):
+    """解析单个参数的分布，返回 (类型, 参数元组)。
+
+    数值表示固定值，字符串为公式选项（如 method）的固定取值；对象形式：
+    {"dist": "normal", "mean", "std"}、{"dist": "lognormal", "mean", "std"}（实际值的均值与标准差）、
+    {"dist": "uniform", "low", "high"}、{"dist": "empirical", "samples": [...]}（对实测样本有放回重抽样）。
+    """
+    if spec is None or isinstance(spec, (int, float)):
+        return "fixed", (math.nan if spec is None else float(spec),)
+    if isinstance(spec, str):
+        return "option", (spec,)
+    if not isinstance(spec, dict):
+        raise ValueError(f"参数 {name} 需为数值或分布对象")
+    dist = spec.get('dist', 'normal')
+    if dist == "normal":
+        std = _number(spec, 'std', name)
+        if std < 0:
+            raise ValueError(f"参数 {name} 的标准差 std 不能为负")
+        return dist, (_number(spec, 'mean', name), std)
+    if dist == "lognormal":
+        mean = _number(spec, 'mean', name)
+        std = _number(spec, 'std', name)
+        if mean <= 0 or std < 0:
+            raise ValueError(f"参数 {name} 的对数正态分布需要 mean > 0 且 std ≥ 0")
+        # 由实际值的均值、标准差换算 ln(x) 的参数
+        sigma2 = math.log1p((std / mean) ** 2)
+        return dist, (math.log(mean) - 0.5 * sigma2, math.sqrt(sigma2))
+    if dist == "uniform":
+        low = _number(spec, 'low', name)
+        high = _number(spec, 'high', name)
+        if high < low:
+            raise ValueError(f"参数 {name} 的均匀分布需要 low ≤ high")
+        return dist, (low, high)
+    if dist == "empirical":
+        try:
+            samples = np.asarray(spec.get('samples'), dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f"参数 {name} 的实测样本 samples 含有非数值数据")
+        if samples.ndim != 1 or samples.size == 0:
+            raise ValueError(f"参数 {name} 的实测样本 samples 不能为空")
+        return dist, (samples,)
+    raise ValueError(f"参数 {name} 的分布类型 {dist} 不支持，可选：normal、lognormal、uniform、empirical")
+
+
+def draw(rng, dist, args, n):
+    """从已解析的分布抽取 n 个样本"""
+    if dist == "fixed":
+        return np.full(n, args[0])
+    if dist == "option":
+        return args[0]
+    if dist == "normal":
+        return rng.normal(args[0], args[1], n)
+    if dist == "lognormal":
+        return rng.lognormal(args[0], args[1], n)
+    if dist == "uniform":
+        return rng.uniform(args[0], args[1], n)
+    return rng.choice(args[0], n, replace=True)
+
+
+def sample_chunk(engine, formula_id, distributions, n, seed_sequence):
+    """抽取一块样本并批量计算，返回 (主结果数组, 逐行错误列表)；出错行的结果为 NaN"""
+    rng = np.random.default_rng(seed_sequence)
+    # 按参数名排序抽样，保证同一种子下结果与参数书写顺序无关
+    columns = {name: draw(rng, *distributions[name], n) for name in sorted(distributions)}
+    batch = engine.calculate_batch(formula_id, columns, rounded=False)
+    return batch[engine.registry.get(formula_id).output], batch["errors"]
+
+
+def sample_range(engine, formula_id, distributions, chunk_size, children, start, stop):
+    """计算样本序号 [start, stop) 覆盖的各块（边界与 chunk_size 对齐），返回合并后的 (主结果, 逐行错误)"""
+    parts = [sample_chunk(engine, formula_id, distributions, min(chunk_size, stop - begin), children[begin // chunk_size])
+             for begin in range(start, stop, chunk_size)]
+    return np.concatenate([np.asarray(values) for values, _ in parts]), [e for _, errors in parts for e in errors]
+
+
+def _sample_range_in_worker(formula_id, distributions, chunk_size, children, start, stop):
+    """进程池中的任务入口"""
+    return sample_range(worker_engine(), formula_id, distributions, chunk_size, children, start, stop)
+
+
+class UncertaintyAnalysis:
+    """不确定度分析器：分块抽样、批量计算并汇总分位数、直方图与超限概率"""
+
+    def __init__(self, engine, chunk_size=SAMPLE_CHUNK_SIZE, executor=None):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.executor = executor or DEFAULT_EXECUTOR
+
+    def run(self, formula_id, parameters, samples=100_000, seed=None, percentiles=DEFAULT_PERCENTILES,
+            bins=DEFAULT_BINS, target=None, workers=None, progress=None):
+        """执行分析。
+
+        parameters 为 {参数名: 数值或分布对象}（见 parse_distribution）；seed 为空时随机生成并在结果中返回，
+        便于复现。样本量较大时由进程池执行器按实测耗时将若干块合为一个任务并行计算（workers 为进程数上限，
+        默认取执行器配置）；因每块独立播种，结果与串行一致。
+        progress(done, total) 在每块完成后调用（如后台任务报告进度，并可在此抛出异常以中止）。
+        """
+        formula = self.engine.registry.get(formula_id)
+        samples = int(samples)
+        if not 0 < samples <= MAX_SAMPLES:
+            raise ValueError(f"样本数 samples 需在 1～{MAX_SAMPLES} 之间")
+        bins = int(bins)
+        if bins < 1:
+            raise ValueError("直方图分组数 bins 必须至少为1")
+        percentiles = [float(q) for q in percentiles]
+        if any(not 0 <= q <= 100 for q in percentiles):
+            raise ValueError("分位数 percentiles 需在 0～100 之间")
+        distributions = {name: parse_distribution(name, spec) for name, spec in (parameters or {}).items()}
+
+        if seed is None:
+            # 随机种子限制在 2^53 以内，返回前端后仍可原样用于复现
+            seed = int(np.random.SeedSequence().entropy % (1 << 53))
+        seed_sequence = np.random.SeedSequence(int(seed))
+        children = seed_sequence.spawn(math.ceil(samples / self.chunk_size))
+        arguments = (formula_id, distributions, self.chunk_size, children)
+        chunks = self.executor.run(
+            ("uncertainty", formula_id), samples,
+            functools.partial(sample_range, self.engine, *arguments),
+            functools.partial(_sample_range_in_worker, *arguments),
+            workers=workers, local_rows=self.chunk_size, align=self.chunk_size,
+        )
+        parts = []
+        done = 0
+        for part in chunks:
+            parts.append(part)
+            done += len(part[1])
+            if progress is not None:
+                progress(done, samples)
+        workers = chunks.workers
+
+        output = np.concatenate([np.asarray(values) for values, _ in parts])
+        failed = np.zeros(output.size, dtype=bool)
+        error_counts = {}
+        offset = 0
+        for _, errors in parts:
+            for i, error in enumerate(errors):
+                if error is not None:
+                    failed[offset + i] = True
+                    error_counts[error] = error_counts.get(error, 0) + 1
+            offset += len(errors)
+
+        result = {
+            "formula_id": formula_id,
+            "output": formula.output,
+            "unit": formula.unit,
+            "seed": seed_sequence.entropy,
+            "samples": samples,
+            "workers": workers,
+        }
+        result.update(self._summarize(output, failed, error_counts, percentiles, bins, target))
+        return result
+
+    def _summarize(self, output, failed, error_counts, percentiles, bins, target):
+        """统计有效样本的分布；布尔型结果（如加速流判断）只给出成立概率"""
+        summary = {
+            "failed": int(failed.sum()),
+            "errors": [{"error": error, "count": count}
+                       for error, count in sorted(error_counts.items(), key=lambda item: -item[1])[:5]],
+        }
+        if output.dtype == bool:
+            valid = output[~failed]
+            summary["valid"] = int(valid.size)
+            if valid.size:
+                summary["probability"] = float(valid.mean())
+            return summary
+
+        output = output.astype(float, copy=False)
+        finite = output[np.isfinite(output) & ~failed]
+        summary["valid"] = int(finite.size)
+        if not finite.size:
+            return summary
+        counts, edges = np.histogram(finite, bins=bins)
+        summary.update({
+            "mean": float(finite.mean()),
+            "std": float(finite.std(ddof=1)) if finite.size > 1 else 0.0,
+            "min": float(finite.min()),
+            "max": float(finite.max()),
+            "percentiles": {f"p{q:g}": float(v) for q, v in zip(percentiles, np.percentile(finite, percentiles))},
+            "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        })
+        if target is not None:
+            target = float(target)
+            summary["target"] = target
+            summary["probability_below_target"] = float((finite < target).mean())
+            summary["probability_above_target"] = float((finite > target).mean())
+        return summary
@@ -3,9 +3,14 @@ from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH  # type: ignore
 from docx.oxml.ns import qn
 from docx.oxml import parse_xml
+from lxml import etree
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from datetime import datetime
+from io import BytesIO
 import os
-import re
+import threading
+from omml import formula_element
 
 class WordExporter:
     """Word文档导出器"""
@@ -13,8 +18,21 @@ class WordExporter:
     # 类变量：存储每天的导出次数 {日期字符串: 次数}
     _daily_export_count = {}
     _current_date = None
+    _count_lock = threading.Lock()
     
-    def __init__(self):
+    # 类变量：预生成的文档模板（每个进程生成一次），见 _new_document
+    _template = None
+    _template_lock = threading.Lock()
+    
+    # 类变量：写入 exports 目录副本的后台线程（按提交顺序逐个写入），见 save_copy_async
+    _writer = None
+    _writer_lock = threading.Lock()
+    
+    def __init__(self, keep_copies=None):
+        # 是否在 exports 目录保留导出副本（环境变量 EXPORT_KEEP_COPY=0 时不保留）
+        if keep_copies is None:
+            keep_copies = os.environ.get('EXPORT_KEEP_COPY', '1') != '0'
+        self.keep_copies = keep_copies
         # 获取当前文件所在目录（backend目录）
         current_dir = os.path.dirname(os.path.abspath(__file__))
         # 获取项目根目录（backend的父目录）
@@ -28,97 +46,201 @@ class WordExporter:
         """获取当天的导出次数并递增"""
         today = datetime.now().strftime("%Y%m%d")
         
-        # 如果是新的一天，重置计数器
-        if WordExporter._current_date != today:
-            WordExporter._current_date = today
-            WordExporter._daily_export_count[today] = 0
-        
-        # 递增计数器
-        WordExporter._daily_export_count[today] += 1
-        return WordExporter._daily_export_count[today]
+        # 服务线程与后台任务线程可能同时导出
+        with WordExporter._count_lock:
+            # 如果是新的一天，重置计数器
+            if WordExporter._current_date != today:
+                WordExporter._current_date = today
+                WordExporter._daily_export_count[today] = 0
+            
+            # 递增计数器
+            WordExporter._daily_export_count[today] += 1
+            return WordExporter._daily_export_count[today]
     
     def export(self, formula_id, formula_info, parameters, result):
-        """导出计算书到Word文档"""
+        """导出计算书到Word文档（保存到 exports 目录），返回文件路径"""
         try:
-            doc = Document()
-            
-            # 设置文档样式
-            self._setup_document_style(doc)
-            
-            # 添加软件介绍
-            self._add_software_intro(doc)
-            
-            # 添加标题
-            title = doc.add_heading('浆体管道临界流速计算书', 0)
-            title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            # 添加基本信息
-            self._add_basic_info(doc, formula_info)
-            
-            # 添加计算公式（带数学公式格式）
-            self._add_formula_section(doc, formula_info)
-            
-            # 添加输入参数
-            self._add_parameters_section(doc, parameters, formula_info)
-            
-            # 添加中间结果
-            self._add_intermediate_results(doc, result)
-            
-            # 添加最终结果（需 formula_id 区分 Vc/i_k/rho_k）
-            self._add_result_section(doc, result, formula_id)
-            
-            # 添加计算过程
-            self._add_calculation_process(doc, formula_id, formula_info, parameters, result)
-            
-            # 添加软件推广信息
-            self._add_software_promotion(doc)
-            
-            # 保存文件
-            timestamp = datetime.now().strftime("%Y%m%d")
-            formula_name = formula_info.get('name', 'unknown').replace(' ', '').replace('/', '_')
-            export_count = self._get_export_count()
-            filename = f"长沙院浆体计算_{formula_name}_{timestamp}_{export_count:03d}.docx"
-            file_path = os.path.join(self.output_dir, filename)
-            
-            # 如果文件已存在，尝试删除或重命名
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except PermissionError:
-                    # 如果无法删除（可能被打开），尝试使用带时间戳的文件名
-                    import time
-                    timestamp_ms = int(time.time() * 1000) % 10000
-                    filename = f"长沙院浆体计算_{formula_name}_{timestamp}_{export_count:03d}_{timestamp_ms}.docx"
-                    file_path = os.path.join(self.output_dir, filename)
-            
-            # 确保目录存在且有写权限
-            if not os.path.exists(self.output_dir):
-                os.makedirs(self.output_dir, exist_ok=True)
-            
-            # 保存文件，如果失败则重试
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    doc.save(file_path)
-                    break
-                except PermissionError as e:
-                    if attempt < max_retries - 1:
-                        # 如果文件被占用，尝试使用不同的文件名
-                        import time
-                        timestamp_ms = int(time.time() * 1000) % 10000
-                        filename = f"长沙院浆体计算_{formula_name}_{timestamp}_{export_count:03d}_{timestamp_ms}.docx"
-                        file_path = os.path.join(self.output_dir, filename)
-                        time.sleep(0.5)  # 等待0.5秒后重试
-                    else:
-                        raise Exception(f"无法保存文件，可能文件正在被其他程序打开: {file_path}")
-            
-            return file_path
+            filename, data = self.render(formula_id, formula_info, parameters, result)
+            return self.save_copy(filename, data)
         except Exception as e:
             import traceback
             error_msg = f"导出Word文档时出错: {str(e)}\n{traceback.format_exc()}"
             print(error_msg)
             raise Exception(f"导出失败: {str(e)}")
     
+    def render(self, formula_id, formula_info, parameters, result):
+        """在内存中生成计算书，返回 (文件名, docx 字节串)，不读写磁盘"""
+        doc = self.build_document(formula_id, formula_info, parameters, result)
+        timestamp = datetime.now().strftime("%Y%m%d")
+        formula_name = self.safe_name(formula_info.get('name', 'unknown'))
+        export_count = self._get_export_count()
+        filename = f"长沙院浆体计算_{formula_name}_{timestamp}_{export_count:03d}.docx"
+        return filename, self.to_bytes(doc)
+    
+    def save_copy(self, filename, data):
+        """将已生成的计算书写入 exports 目录，返回文件路径；文件被占用时改用带时间戳的文件名并重试"""
+        import time
+        stem, extension = os.path.splitext(filename)
+        file_path = os.path.join(self.output_dir, filename)
+        
+        # 如果文件已存在，尝试删除或重命名
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except PermissionError:
+                # 如果无法删除（可能被打开），尝试使用带时间戳的文件名
+                timestamp_ms = int(time.time() * 1000) % 10000
+                file_path = os.path.join(self.output_dir, f"{stem}_{timestamp_ms}{extension}")
+        
+        # 确保目录存在且有写权限
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+        
+        # 保存文件，如果失败则重试
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                with open(file_path, 'wb') as f:
+                    f.write(data)
+                break
+            except PermissionError:
+                if attempt < max_retries - 1:
+                    # 如果文件被占用，尝试使用不同的文件名
+                    timestamp_ms = int(time.time() * 1000) % 10000
+                    file_path = os.path.join(self.output_dir, f"{stem}_{timestamp_ms}{extension}")
+                    time.sleep(0.5)  # 等待0.5秒后重试
+                else:
+                    raise Exception(f"无法保存文件，可能文件正在被其他程序打开: {file_path}")
+        
+        return file_path
+    
+    def keeps_copy(self, keep_copy=None):
+        """本次导出是否保留副本：请求未指定（None）时按 keep_copies 配置"""
+        return self.keep_copies if keep_copy is None else bool(keep_copy)
+    
+    def save_copy_async(self, filename, data):
+        """在后台线程中写入 exports 目录的副本（不阻塞响应）；写入失败只记录日志。返回 Future"""
+        with WordExporter._writer_lock:
+            if WordExporter._writer is None:
+                WordExporter._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-writer")
+        return WordExporter._writer.submit(self._save_copy_logged, filename, data)
+    
+    def _save_copy_logged(self, filename, data):
+        try:
+            return self.save_copy(filename, data)
+        except Exception as e:
+            print(f"保存计算书副本失败: {filename}: {str(e)}")
+            return None
+    
+    def build_document(self, formula_id, formula_info, parameters, result):
+        """生成单个算例的完整计算书（不保存）"""
+        # 由模板复制，已包含文档样式、软件介绍与标题
+        doc, promotion = self._new_document()
+        self._add_report_sections(doc, formula_id, formula_info, parameters, result)
+        # 添加软件推广信息（预生成的段落）
+        self._append_elements(doc, promotion)
+        return doc
+    
+    def render_sections(self, formula_id, formula_info, parameters, result):
+        """只生成计算内容各节，返回正文块级元素的 XML 字节串列表（可跨进程传递，用于 combine 合并）"""
+        doc, _ = self._new_document()
+        body = doc.element.body
+        start = len(body) - 1
+        self._add_report_sections(doc, formula_id, formula_info, parameters, result)
+        return [etree.tostring(element) for element in list(body)[start:] if element.tag != qn('w:sectPr')]
+    
+    def combine(self, chapters):
+        """合并多个算例为一份计算书：chapters 为 [(章标题, render_sections 的结果), ...]，
+        每个算例一章，第二章起另起一页，文末为软件推广信息"""
+        doc, promotion = self._new_document()
+        for k, (title, sections) in enumerate(chapters):
+            if k:
+                doc.add_page_break()
+            heading = doc.add_heading(title, 1)
+            for run in heading.runs:
+                self._set_font(run)
+            self._append_elements(doc, [parse_xml(xml) for xml in sections])
+        self._append_elements(doc, promotion)
+        return doc
+    
+    @staticmethod
+    def to_bytes(doc):
+        buffer = BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def safe_name(name):
+        """用于文件名的公式名称：去掉空格，斜杠替换为下划线"""
+        return name.replace(' ', '').replace('/', '_')
+    
+    def _add_report_sections(self, doc, formula_id, formula_info, parameters, result):
+        """添加与算例相关的各节"""
+        # 添加基本信息
+        self._add_basic_info(doc, formula_info)
+        
+        # 添加计算公式（带数学公式格式）
+        self._add_formula_section(doc, formula_info)
+        
+        # 添加输入参数
+        self._add_parameters_section(doc, parameters, formula_info)
+        
+        # 添加中间结果
+        self._add_intermediate_results(doc, result)
+        
+        # 添加最终结果（需 formula_id 区分 Vc/i_k/rho_k）
+        self._add_result_section(doc, result, formula_id)
+        
+        # 添加计算过程
+        self._add_calculation_process(doc, formula_id, formula_info, parameters, result)
+    
+    @classmethod
+    def template_ready(cls):
+        """本进程的文档模板是否已生成"""
+        return cls._template is not None
+    
+    def _new_document(self):
+        """由预生成的模板复制出新文档，返回 (文档, 软件推广信息段落)。
+
+        样式设置、软件介绍、标题与软件推广信息与计算内容无关，每个进程只生成一次：
+        前三者保存为 docx 字节串，每次导出从中加载；推广信息保存为段落 XML，每次导出复制后追加到文末。
+        """
+        template = WordExporter._template
+        if template is None:
+            with WordExporter._template_lock:
+                if WordExporter._template is None:
+                    WordExporter._template = self._build_template()
+                template = WordExporter._template
+        data, promotion = template
+        return Document(BytesIO(data)), [deepcopy(element) for element in promotion]
+    
+    def _build_template(self):
+        """生成文档模板：(含样式、软件介绍与标题的 docx 字节串, 软件推广信息段落元素)"""
+        doc = Document()
+        self._setup_document_style(doc)
+        self._add_software_intro(doc)
+        title = doc.add_heading('浆体管道临界流速计算书', 0)
+        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        
+        buffer = BytesIO()
+        doc.save(buffer)
+        
+        body = doc.element.body
+        start = len(body) - 1  # 新段落插在末尾的 sectPr 之前
+        self._add_software_promotion(doc)
+        promotion = [element for element in list(body)[start:] if element.tag != qn('w:sectPr')]
+        return buffer.getvalue(), promotion
+    
+    def _append_elements(self, doc, elements):
+        """将段落等块级元素追加到正文末尾（节属性 sectPr 之前）"""
+        body = doc.element.body
+        sect_pr = body.find(qn('w:sectPr'))
+        for element in elements:
+            if sect_pr is not None:
+                sect_pr.addprevious(element)
+            else:
+                body.append(element)
+    
     def _setup_document_style(self, doc):
         """设置文档样式"""
         style = doc.styles['Normal']
@@ -214,16 +336,11 @@ class WordExporter:
         
         doc.add_paragraph()
         
-        # 添加公式（使用文本格式，后续可根据样本文档优化）
+        # 添加公式（Word 数学公式对象）
         formula_text = formula_info.get('formula', '')
         formula_p = doc.add_paragraph()
         formula_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # 暂时使用文本格式，等样本文档后再优化为数学公式对象
-        formula_run = formula_p.add_run(formula_text)
-        formula_run.font.size = Pt(14)
-        formula_run.font.name = 'Times New Roman'
-        self._set_font(formula_run)
+        self._insert_math_formula(formula_p, formula_text)
         
         # 添加公式说明
         if formula_info.get('description'):
@@ -234,12 +351,9 @@ class WordExporter:
             desc_p.paragraph_format.first_line_indent = Pt(24)
     
     def _insert_math_formula(self, paragraph, formula):
-        """使用OMML格式插入Word数学公式"""
-        # 将公式转换为OMML格式
-        omml_xml = self._convert_to_omml(formula)
+        """使用OMML格式插入Word数学公式（编译结果按公式缓存）"""
         try:
-            omml_element = parse_xml(omml_xml)
-            paragraph._p.append(omml_element)
+            paragraph._p.append(formula_element(formula))
         except Exception as e:
             # 如果OMML插入失败，回退到文本格式
             print(f"插入数学公式失败，使用文本格式: {e}")
@@ -248,48 +362,6 @@ class WordExporter:
             formula_run.font.name = 'Cambria Math'
             self._set_font(formula_run)
     
-    def _convert_to_omml(self, formula):
-        """将公式字符串转换为OMML XML格式"""
-        # 解析公式并转换为OMML格式
-        # 这是一个简化的转换，可以根据样本文档进一步优化
-        
-        # 处理变量下标：Vc -> V_c, Cv -> C_v, d85 -> d_85, d90 -> d_90
-        formula = re.sub(r'Vc', 'V_c', formula)
-        formula = re.sub(r'Cv', 'C_v', formula)
-        formula = re.sub(r'd85', 'd_85', formula)
-        formula = re.sub(r'd90', 'd_90', formula)
-        formula = re.sub(r'ω_s', 'ω_s', formula)
-        formula = re.sub(r'rho_g', 'ρ_g', formula)
-        formula = re.sub(r'rho_k', 'ρ_k', formula)
-        
-        # 构建OMML XML
-        # 这里先创建一个基本的OMML结构，具体格式可以根据样本文档调整
-        omml_parts = []
-        
-        # 分割公式为各个部分
-        parts = re.split(r'(\s*=\s*|\s*\*\s*|\s*\[\s*|\s*\]\s*|\s*\(\s*|\s*\)\s*|\s*\^\s*|\s*/\s*)', formula)
-        
-        omml_xml = '<m:oMath xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math">'
-        
-        # 简化处理：先使用文本格式，等样本文档后再优化
-        # 将公式转换为Unicode数学符号格式
-        formula_display = formula.replace('*', '·').replace('^', '^')
-        
-        # 创建文本run
-        omml_xml += '<m:r><m:t xml:space="preserve">' + self._escape_xml(formula_display) + '</m:t></m:r>'
-        
-        omml_xml += '</m:oMath>'
-        
-        return omml_xml
-    
-    def _escape_xml(self, text):
-        """转义XML特殊字符"""
-        return (text.replace('&', '&amp;')
-                   .replace('<', '&lt;')
-                   .replace('>', '&gt;')
-                   .replace('"', '&quot;')
-                   .replace("'", '&apos;'))
-    
     def _add_parameters_section(self, doc, parameters, formula_info):
         """添加输入参数部分"""
         doc.add_paragraph()
@@ -685,9 +757,17 @@ class WordExporter:
         Re = parameters.get('Re', 'N/A')
         lam = result.get('lambda_coef', 'N/A')
         flow_regime = intermediate.get('flow_regime', 'N/A')
+        solver = result.get('solver')
+        if solver is None:
+            turbulent = ("湍流时采用 Swamee-Jain 近似" if parameters.get('method', 'swamee_jain') == 'swamee_jain'
+                         else "湍流时采用 Colebrook-White 方程")
+        elif solver.get('method') == "moody-table":
+            turbulent = f"湍流时由 Colebrook-White 插值表求得（相对误差 ≤ {solver.get('error_bound', 0):.1e}）"
+        else:
+            turbulent = f"湍流时迭代求解 Colebrook-White 方程（{solver.get('iterations')} 次迭代）"
         process_texts = [
             f"1. 雷诺数 Re = {Re}，流态：{flow_regime}",
-            f"2. 层流时 λ = 64/Re；湍流时采用 Swamee-Jain 近似",
+            f"2. 层流时 λ = 64/Re；{turbulent}",
             f"3. 达西摩阻系数 λ = {lam}"
         ]
         for text in process_texts:
@@ -2,6 +2,7 @@ const { app, BrowserWindow, dialog, ipcMain } = require('electron')
 const path = require('path')
 const { spawn, execSync } = require('child_process')
 const fs = require('fs')
+const http = require('http')
 const os = require('os')
 const { autoUpdater } = require('electron-updater')
 
@@ -139,6 +140,23 @@ function killProcessOnPort5000() {
   }
 }
 
+// 后端就绪检查：GET /api/ready 返回 200 即可打开窗口
+const BACKEND_READY_URL = 'http://127.0.0.1:5000/api/ready'
+const READY_POLL_INTERVAL = 200
+// 超过该时间仍未就绪也打开窗口（前端请求失败时会重试或报错）
+const READY_TIMEOUT = isDev ? 30000 : 60000
+
+function probeBackendReady() {
+  return new Promise((resolve) => {
+    const req = http.get(BACKEND_READY_URL, { timeout: 1000 }, (res) => {
+      res.resume()
+      resolve(res.statusCode === 200)
+    })
+    req.on('timeout', () => req.destroy())
+    req.on('error', () => resolve(false))
+  })
+}
+
 // 启动后端服务器
 function startBackend() {
   return new Promise((resolve, reject) => {
@@ -183,20 +201,46 @@ function startBackend() {
       cwd: spawnCwd,
       stdio: ['ignore', 'pipe', 'pipe'],
       shell: useShell,
+      // 计算历史库放在用户数据目录，安装目录可能不可写，升级重装也不会丢失
+      env: { ...process.env, HISTORY_DB: process.env.HISTORY_DB || path.join(app.getPath('userData'), 'history.sqlite3') },
     })
     
     let backendOutput = ''
     let backendError = ''
+    let settled = false
+    const spawnedAt = Date.now()
+
+    function finish(err) {
+      if (settled) return
+      settled = true
+      if (err) {
+        reject(err)
+      } else {
+        console.log(`后端就绪，用时 ${Date.now() - spawnedAt} ms`)
+        resolve()
+      }
+    }
+
+    // 轮询就绪接口，不依赖标准输出中的 "Running on"（输出可能被缓冲或格式变化）
+    async function pollReady() {
+      while (!settled) {
+        if (await probeBackendReady()) {
+          finish()
+          return
+        }
+        if (Date.now() - spawnedAt > READY_TIMEOUT) {
+          console.warn(`等待后端就绪超过 ${READY_TIMEOUT} ms，先打开窗口`)
+          finish()
+          return
+        }
+        await new Promise(r => setTimeout(r, READY_POLL_INTERVAL))
+      }
+    }
     
     backendProcess.stdout.on('data', (data) => {
       const output = data.toString()
       backendOutput += output
       console.log(`[后端] ${output}`)
-      
-      // 检测后端是否成功启动
-      if (output.includes('Running on') || output.includes('127.0.0.1:5000')) {
-        resolve()
-      }
     })
     
     backendProcess.stderr.on('data', (data) => {
@@ -207,10 +251,15 @@ function startBackend() {
     
     backendProcess.on('error', (err) => {
       console.error('后端启动失败:', err)
-      reject(err)
+      finish(err)
     })
     
     backendProcess.on('exit', (code) => {
+      if (!settled) {
+        // 就绪前退出：不必等到超时
+        finish(new Error(`后端进程在就绪前退出，代码: ${code}\n\n${backendError || backendOutput || ''}`.trim()))
+        return
+      }
       if (code !== 0 && code !== null) {
         console.error(`后端进程异常退出，代码: ${code}`)
         console.error('后端输出:', backendOutput)
@@ -227,9 +276,7 @@ function startBackend() {
       }
     })
     
-    // 不做接口检测，启动后稍等即打开窗口（前端自行请求 5000，未就绪时会重试或报错）
-    const openDelay = isDev ? 1200 : 2500
-    setTimeout(() => resolve(), openDelay)
+    pollReady()
     } // end doSpawn
     setTimeout(doSpawn, delayBeforeSpawn)
   })
@@ -430,9 +477,6 @@ app.whenReady().then(async () => {
     await startBackend()
     console.log('后端服务器启动成功')
     
-    // 等待一下确保后端完全就绪
-    await new Promise(resolve => setTimeout(resolve, 1000))
-    
     // 创建窗口
     createWindow()
     
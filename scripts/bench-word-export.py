@@ -0,0 +1,60 @@
+"""
+Benchmark: per-export latency of WordExporter.export.
+Exports a few representative calculations repeatedly into a temporary
+directory and prints the median / mean / p95 time per document.
+
+Usage: python scripts/bench-word-export.py [rounds]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'backend'))
+
+from calculation_engine import CalculationEngine  # noqa: E402
+from word_export import WordExporter  # noqa: E402
+
+SAMPLES = [
+    ('liu_dezhong', {'D': 0.3, 'rho_g': 2.7, 'rho_k': 1.3, 'omega': 0.02, 'Cv': 0.15, 'omega_s': 0.01}),
+    ('fei_xiangjun', {'D': 0.3, 'rho_g': 2.7, 'rho_k': 1.3, 'Cv': 0.15, 'omega': 0.02, 'd90': 0.5,
+                      'lambda_coef': 0.02}),
+    ('darcy_friction', {'Re': 2e5, 'D': 0.3}),
+    ('friction_loss', {'lambda_coef': 0.02, 'V': 2.0, 'rho_k': 1.3, 'D': 0.3, 'rho_s': 1.0}),
+]
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    engine = CalculationEngine()
+    cases = []
+    for formula_id, parameters in SAMPLES:
+        formula_info = engine.registry.get(formula_id).catalog()
+        cases.append((formula_id, formula_info, parameters, engine.calculate(formula_id, parameters)))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        exporter = WordExporter()
+        exporter.output_dir = output_dir
+        # First export includes one-off costs (imports, template build); reported separately
+        started = time.perf_counter()
+        exporter.export(*cases[0])
+        first = time.perf_counter() - started
+
+        timings = []
+        for _ in range(rounds):
+            for case in cases:
+                started = time.perf_counter()
+                exporter.export(*case)
+                timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f'first export: {first * 1000:.1f} ms')
+    print(f'{len(timings)} exports: median {statistics.median(timings) * 1000:.2f} ms, '
+          f'mean {statistics.mean(timings) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()